@@ -1,165 +1,356 @@
 from __future__ import annotations
 
+# Application construite par create_app(): l'import ne charge ni le catalogue ni les modules
+# d'écriture (publish_core, numpy). Les index et taxonomies sont décodés en arrière-plan
+# au démarrage (warm.py); ping et les routes d'upload répondent pendant ce temps.
+#
+#   uvicorn app:create_app --factory      (ou app:app, créée au premier accès)
+
 import io
 import os
 import threading
+import time
 import uuid
+from contextlib import ExitStack, asynccontextmanager
 from pathlib import Path
 
-from fastapi import Depends, FastAPI, File, Form, Header, HTTPException, UploadFile
-from fastapi.responses import PlainTextResponse
-
-from models import DraftProduct, JobError, JobState
-from publish_core import PublishError, create_product, delete_product, update_product
-from utils import ensure_dir, now_stamp
-
-app = FastAPI(title="Medilec Catalog Publisher", version="0.1")
-
-
-def detect_catalog_root() -> Path:
-    env = os.environ.get("CATALOG_ROOT")
-    if env:
-        p = Path(env).expanduser().resolve()
-    else:
-        repo_root = Path(__file__).resolve().parent.parent
-        p = repo_root / "public" / "catalog"
+from fastapi import APIRouter, Depends, FastAPI, File, Form, Header, HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from export import EXPORT_FORMATS, ExportError, parse_fields, stream_export
+from html_stage import use_persistent_cache
+from lease import CatalogLease, LeaseTimeout, state_dir
+from models import DraftProduct, JobError, JobState, TaxonomyRename, UploadCreate
+from taxonomy import TAXONOMY_KINDS
+from uploads import (
+    ChunkWriter,
+    UploadError,
+    create_upload,
+    discard_upload,
+    finalize_upload,
+    get_upload,
+    upload_status,
+)
+from utils import atomic_write_json, ensure_dir, now_stamp, read_json, resolve_catalog_root
+from warm import enable_warm_catalog
+
+LEASE_WAIT_SECONDS = float(os.environ.get("PUBLISHER_LEASE_WAIT_SECONDS") or 120)
+JOB_FILES_RETENTION_SECONDS = 24 * 3600
+# Persistance des logs de job: au plus toutes les JOB_FLUSH_SECONDS ou JOB_FLUSH_LINES lignes
+# (les changements d'état sont écrits immédiatement)
+JOB_FLUSH_SECONDS = 0.25
+JOB_FLUSH_LINES = 50
+
+router = APIRouter()
+
+
+def detect_catalog_root(path: str | Path | None = None) -> Path:
+    p = resolve_catalog_root(path)
     if not p.exists() or not p.is_dir():
         raise RuntimeError(f"CATALOG_ROOT introuvable: {p}")
     return p
 
 
-CATALOG_ROOT = detect_catalog_root()
-REPORTS_DIR = CATALOG_ROOT / "reports"
-ensure_dir(REPORTS_DIR)
-
-EXPECTED_ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
-if not EXPECTED_ADMIN_TOKEN:
-    # Contrat: on refuse de démarrer sans token
-    raise RuntimeError("ADMIN_TOKEN non configuré côté publisher")
-
-
 class _InMemUpload:
     def __init__(self, filename: str | None, data: bytes):
         self.filename = filename or ""
         self.file = io.BytesIO(data)
 
 
-def require_admin_token(x_admin_token: str | None = Header(default=None)):
-    if not x_admin_token or x_admin_token != EXPECTED_ADMIN_TOKEN:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    return True
-
+class Publisher:
+    """État d'une app: catalogue, bail d'écriture, jobs et catalogue chaud."""
+
+    def __init__(self, catalog_root: Path, admin_token: str, warm_snapshot: bool | None = None):
+        self.catalog_root = catalog_root
+        self.admin_token = admin_token
+        self.reports_dir = catalog_root / "reports"
+        ensure_dir(self.reports_dir)
+        # État des jobs partagé entre workers (uvicorn --workers N): chaque worker persiste
+        # les jobs qu'il exécute, les autres peuvent ainsi répondre au polling.
+        self.jobs_dir = state_dir(catalog_root) / "jobs"
+        ensure_dir(self.jobs_dir)
+        self.lease = CatalogLease(catalog_root, ttl=float(os.environ.get("PUBLISHER_LEASE_TTL_SECONDS") or 30))
+        self.warm = enable_warm_catalog(catalog_root, warm_snapshot)
+        use_persistent_cache(catalog_root)
+        self._jobs_lock = threading.Lock()
+        self._jobs: dict[str, dict] = {}
+        # job_id -> (monotonic de la dernière écriture, lignes/progrès non persistés)
+        self._job_flush: dict[str, tuple[float, int]] = {}
+
+    def _persist_job(self, job_id: str, force: bool = True):
+        now = time.monotonic()
+        with self._jobs_lock:
+            job = self._jobs.get(job_id)
+            if not job:
+                return
+            last, pending = self._job_flush.get(job_id, (0.0, 0))
+            if not force and pending + 1 < JOB_FLUSH_LINES and now - last < JOB_FLUSH_SECONDS:
+                self._job_flush[job_id] = (last, pending + 1)
+                return
+            self._job_flush[job_id] = (now, 0)
+            snapshot = {**job, "logs": list(job["logs"])}
+        try:
+            atomic_write_json(self.jobs_dir / f"{job_id}.json", snapshot)
+        except Exception:
+            # fail-soft: le worker local garde l'état en mémoire
+            pass
 
-_jobs_lock = threading.Lock()
-_jobs: dict[str, dict] = {}
+    def lookup_job(self, job_id: str) -> dict | None:
+        with self._jobs_lock:
+            raw = self._jobs.get(job_id)
+            if raw:
+                return {**raw, "logs": list(raw.get("logs") or [])}
+        # Job exécuté par un autre worker
+        if not job_id.isalnum():
+            return None
+        path = self.jobs_dir / f"{job_id}.json"
+        if not path.exists():
+            return None
+        try:
+            raw = read_json(path)
+        except Exception:
+            return None
+        return raw if isinstance(raw, dict) else None
+
+    def job_log(self, job_id: str, line: str):
+        with self._jobs_lock:
+            job = self._jobs.get(job_id)
+            if not job:
+                return
+            job["logs"].append(str(line))
+            job["last_log"] = str(line)
+        self._persist_job(job_id, force=False)
+
+    def job_progress(self, job_id: str, pct: int):
+        pct2 = max(0, min(100, int(pct)))
+        with self._jobs_lock:
+            job = self._jobs.get(job_id)
+            if not job:
+                return
+            job["progress"] = pct2
+        self._persist_job(job_id, force=False)
+
+    def _set_job_state(self, job_id: str, **patch):
+        with self._jobs_lock:
+            job = self._jobs.get(job_id)
+            if not job:
+                return
+            job.update(patch)
+        self._persist_job(job_id)
+
+    def _write_job_log_file(self, job_id: str) -> Path:
+        stamp = now_stamp()
+        path = self.reports_dir / f"publish_{stamp}_{job_id}.log"
+        with self._jobs_lock:
+            lines = list(self._jobs.get(job_id, {}).get("logs") or [])
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return path
+
+    def _run_job(self, job_id: str, kind: str, fn):
+        # Importé dans le thread du job: publish_core n'est pas chargé au démarrage
+        from publish_core import PublishError
+
+        self.job_log(job_id, f"Job {job_id} en attente du bail catalogue ({kind})")
 
+        try:
+            with self.lease.hold(timeout=LEASE_WAIT_SECONDS) as fence:
+                self._set_job_state(job_id, status="running", progress=1)
+                self.job_log(job_id, f"Job {job_id} start ({kind}) [{self.lease.holder}]")
+                result = fn(fence)
+            self.job_progress(job_id, 100)
+            self._set_job_state(job_id, status="success", result=result, error=None)
+            self.job_log(job_id, "SUCCESS")
+        except LeaseTimeout as e:
+            self._set_job_state(
+                job_id,
+                status="error",
+                error={"code": "lease_timeout", "message": str(e)},
+            )
+            self.job_log(job_id, f"ERROR lease_timeout: {e}")
+        except PublishError as e:
+            self._set_job_state(
+                job_id,
+                status="error",
+                error={"code": e.code, "message": e.message},
+            )
+            self.job_log(job_id, f"ERROR {e.code}: {e.message}")
+        except Exception as e:
+            self._set_job_state(
+                job_id,
+                status="error",
+                error={"code": "internal", "message": str(e)},
+            )
+            self.job_log(job_id, f"ERROR internal: {e}")
+        finally:
+            # Dernières lignes retenues par le throttling
+            self._persist_job(job_id)
+            with self._jobs_lock:
+                self._job_flush.pop(job_id, None)
+            try:
+                self._write_job_log_file(job_id)
+            except Exception:
+                # fail-soft
+                pass
 
-def _job_log(job_id: str, line: str):
-    with _jobs_lock:
-        job = _jobs.get(job_id)
-        if not job:
-            return
-        job["logs"].append(str(line))
-        job["last_log"] = str(line)
+    def _prune_job_files(self):
+        cutoff = time.time() - JOB_FILES_RETENTION_SECONDS
+        for path in self.jobs_dir.glob("*.json"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except Exception:
+                pass
 
+    def new_job(self) -> str:
+        self._prune_job_files()
+        job_id = uuid.uuid4().hex[:12]
+        with self._jobs_lock:
+            self._jobs[job_id] = {
+                "status": "queued",
+                "progress": 0,
+                "logs": [],
+                "last_log": "",
+                "result": None,
+                "error": None,
+            }
+        self._persist_job(job_id)
+        return job_id
+
+    def start_job(self, job_id: str, kind: str, fn):
+        th = threading.Thread(target=self._run_job, args=(job_id, kind, fn), daemon=True)
+        th.start()
+
+
+def create_app(
+    catalog_root: str | Path | None = None,
+    admin_token: str | None = None,
+    warm_snapshot: bool | None = None,
+) -> FastAPI:
+    """App publisher; par défaut CATALOG_ROOT / ADMIN_TOKEN / PUBLISHER_WARM_SNAPSHOT de l'env."""
+    root = detect_catalog_root(catalog_root)
+    token = admin_token or os.environ.get("ADMIN_TOKEN")
+    if not token:
+        # Contrat: on refuse de démarrer sans token
+        raise RuntimeError("ADMIN_TOKEN non configuré côté publisher")
+    publisher = Publisher(root, token, warm_snapshot)
+
+    @asynccontextmanager
+    async def lifespan(_app: FastAPI):
+        publisher.warm.start()
+        yield
+
+    app = FastAPI(title="Medilec Catalog Publisher", version="0.1", lifespan=lifespan)
+    app.state.publisher = publisher
+    app.include_router(router)
+    return app
+
+
+_default_app: FastAPI | None = None
+_default_app_lock = threading.Lock()
+
+
+def __getattr__(name: str):
+    # `app:app` (uvicorn, loadtest): app par défaut créée au premier accès
+    global _default_app
+    if name != "app":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _default_app_lock:
+        if _default_app is None:
+            _default_app = create_app()
+        return _default_app
+
+
+def get_publisher(request: Request) -> Publisher:
+    return request.app.state.publisher
+
+
+def require_admin_token(
+    x_admin_token: str | None = Header(default=None),
+    pub: Publisher = Depends(get_publisher),
+):
+    if not x_admin_token or x_admin_token != pub.admin_token:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return True
 
-def _job_progress(job_id: str, pct: int):
-    pct2 = max(0, min(100, int(pct)))
-    with _jobs_lock:
-        job = _jobs.get(job_id)
-        if not job:
-            return
-        job["progress"] = pct2
 
+_UPLOAD_ERROR_STATUS = {
+    "not_found": 404,
+    "too_large": 413,
+    "already_complete": 409,
+    "finalizing": 409,
+    "incomplete": 409,
+    "checksum_mismatch": 422,
+}
 
-def _set_job_state(job_id: str, **patch):
-    with _jobs_lock:
-        job = _jobs.get(job_id)
-        if not job:
-            return
-        job.update(patch)
 
+# Taille des écritures d'un bloc déléguées au threadpool
+_CHUNK_WRITE_BUFFER = 1024 * 1024
 
-def _write_job_log_file(job_id: str) -> Path:
-    stamp = now_stamp()
-    path = REPORTS_DIR / f"publish_{stamp}_{job_id}.log"
-    with _jobs_lock:
-        lines = list(_jobs.get(job_id, {}).get("logs") or [])
-    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
-    return path
 
+def _upload_http_error(e: UploadError) -> HTTPException:
+    return HTTPException(status_code=_UPLOAD_ERROR_STATUS.get(e.code, 400), detail=f"{e.code}: {e.message}")
 
-def _run_job(job_id: str, kind: str, fn):
-    _set_job_state(job_id, status="running", progress=1)
-    _job_log(job_id, f"Job {job_id} start ({kind})")
 
+def _resolve_upload(pub: Publisher, upload_id: str | None, multipart: UploadFile | None, field: str):
+    # Fichier référencé par un upload finalisé: vérifié avant de créer le job
+    if not upload_id:
+        return None
+    if multipart is not None:
+        raise HTTPException(status_code=400, detail=f"{field} et {field}_upload_id sont exclusifs")
     try:
-        result = fn()
-        _job_progress(job_id, 100)
-        _set_job_state(job_id, status="success", result=result, error=None)
-        _job_log(job_id, "SUCCESS")
-    except PublishError as e:
-        _set_job_state(
-            job_id,
-            status="error",
-            error={"code": e.code, "message": e.message},
-        )
-        _job_log(job_id, f"ERROR {e.code}: {e.message}")
-    except Exception as e:
-        _set_job_state(
-            job_id,
-            status="error",
-            error={"code": "internal", "message": str(e)},
-        )
-        _job_log(job_id, f"ERROR internal: {e}")
-    finally:
-        try:
-            _write_job_log_file(job_id)
-        except Exception:
-            # fail-soft
-            pass
+        return get_upload(pub.catalog_root, upload_id)
+    except UploadError as e:
+        raise _upload_http_error(e)
 
 
-def _new_job() -> str:
-    job_id = uuid.uuid4().hex[:12]
-    with _jobs_lock:
-        _jobs[job_id] = {
-            "status": "queued",
-            "progress": 0,
-            "logs": [],
-            "last_log": "",
-            "result": None,
-            "error": None,
-        }
-    return job_id
+def _discard_uploads(pub: Publisher, job_id: str, *stored):
+    # Après publication réussie: les fichiers sont copiés dans le catalogue (fail-soft)
+    for upload in stored:
+        if upload is None:
+            continue
+        try:
+            discard_upload(pub.catalog_root, upload.upload_id)
+        except Exception as e:
+            pub.job_log(job_id, f"WARN suppression upload {upload.upload_id} impossible: {e}")
 
 
-@app.get("/api/catalog/ping")
-def ping():
-    return {"ok": True}
+@router.get("/api/catalog/ping")
+def ping(pub: Publisher = Depends(get_publisher)):
+    # Ne bloque jamais sur le catalogue: cold / warming / ready / error
+    return {"ok": True, "catalog": pub.warm.status["state"]}
 
 
-@app.post("/api/catalog/products")
+@router.post("/api/catalog/products")
 def create(
     payload: str = Form(...),
-    image: UploadFile = File(...),
+    image: UploadFile | None = File(default=None),
     pdf: UploadFile | None = File(default=None),
     _auth=Depends(require_admin_token),
+    pub: Publisher = Depends(get_publisher),
 ):
     try:
         draft = DraftProduct.model_validate_json(payload)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"payload invalide: {e}")
 
+    image_stored = _resolve_upload(pub, draft.image_upload_id, image, "image")
+    pdf_stored = _resolve_upload(pub, draft.pdf_upload_id, pdf, "pdf")
+    if image is None and image_stored is None:
+        raise HTTPException(status_code=400, detail="image ou image_upload_id requis")
+
     # IMPORTANT: on copie les uploads en mémoire avant de retourner la réponse,
     # sinon Starlette peut fermer les streams de fichiers.
-    try:
-        image_bytes = image.file.read()
-    finally:
+    image_mem = None
+    if image is not None:
         try:
-            image.file.close()
-        except Exception:
-            pass
+            image_bytes = image.file.read()
+        finally:
+            try:
+                image.file.close()
+            except Exception:
+                pass
+        image_mem = _InMemUpload(image.filename, image_bytes)
 
     pdf_mem = None
     if pdf is not None:
@@ -172,27 +363,30 @@ def create(
                 pass
         pdf_mem = _InMemUpload(pdf.filename, pdf_bytes)
 
-    image_mem = _InMemUpload(image.filename, image_bytes)
+    job_id = pub.new_job()
 
-    job_id = _new_job()
+    def do(fence):
+        from publish_core import create_product
 
-    def do():
-        return create_product(
-            CATALOG_ROOT,
-            draft,
-            image_mem,
-            pdf_mem,
-            log=lambda s: _job_log(job_id, s),
-            progress=lambda p: _job_progress(job_id, p),
-        )
+        with ExitStack() as stack:
+            result = create_product(
+                pub.catalog_root,
+                draft,
+                image_mem or stack.enter_context(image_stored),
+                pdf_mem or (stack.enter_context(pdf_stored) if pdf_stored else None),
+                log=lambda s: pub.job_log(job_id, s),
+                progress=lambda p: pub.job_progress(job_id, p),
+                fence=fence,
+            )
+        _discard_uploads(pub, job_id, image_stored, pdf_stored)
+        return result
 
-    th = threading.Thread(target=_run_job, args=(job_id, "create", do), daemon=True)
-    th.start()
+    pub.start_job(job_id, "create", do)
 
     return {"jobId": job_id}
 
 
-@app.put("/api/catalog/products/{product_id}")
+@router.put("/api/catalog/products/{product_id}")
 def update(
     product_id: int,
     payload: str = Form(...),
@@ -200,6 +394,7 @@ def update(
     pdf: UploadFile | None = File(default=None),
     remove_pdf: str | None = Form(default=None),
     _auth=Depends(require_admin_token),
+    pub: Publisher = Depends(get_publisher),
 ):
     try:
         draft = DraftProduct.model_validate_json(payload)
@@ -207,6 +402,8 @@ def update(
         raise HTTPException(status_code=400, detail=f"payload invalide: {e}")
 
     remove = str(remove_pdf or "").strip().lower() in {"1", "true", "yes", "on"}
+    image_stored = _resolve_upload(pub, draft.image_upload_id, image, "image")
+    pdf_stored = _resolve_upload(pub, draft.pdf_upload_id, pdf, "pdf")
 
     image_mem = None
     if image is not None:
@@ -230,68 +427,229 @@ def update(
                 pass
         pdf_mem = _InMemUpload(pdf.filename, pdf_bytes)
 
-    job_id = _new_job()
+    job_id = pub.new_job()
 
-    def do():
-        return update_product(
-            CATALOG_ROOT,
-            int(product_id),
-            draft,
-            image_mem,
-            pdf_mem,
-            remove,
-            log=lambda s: _job_log(job_id, s),
-            progress=lambda p: _job_progress(job_id, p),
-        )
+    def do(fence):
+        from publish_core import update_product
 
-    th = threading.Thread(target=_run_job, args=(job_id, "update", do), daemon=True)
-    th.start()
+        with ExitStack() as stack:
+            result = update_product(
+                pub.catalog_root,
+                int(product_id),
+                draft,
+                image_mem or (stack.enter_context(image_stored) if image_stored else None),
+                pdf_mem or (stack.enter_context(pdf_stored) if pdf_stored else None),
+                remove,
+                log=lambda s: pub.job_log(job_id, s),
+                progress=lambda p: pub.job_progress(job_id, p),
+                fence=fence,
+            )
+        _discard_uploads(pub, job_id, image_stored, pdf_stored)
+        return result
+
+    pub.start_job(job_id, "update", do)
 
     return {"jobId": job_id}
 
 
-@app.delete("/api/catalog/products/{product_id}")
+@router.post("/api/catalog/uploads")
+def create_upload_session(body: UploadCreate, _auth=Depends(require_admin_token), pub: Publisher = Depends(get_publisher)):
+    try:
+        session = create_upload(pub.catalog_root, body.filename, body.size, body.chunk_size, body.sha256)
+    except UploadError as e:
+        raise _upload_http_error(e)
+    return {"uploadId": session["id"], "chunkSize": session["chunk_size"], "totalChunks": session["total_chunks"]}
+
+
+@router.get("/api/catalog/uploads/{upload_id}")
+def get_upload_session(upload_id: str, _auth=Depends(require_admin_token), pub: Publisher = Depends(get_publisher)):
+    try:
+        status = upload_status(pub.catalog_root, upload_id)
+    except UploadError as e:
+        raise _upload_http_error(e)
+    return {
+        "uploadId": status["id"],
+        "filename": status["filename"],
+        "size": status["size"],
+        "chunkSize": status["chunk_size"],
+        "totalChunks": status["total_chunks"],
+        "status": status["status"],
+        "sha256": status["sha256"],
+        "received": status["received"],
+        "missing": status["missing"],
+    }
+
+
+@router.put("/api/catalog/uploads/{upload_id}/chunks/{index}")
+async def put_upload_chunk(
+    upload_id: str,
+    index: int,
+    request: Request,
+    x_chunk_sha256: str | None = Header(default=None),
+    _auth=Depends(require_admin_token),
+    pub: Publisher = Depends(get_publisher),
+):
+    # Corps brut (pas de multipart) lu sur la boucle d'événements; les accès disque (session,
+    # fichier temporaire, écritures, os.replace) passent par le threadpool pour ne pas bloquer
+    # les autres requêtes du worker pendant un gros bloc.
+    try:
+        writer = await run_in_threadpool(ChunkWriter, pub.catalog_root, upload_id, index)
+    except UploadError as e:
+        raise _upload_http_error(e)
+    try:
+        buf = bytearray()
+        async for part in request.stream():
+            buf += part
+            if len(buf) >= _CHUNK_WRITE_BUFFER:
+                await run_in_threadpool(writer.write, bytes(buf))
+                buf.clear()
+        if buf:
+            await run_in_threadpool(writer.write, bytes(buf))
+        return {"uploadId": upload_id, **await run_in_threadpool(writer.commit, x_chunk_sha256)}
+    except UploadError as e:
+        raise _upload_http_error(e)
+    finally:
+        await run_in_threadpool(writer.abort)
+
+
+@router.post("/api/catalog/uploads/{upload_id}/complete")
+def complete_upload_session(upload_id: str, _auth=Depends(require_admin_token), pub: Publisher = Depends(get_publisher)):
+    try:
+        session = finalize_upload(pub.catalog_root, upload_id)
+    except UploadError as e:
+        raise _upload_http_error(e)
+    return {"uploadId": session["id"], "status": session["status"], "size": session["size"], "sha256": session["sha256"]}
+
+
+@router.delete("/api/catalog/uploads/{upload_id}")
+def delete_upload_session(upload_id: str, _auth=Depends(require_admin_token), pub: Publisher = Depends(get_publisher)):
+    try:
+        discarded = discard_upload(pub.catalog_root, upload_id)
+    except UploadError as e:
+        raise _upload_http_error(e)
+    if not discarded:
+        raise HTTPException(status_code=404, detail=f"not_found: upload introuvable: {upload_id}")
+    return {"uploadId": upload_id, "status": "deleted"}
+
+
+@router.delete("/api/catalog/products/{product_id}")
 def delete(
     product_id: int,
+    cascade: bool = False,
     _auth=Depends(require_admin_token),
+    pub: Publisher = Depends(get_publisher),
 ):
-    job_id = _new_job()
+    job_id = pub.new_job()
+
+    def do(fence):
+        from publish_core import delete_product
 
-    def do():
         return delete_product(
-            CATALOG_ROOT,
+            pub.catalog_root,
             int(product_id),
-            log=lambda s: _job_log(job_id, s),
-            progress=lambda p: _job_progress(job_id, p),
+            log=lambda s: pub.job_log(job_id, s),
+            progress=lambda p: pub.job_progress(job_id, p),
+            fence=fence,
+            cascade=cascade,
         )
 
-    th = threading.Thread(target=_run_job, args=(job_id, "delete", do), daemon=True)
-    th.start()
+    pub.start_job(job_id, "delete", do)
 
     return {"jobId": job_id}
 
 
-@app.get("/api/catalog/jobs/{job_id}")
-def get_job(job_id: str):
-    with _jobs_lock:
-        raw = _jobs.get(job_id)
-        if not raw:
-            raise HTTPException(status_code=404, detail="job introuvable")
-        state = JobState(
-            status=raw["status"],
-            progress=int(raw.get("progress") or 0),
-            last_log=str(raw.get("last_log") or ""),
-            result=raw.get("result"),
-            error=JobError(**raw["error"]) if raw.get("error") else None,
+@router.patch("/api/catalog/taxonomies/{kind}/{taxonomy_id}")
+def patch_taxonomy(
+    kind: str,
+    taxonomy_id: int,
+    body: TaxonomyRename,
+    _auth=Depends(require_admin_token),
+    pub: Publisher = Depends(get_publisher),
+):
+    if kind not in TAXONOMY_KINDS:
+        raise HTTPException(status_code=404, detail=f"taxonomie inconnue: {kind}")
+
+    job_id = pub.new_job()
+
+    def do(fence):
+        from publish_core import rename_taxonomy
+
+        return rename_taxonomy(
+            pub.catalog_root,
+            kind,
+            int(taxonomy_id),
+            body.name,
+            log=lambda s: pub.job_log(job_id, s),
+            progress=lambda p: pub.job_progress(job_id, p),
+            fence=fence,
         )
+
+    pub.start_job(job_id, "taxonomy", do)
+
+    return {"jobId": job_id}
+
+
+_EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+@router.get("/api/catalog/export")
+def export_catalog(
+    format: str = "ndjson",
+    fields: str | None = None,
+    active: bool | None = None,
+    manufacturer_id: int | None = None,
+    category_id: int | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    gzip: bool = False,
+    _auth=Depends(require_admin_token),
+    pub: Publisher = Depends(get_publisher),
+):
+    # Lecture seule: pas de job ni de bail, les fichiers sont remplacés atomiquement.
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format inconnu: {format}")
+    try:
+        selected = parse_fields(fields)
+    except ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    body = stream_export(
+        pub.catalog_root,
+        fmt=format,
+        fields=selected,
+        gzip=gzip,
+        active=active,
+        manufacturer_id=manufacturer_id,
+        category_id=category_id,
+        min_price=min_price,
+        max_price=max_price,
+        products_index=pub.warm.peek("products_index"),
+    )
+    headers = {"Content-Disposition": f'attachment; filename="catalog_{now_stamp()}.{format}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=_EXPORT_MEDIA_TYPES[format], headers=headers)
+
+
+@router.get("/api/catalog/jobs/{job_id}")
+def get_job(job_id: str, pub: Publisher = Depends(get_publisher)):
+    raw = pub.lookup_job(job_id)
+    if not raw:
+        raise HTTPException(status_code=404, detail="job introuvable")
+    state = JobState(
+        status=raw["status"],
+        progress=int(raw.get("progress") or 0),
+        last_log=str(raw.get("last_log") or ""),
+        result=raw.get("result"),
+        error=JobError(**raw["error"]) if raw.get("error") else None,
+    )
     return state.model_dump()
 
 
-@app.get("/api/catalog/jobs/{job_id}/log", response_class=PlainTextResponse)
-def get_job_log(job_id: str):
-    with _jobs_lock:
-        raw = _jobs.get(job_id)
-        if not raw:
-            raise HTTPException(status_code=404, detail="job introuvable")
-        lines = list(raw.get("logs") or [])
+@router.get("/api/catalog/jobs/{job_id}/log", response_class=PlainTextResponse)
+def get_job_log(job_id: str, pub: Publisher = Depends(get_publisher)):
+    raw = pub.lookup_job(job_id)
+    if not raw:
+        raise HTTPException(status_code=404, detail="job introuvable")
+    lines = list(raw.get("logs") or [])
     return "\n".join(lines) + ("\n" if lines else "")
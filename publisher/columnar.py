@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+# Export colonnaire binaire de index.products.json (index.products.bin).
+#
+# Format (little-endian, chaque colonne alignée sur 8 octets pour des vues TypedArray directes):
+#   0   magic  b"MDLCOL1\0"
+#   8   uint32 longueur du header JSON
+#   12  uint32 réservé (0)
+#   16  header JSON utf-8: {"version", "count", "columns": {nom: {"type", "offset", "length"}}}
+#   ... colonnes (offsets absolus depuis le début du fichier)
+#
+# Colonnes:
+#   id (int32), price_ht (float64), manufacturer_id (int32, -1 si aucun), active (uint8),
+#   category_offsets (uint32, count+1) + category_ids (int32)   -> layout CSR
+#   name_offsets (uint32, count+1) + name_bytes (uint8, utf-8)   -> table de chaînes
+
+import json
+import mmap
+import sys
+from array import array
+from collections.abc import Mapping
+from pathlib import Path
+
+from utils import atomic_write_bytes, read_json, resolve_catalog_root
+
+MAGIC = b"MDLCOL1\0"
+VERSION = 1
+COLUMNAR_FILENAME = "index.products.bin"
+
+_TYPECODES = {"int32": "i", "uint32": "I", "float64": "d", "uint8": "B"}
+for _t, _code in _TYPECODES.items():
+    assert array(_code).itemsize == {"int32": 4, "uint32": 4, "float64": 8, "uint8": 1}[_t]
+
+
+def _pad8(n: int) -> int:
+    return (8 - n % 8) % 8
+
+
+def _to_le_bytes(arr: array) -> bytes:
+    if sys.byteorder != "little" and arr.itemsize > 1:
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _int_or(value, default: int) -> int:
+    try:
+        return int(value)
+    except Exception:
+        return default
+
+
+def build_columnar(products_index: list) -> bytes:
+    ids = array("i")
+    prices = array("d")
+    manufacturer_ids = array("i")
+    active = array("B")
+    category_offsets = array("I", [0])
+    category_ids = array("i")
+    name_offsets = array("I", [0])
+    name_bytes = bytearray()
+
+    for item in products_index:
+        if not isinstance(item, Mapping):
+            continue
+        try:
+            pid = int(item.get("id"))
+        except Exception:
+            continue
+
+        ids.append(pid)
+        try:
+            prices.append(float(item.get("price_ht")))
+        except Exception:
+            prices.append(float("nan"))
+        manufacturer_id = _int_or(item.get("manufacturer_id"), -1)
+        manufacturer_ids.append(manufacturer_id if manufacturer_id > 0 else -1)
+        active.append(1 if item.get("active") else 0)
+
+        for cid in item.get("category_ids") or []:
+            try:
+                category_ids.append(int(cid))
+            except Exception:
+                continue
+        category_offsets.append(len(category_ids))
+
+        name_bytes += str(item.get("name") or "").encode("utf-8")
+        name_offsets.append(len(name_bytes))
+
+    columns = [
+        ("id", "int32", _to_le_bytes(ids), len(ids)),
+        ("price_ht", "float64", _to_le_bytes(prices), len(prices)),
+        ("manufacturer_id", "int32", _to_le_bytes(manufacturer_ids), len(manufacturer_ids)),
+        ("active", "uint8", active.tobytes(), len(active)),
+        ("category_offsets", "uint32", _to_le_bytes(category_offsets), len(category_offsets)),
+        ("category_ids", "int32", _to_le_bytes(category_ids), len(category_ids)),
+        ("name_offsets", "uint32", _to_le_bytes(name_offsets), len(name_offsets)),
+        ("name_bytes", "uint8", bytes(name_bytes), len(name_bytes)),
+    ]
+
+    # Le header contient les offsets, qui dépendent de sa propre taille: on itère jusqu'à stabilité.
+    header_len = 0
+    while True:
+        offset = 16 + header_len + _pad8(16 + header_len)
+        directory = {}
+        for name, typ, data, length in columns:
+            directory[name] = {"type": typ, "offset": offset, "length": length}
+            offset += len(data) + _pad8(len(data))
+        header = json.dumps(
+            {"version": VERSION, "count": len(ids), "columns": directory},
+            separators=(",", ":"),
+        ).encode("utf-8")
+        if len(header) == header_len:
+            break
+        header_len = len(header)
+
+    out = bytearray(MAGIC)
+    out += len(header).to_bytes(4, "little") + (0).to_bytes(4, "little")
+    out += header + b"\0" * _pad8(len(out) + len(header))
+    for _name, _typ, data, _length in columns:
+        out += data + b"\0" * _pad8(len(data))
+    return bytes(out)
+
+
+def write_columnar_index(catalog_root: Path, products_index: list) -> Path:
+    path = catalog_root / COLUMNAR_FILENAME
+    atomic_write_bytes(path, build_columnar(products_index))
+    return path
+
+
+class ColumnarIndex:
+    """Lecture mmap de index.products.bin: colonnes exposées en memoryview typées (sans copie)."""
+
+    def __init__(self, path: Path):
+        if sys.byteorder != "little":
+            raise RuntimeError("ColumnarIndex: lecture mmap supportée uniquement en little-endian")
+        self._views: dict[str, memoryview] = {}
+        self._raw_views: list[memoryview] = []
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:8] != MAGIC:
+            self.close()
+            raise ValueError(f"{path}: format colonnaire inconnu")
+        header_len = int.from_bytes(self._mm[8:12], "little")
+        header = json.loads(bytes(self._mm[16 : 16 + header_len]).decode("utf-8"))
+        self.count: int = int(header["count"])
+        self._columns: dict = header["columns"]
+
+    def column(self, name: str) -> memoryview:
+        view = self._views.get(name)
+        if view is None:
+            meta = self._columns[name]
+            code = _TYPECODES[meta["type"]]
+            size = array(code).itemsize
+            start = int(meta["offset"])
+            raw = memoryview(self._mm)[start : start + int(meta["length"]) * size]
+            self._raw_views.append(raw)
+            view = raw.cast(code)
+            self._views[name] = view
+        return view
+
+    def categories(self, row: int) -> memoryview:
+        offsets = self.column("category_offsets")
+        return self.column("category_ids")[offsets[row] : offsets[row + 1]]
+
+    def name(self, row: int) -> str:
+        offsets = self.column("name_offsets")
+        return bytes(self.column("name_bytes")[offsets[row] : offsets[row + 1]]).decode("utf-8")
+
+    def close(self) -> None:
+        # NB: les slices obtenues via column() doivent être libérées avant close()
+        for view in [*self._views.values(), *self._raw_views]:
+            view.release()
+        self._views.clear()
+        self._raw_views.clear()
+        try:
+            self._mm.close()
+        finally:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    # Régénère index.products.bin depuis index.products.json
+    args = list(sys.argv[1:] if argv is None else argv)
+    root = resolve_catalog_root(args[0] if args else None)
+
+    products_index = read_json(root / "index.products.json")
+    path = write_columnar_index(root, products_index)
+    print(f"{path}: {path.stat().st_size} octets")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+# Socle commun des index dérivés de products/*.json (index.relations.json, .publisher/taxonomy.json):
+#   - reconstruction par scan complet des documents produits
+#   - chargement avec repli sur le scan si le fichier est absent ou illisible
+#   - listes inverses {"<id>": [pid, ...]} triées, mises à jour incrémentalement
+#   - main() de reconstruction en ligne de commande
+
+import sys
+from pathlib import Path
+from typing import Callable, Iterator
+
+from lease import CatalogLease
+from utils import atomic_write_json, read_json, resolve_catalog_root
+
+
+def iter_products(catalog_root: Path) -> Iterator[tuple[int, dict]]:
+    """(id, document) de chaque products/*.json lisible, par nom de fichier."""
+    for path in sorted((catalog_root / "products").glob("*.json")):
+        try:
+            product = read_json(path)
+            pid = int(product.get("id"))
+        except Exception:
+            continue
+        yield pid, product
+
+
+def load_or_rebuild(path: Path, buckets: tuple[str, ...], rebuild: Callable[[], dict]) -> dict:
+    """Index tel qu'écrit sur disque si chaque clé de buckets est un objet, sinon rebuild()."""
+    if path.exists():
+        try:
+            payload = read_json(path)
+        except Exception:
+            payload = None
+        if isinstance(payload, dict) and all(isinstance(payload.get(k), dict) for k in buckets):
+            return payload
+    return rebuild()
+
+
+def save_index(path: Path, index: dict) -> None:
+    atomic_write_json(path, index)
+
+
+def link(bucket: dict, key: int, pid: int) -> None:
+    bucket[str(key)] = sorted({*(bucket.get(str(key)) or []), pid})
+
+
+def unlink(bucket: dict, key: int, pid: int) -> None:
+    refs = [p for p in bucket.get(str(key)) or [] if p != pid]
+    if refs:
+        bucket[str(key)] = refs
+    else:
+        bucket.pop(str(key), None)
+
+
+def rebuild_main(
+    argv: list[str] | None,
+    build: Callable[[Path], dict],
+    path_for: Callable[[Path], Path],
+    summary: Callable[[dict], str],
+) -> int:
+    # Usage: python publisher/<module>.py [CATALOG_ROOT]
+    args = list(sys.argv[1:] if argv is None else argv)
+    root = resolve_catalog_root(args[0] if args else None)
+    with CatalogLease(root).hold():
+        index = build(root)
+        save_index(path_for(root), index)
+    print(f"{path_for(root)}: {summary(index)}")
+    return 0
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+# Export du catalogue en streaming (NDJSON / CSV, gzip optionnel).
+#
+# - présélection par les index (index.products.json, .publisher/taxonomy.json): aucun document
+#   produit n'est lu pour les lignes filtrées
+# - lecture paresseuse des products/*.json avec read-ahead borné sur un petit thread pool
+# - sortie en générateur de blocs d'octets: mémoire constante quel que soit le catalogue
+#
+# Usage: python publisher/export.py [--format ndjson|csv] [--fields id,name,...] [--active 1]
+#            [--manufacturer-id N] [--category-id N] [--min-price X] [--max-price X]
+#            [--gzip] [--catalog-root PATH] > export.ndjson
+
+import argparse
+import csv
+import io
+import json
+import sys
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from records import ProductIndexRecord, RecordIndex, load_index
+from taxonomy import load_taxonomy_index, products_for
+from utils import pad6, read_json, resolve_catalog_root
+
+EXPORT_FORMATS = ("ndjson", "csv")
+READ_AHEAD = 32
+READ_WORKERS = 4
+_CHUNK_BYTES = 64 * 1024
+# Séparateur des listes en CSV (catégories, PDFs...)
+CSV_LIST_SEPARATOR = "|"
+
+
+def _categories(p: dict) -> list[dict]:
+    return [c for c in p.get("categories") or [] if isinstance(c, dict)]
+
+
+EXPORT_FIELDS: dict[str, Callable[[dict], object]] = {
+    "id": lambda p: p.get("id"),
+    "slug": lambda p: p.get("slug"),
+    "active": lambda p: bool(p.get("active")),
+    "reference": lambda p: p.get("reference"),
+    "name": lambda p: p.get("name"),
+    "price_ht": lambda p: (p.get("pricing") or {}).get("price_ht"),
+    "price_ttc": lambda p: (p.get("pricing") or {}).get("price_ttc"),
+    "currency": lambda p: (p.get("pricing") or {}).get("currency"),
+    "manufacturer_id": lambda p: (p.get("manufacturer") or {}).get("id"),
+    "manufacturer_name": lambda p: (p.get("manufacturer") or {}).get("name"),
+    "category_ids": lambda p: [c.get("id") for c in _categories(p)],
+    "category_names": lambda p: [c.get("name") for c in _categories(p)],
+    "excerpt": lambda p: (p.get("descriptions") or {}).get("excerpt"),
+    "accessories": lambda p: list((p.get("relations") or {}).get("accessories") or []),
+    "pdfs": lambda p: list((p.get("media") or {}).get("pdfs") or []),
+}
+DEFAULT_FIELDS = ("id", "reference", "name", "price_ht", "currency", "manufacturer_name", "active")
+
+
+class ExportError(ValueError):
+    pass
+
+
+def parse_fields(value: str | None) -> list[str]:
+    if not value:
+        return list(DEFAULT_FIELDS)
+    fields = [f.strip() for f in str(value).split(",") if f.strip()]
+    unknown = [f for f in fields if f not in EXPORT_FIELDS]
+    if unknown:
+        raise ExportError(f"champs inconnus: {unknown} (disponibles: {', '.join(EXPORT_FIELDS)})")
+    return fields
+
+
+def select_ids(
+    catalog_root: Path,
+    active: bool | None = None,
+    manufacturer_id: int | None = None,
+    category_id: int | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    products_index: RecordIndex | None = None,
+) -> Iterator[int]:
+    """Ids à exporter, dans l'ordre de index.products.json, filtrés sans lire les documents.
+
+    products_index: index déjà en mémoire (catalogue chaud de l'app), sinon relu du disque.
+    """
+    allowed: set[int] | None = None
+    if manufacturer_id is not None or category_id is not None:
+        tax_index = load_taxonomy_index(catalog_root)
+        if manufacturer_id is not None:
+            allowed = set(products_for(tax_index, "manufacturers", manufacturer_id))
+        if category_id is not None:
+            # catégorie et sous-catégories (l'index couvre les ancêtres des breadcrumbs)
+            in_cat = set(products_for(tax_index, "categories", category_id))
+            allowed = in_cat if allowed is None else allowed & in_cat
+
+    if products_index is None:
+        products_index = load_index(catalog_root / "index.products.json", ProductIndexRecord)
+    for item in products_index:
+        try:
+            pid = int(item.get("id"))
+        except Exception:
+            continue
+        if allowed is not None and pid not in allowed:
+            continue
+        if active is not None and bool(item.get("active")) != active:
+            continue
+        if min_price is not None or max_price is not None:
+            try:
+                price = float(item.get("price_ht"))
+            except Exception:
+                continue
+            if min_price is not None and price < min_price:
+                continue
+            if max_price is not None and price > max_price:
+                continue
+        yield pid
+
+
+def _read_product(catalog_root: Path, pid: int) -> dict | None:
+    try:
+        return read_json(catalog_root / "products" / f"{pad6(pid)}.json")
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def iter_products(
+    catalog_root: Path, ids: Iterable[int], read_ahead: int = READ_AHEAD, workers: int = READ_WORKERS
+) -> Iterator[dict]:
+    """Documents produits dans l'ordre de ids; au plus read_ahead lectures en vol."""
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="export-read") as pool:
+        pending: deque = deque()
+        for pid in ids:
+            pending.append(pool.submit(_read_product, catalog_root, pid))
+            if len(pending) >= read_ahead:
+                product = pending.popleft().result()
+                if product is not None:
+                    yield product
+        while pending:
+            product = pending.popleft().result()
+            if product is not None:
+                yield product
+
+
+def iter_rows(products: Iterable[dict], fields: list[str]) -> Iterator[dict]:
+    getters = [(f, EXPORT_FIELDS[f]) for f in fields]
+    for product in products:
+        yield {f: getter(product) for f, getter in getters}
+
+
+def iter_ndjson(rows: Iterable[dict]) -> Iterator[bytes]:
+    buf: list[str] = []
+    size = 0
+    for row in rows:
+        line = json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n"
+        buf.append(line)
+        size += len(line)
+        if size >= _CHUNK_BYTES:
+            yield "".join(buf).encode("utf-8")
+            buf, size = [], 0
+    if buf:
+        yield "".join(buf).encode("utf-8")
+
+
+def _csv_value(value) -> object:
+    if isinstance(value, list):
+        return CSV_LIST_SEPARATOR.join("" if v is None else str(v) for v in value)
+    if isinstance(value, bool):
+        return 1 if value else 0
+    return "" if value is None else value
+
+
+def iter_csv(rows: Iterable[dict], fields: list[str]) -> Iterator[bytes]:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(fields)
+    for row in rows:
+        writer.writerow([_csv_value(row.get(f)) for f in fields])
+        if out.tell() >= _CHUNK_BYTES:
+            yield out.getvalue().encode("utf-8")
+            out.seek(0)
+            out.truncate()
+    if out.tell():
+        yield out.getvalue().encode("utf-8")
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    z = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: en-tête gzip
+    for chunk in chunks:
+        data = z.compress(chunk)
+        if data:
+            yield data
+    yield z.flush()
+
+
+def stream_export(
+    catalog_root: Path,
+    fmt: str = "ndjson",
+    fields: list[str] | None = None,
+    gzip: bool = False,
+    **filters,
+) -> Iterator[bytes]:
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"format inconnu: {fmt} ({', '.join(EXPORT_FORMATS)})")
+    fields = list(fields or DEFAULT_FIELDS)
+    rows = iter_rows(iter_products(catalog_root, select_ids(catalog_root, **filters)), fields)
+    chunks = iter_ndjson(rows) if fmt == "ndjson" else iter_csv(rows, fields)
+    return gzip_chunks(chunks) if gzip else chunks
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Export du catalogue (NDJSON / CSV) sur la sortie standard")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    parser.add_argument("--fields", default=None, help=f"parmi: {', '.join(EXPORT_FIELDS)}")
+    parser.add_argument("--active", choices=["0", "1"], default=None)
+    parser.add_argument("--manufacturer-id", type=int, default=None)
+    parser.add_argument("--category-id", type=int, default=None)
+    parser.add_argument("--min-price", type=float, default=None)
+    parser.add_argument("--max-price", type=float, default=None)
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--catalog-root", default=None)
+    args = parser.parse_args(argv)
+
+    root = resolve_catalog_root(args.catalog_root)
+
+    try:
+        fields = parse_fields(args.fields)
+    except ExportError as e:
+        parser.error(str(e))
+
+    out = sys.stdout.buffer
+    for chunk in stream_export(
+        root,
+        fmt=args.format,
+        fields=fields,
+        gzip=args.gzip,
+        active=None if args.active is None else args.active == "1",
+        manufacturer_id=args.manufacturer_id,
+        category_id=args.category_id,
+        min_price=args.min_price,
+        max_price=args.max_price,
+    ):
+        out.write(chunk)
+    out.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import hashlib
+import html
+import json
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from html.parser import HTMLParser
+from pathlib import Path
+
+from lease import state_dir
+from utils import atomic_write_json, ensure_dir
+
+# Étape de normalisation HTML au publish: un seul passage (parser streaming de la stdlib)
+# produit la version minifiée/sanitisée, l'extrait texte et le texte de recherche.
+# Les résultats sont mis en cache par empreinte (sha256) du HTML brut:
+#   - en mémoire (LRU, CACHE_MAX_ENTRIES)
+#   - sur disque si use_persistent_cache() a été appelé: .publisher/html_cache/v<N>/ab/<sha>.json,
+#     un fichier par entrée (écriture atomique), partagé entre redémarrages, workers
+#     uvicorn et processus de l'importer. CACHE_VERSION change quand les règles changent.
+
+EXCERPT_MAX_CHARS = 200
+CACHE_MAX_ENTRIES = 4096
+CACHE_VERSION = 1
+CACHE_RETENTION_SECONDS = 30 * 24 * 3600
+
+_ALLOWED_TAGS = {
+    "a", "b", "blockquote", "br", "div", "em", "h1", "h2", "h3", "h4", "h5", "h6", "hr", "i", "img",
+    "li", "ol", "p", "small", "span", "strong", "sub", "sup", "table", "tbody", "td", "th", "thead",
+    "tr", "u", "ul",
+}
+_VOID_TAGS = {"br", "hr", "img"}
+_BLOCK_TAGS = {
+    "blockquote", "br", "div", "h1", "h2", "h3", "h4", "h5", "h6", "hr", "li", "ol", "p", "table",
+    "tbody", "td", "th", "thead", "tr", "ul",
+}
+# Contenu supprimé entièrement (pas seulement la balise)
+_DROP_CONTENT_TAGS = {"script", "style", "iframe", "object", "embed", "noscript", "template"}
+_ALLOWED_ATTRS = {
+    "a": {"href", "title", "target", "rel"},
+    "img": {"src", "alt", "title", "width", "height"},
+    "td": {"colspan", "rowspan"},
+    "th": {"colspan", "rowspan"},
+}
+_URL_ATTRS = {"href", "src"}
+_SAFE_URL_RE = re.compile(r"^(https?:|mailto:|tel:|/|#|[^:/?#]*(?:[/?#]|$))", re.IGNORECASE)
+_WS_RE = re.compile(r"\s+")
+
+
+@dataclass(frozen=True)
+class HtmlResult:
+    html: str
+    text: str
+    excerpt: str
+
+
+class _Normalizer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._out: list[str] = []
+        self._text: list[str] = []
+        self._stack: list[str] = []
+        self._drop_depth = 0
+        self._after_block = True
+
+    def _trim_trailing_space(self) -> None:
+        if self._out and self._out[-1].endswith(" "):
+            self._out[-1] = self._out[-1].rstrip(" ")
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _DROP_CONTENT_TAGS:
+            self._drop_depth += 1
+            return
+        if self._drop_depth:
+            return
+
+        self._text.append(" ")
+        if tag not in _ALLOWED_TAGS:
+            return
+
+        if tag in _BLOCK_TAGS:
+            self._trim_trailing_space()
+            self._after_block = True
+
+        kept = []
+        allowed = _ALLOWED_ATTRS.get(tag, set())
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            value = value.strip()
+            if name in _URL_ATTRS and not _SAFE_URL_RE.match(value):
+                continue
+            kept.append(f' {name}="{html.escape(value, quote=True)}"')
+
+        self._out.append(f"<{tag}{''.join(kept)}>")
+        if tag not in _VOID_TAGS:
+            self._stack.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_TAGS and self._stack and self._stack[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in _DROP_CONTENT_TAGS:
+            self._drop_depth = max(0, self._drop_depth - 1)
+            return
+        if self._drop_depth:
+            return
+
+        self._text.append(" ")
+        if tag not in self._stack:
+            return
+
+        # ferme les balises restées ouvertes jusqu'à celle-ci (HTML mal imbriqué)
+        while self._stack:
+            open_tag = self._stack.pop()
+            if open_tag in _BLOCK_TAGS:
+                self._trim_trailing_space()
+            self._out.append(f"</{open_tag}>")
+            if open_tag == tag:
+                break
+        if tag in _BLOCK_TAGS:
+            self._after_block = True
+
+    def handle_data(self, data):
+        if self._drop_depth:
+            return
+        text = _WS_RE.sub(" ", data)
+        if self._after_block:
+            text = text.lstrip(" ")
+        if not text:
+            return
+        self._after_block = False
+        self._out.append(html.escape(text, quote=False))
+        self._text.append(text)
+
+    def result(self) -> tuple[str, str]:
+        while self._stack:
+            open_tag = self._stack.pop()
+            self._out.append(f"</{open_tag}>")
+        out = "".join(self._out).strip()
+        text = _WS_RE.sub(" ", "".join(self._text)).strip()
+        return out, text
+
+
+def _excerpt(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    space = cut.rfind(" ")
+    if space > max_chars // 2:
+        cut = cut[:space]
+    return cut.rstrip(" ,;:.-") + "…"
+
+
+_cache_lock = threading.Lock()
+_cache: OrderedDict[str, HtmlResult] = OrderedDict()
+_cache_dir: Path | None = None
+
+
+def html_cache_root(catalog_root: Path) -> Path:
+    return state_dir(catalog_root) / "html_cache"
+
+
+def use_persistent_cache(catalog_root: Path | None) -> None:
+    """Active (ou désactive avec None) le cache disque du processus courant."""
+    global _cache_dir
+    _cache_dir = html_cache_root(catalog_root) / f"v{CACHE_VERSION}" if catalog_root is not None else None
+
+
+def _disk_path(key: str) -> Path | None:
+    return _cache_dir / key[:2] / f"{key}.json" if _cache_dir is not None else None
+
+
+def _disk_get(key: str) -> HtmlResult | None:
+    path = _disk_path(key)
+    if path is None:
+        return None
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            return HtmlResult(**json.load(f))
+    except Exception:
+        return None
+
+
+def _disk_put(key: str, res: HtmlResult) -> None:
+    path = _disk_path(key)
+    if path is None:
+        return
+    try:
+        ensure_dir(path.parent)
+        atomic_write_json(path, asdict(res))
+    except Exception:
+        # fail-soft: le résultat reste valable, seul le cache disque manque
+        pass
+
+
+def prune_persistent_cache(catalog_root: Path, max_age: float = CACHE_RETENTION_SECONDS) -> int:
+    """Supprime les versions de cache obsolètes et les entrées plus anciennes que max_age."""
+    root = html_cache_root(catalog_root)
+    if not root.exists():
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for version_dir in root.iterdir():
+        if version_dir.name != f"v{CACHE_VERSION}":
+            shutil.rmtree(version_dir, ignore_errors=True)
+            continue
+        for path in version_dir.glob("*/*.json"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+def _normalize_uncached(raw: str) -> HtmlResult:
+    parser = _Normalizer()
+    parser.feed(raw)
+    parser.close()
+    out, text = parser.result()
+    return HtmlResult(html=out, text=text, excerpt=_excerpt(text, EXCERPT_MAX_CHARS))
+
+
+def normalize_html(raw: str | None) -> HtmlResult:
+    """Minifie/sanitise un fragment HTML et en extrait le texte (résultat mis en cache)."""
+    value = raw or ""
+    key = hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None:
+            _cache.move_to_end(key)
+            return hit
+
+    res = _disk_get(key)
+    if res is None:
+        res = _normalize_uncached(value)
+        _disk_put(key, res)
+
+    with _cache_lock:
+        _cache[key] = res
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return res
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,655 @@
+from __future__ import annotations
+
+# Import/re-synchronisation du catalogue depuis un dump PrestaShop (SQL mysqldump ou CSV).
+#
+# - lecture en streaming ligne à ligne (gzip accepté), sans charger le dump en mémoire
+# - transformation des produits en parallèle (process pool) vers le même JSON que create_product
+# - copie des images en parallèle (thread pool borné)
+# - écriture des index une seule fois à la fin, sous le bail catalogue
+#
+# SQL: deux passes sur le fichier. La 1re collecte les tables légères (ps_product,
+# ps_category_product, ps_image, ps_accessory), la 2e streame ps_product_lang (HTML lourd).
+# CSV: une ligne = un produit, colonnes: id, active, name, slug, reference, price_ht,
+# manufacturer_id, category_ids, short_html, long_html, image_ids, accessories
+# (listes séparées par des virgules).
+#
+# Usage:
+#   python publisher/importer.py DUMP.sql[.gz]|DUMP.csv --img-dir /chemin/prestashop/img/p
+#       [--format sql|csv] [--prefix ps_] [--lang 1] [--workers N] [--copy-threads 8]
+#       [--prune] [--catalog-root PATH]
+
+import argparse
+import csv
+import gzip
+import io
+import os
+import re
+import shutil
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from html_stage import prune_persistent_cache, use_persistent_cache
+from lease import CatalogLease
+from manifest import build_manifest, load_manifest, manifest_path
+from models import DraftProduct
+from publish_core import (
+    build_description_fragment,
+    build_index_item,
+    build_product_json,
+    build_search_item,
+    category_maps,
+    description_fragment_rel,
+    hash_entry,
+    load_catalog,
+    load_hashes,
+    manufacturer_map,
+    resolve_taxonomy,
+    save_hashes,
+    save_relations,
+    write_products_index,
+)
+from records import ProductIndexRecord, RecordIndex, SearchRecord
+from relations import load_relations, set_accessories
+from similar import SimilarUnavailable, build_related
+from taxonomy import load_taxonomy_index, product_category_ids, save_taxonomy_index, set_product
+from taxonomy import remove_product as remove_taxonomy_product
+from utils import (
+    atomic_write_json,
+    ensure_dir,
+    now_stamp,
+    pad6,
+    read_json,
+    resolve_catalog_root,
+    slugify_ascii,
+)
+
+LogFn = Callable[[str], None]
+
+_IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".webp", ".gif")
+
+
+# ---------------------------------------------------------------------------
+# Lecture SQL en streaming
+
+
+_TOKEN_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|[(),;]|[^'(),;\s]+|\s+", re.S)
+_CREATE_RE = re.compile(r"^CREATE TABLE (?:IF NOT EXISTS )?`?(\w+)`?", re.I)
+_INSERT_RE = re.compile(r"^(?:INSERT|REPLACE)(?: IGNORE)? INTO `?(\w+)`?\s*(?:\(([^)]*)\))?\s*VALUES\s*", re.I)
+_COLUMN_RE = re.compile(r"^\s*`(\w+)`")
+_ESC_RE = re.compile(r"\\(.)|''", re.S)
+_ESCAPES = {"0": "\0", "b": "\b", "n": "\n", "r": "\r", "t": "\t", "Z": "\x1a"}
+
+
+def _open_text(path: Path):
+    if path.suffix == ".gz":
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8", errors="replace", newline="")
+    return path.open("r", encoding="utf-8", errors="replace", newline="")
+
+
+def _unquote(tok: str) -> str:
+    body = tok[1:-1]
+    if "\\" not in body and "''" not in body:
+        return body
+    return _ESC_RE.sub(lambda m: "'" if m.group(0) == "''" else _ESCAPES.get(m.group(1), m.group(1)), body)
+
+
+def _parse_values(buf: str, pos: int, lines: Iterator[str], columns: list[str] | None) -> Iterator[dict]:
+    # Consomme les tuples d'un INSERT jusqu'au ';' final (les chaînes peuvent couvrir plusieurs lignes).
+    depth = 0
+    row: list = []
+    while True:
+        m = _TOKEN_RE.match(buf, pos)
+        if m is None:
+            # chaîne non terminée (ou fin de ligne): on complète avec la ligne suivante
+            nxt = next(lines, None)
+            if nxt is None:
+                return
+            buf = buf[pos:] + nxt
+            pos = 0
+            continue
+
+        tok = m.group(0)
+        pos = m.end()
+        c = tok[0]
+        if c.isspace():
+            continue
+        if c == "(":
+            depth += 1
+            if depth == 1:
+                row = []
+        elif c == ")":
+            depth -= 1
+            if depth == 0 and columns is not None:
+                if len(row) == len(columns):
+                    yield dict(zip(columns, row))
+        elif c == ",":
+            continue
+        elif c == ";":
+            if depth == 0:
+                return
+        elif columns is None:
+            continue
+        elif c == "'":
+            row.append(_unquote(tok))
+        elif tok.upper() == "NULL":
+            row.append(None)
+        elif c == "_":
+            # introducteur de charset (_binary'...', _utf8mb4'...')
+            continue
+        else:
+            row.append(tok)
+
+        if pos >= len(buf):
+            nxt = next(lines, None)
+            if nxt is None:
+                return
+            buf, pos = nxt, 0
+
+
+def iter_sql_rows(path: Path, tables: set[str]) -> Iterator[tuple[str, dict]]:
+    """Itère (table, ligne) pour les tables demandées d'un dump mysqldump/phpMyAdmin."""
+    columns_by_table: dict[str, list[str]] = {}
+    with _open_text(path) as f:
+        lines = iter(f)
+        for line in lines:
+            m = _CREATE_RE.match(line)
+            if m:
+                cols: list[str] = []
+                for col_line in lines:
+                    if col_line.lstrip().startswith(")"):
+                        break
+                    cm = _COLUMN_RE.match(col_line)
+                    if cm:
+                        cols.append(cm.group(1))
+                columns_by_table[m.group(1)] = cols
+                continue
+
+            m = _INSERT_RE.match(line)
+            if not m:
+                continue
+            table = m.group(1)
+            columns = None
+            if table in tables:
+                if m.group(2):
+                    columns = [c.strip().strip("`") for c in m.group(2).split(",")]
+                else:
+                    columns = columns_by_table.get(table)
+                if not columns:
+                    raise ValueError(f"Colonnes inconnues pour {table} (CREATE TABLE absent du dump)")
+            for row in _parse_values(line, m.end(), lines, columns):
+                yield table, row
+
+
+def _int(value, default: int = 0) -> int:
+    try:
+        return int(str(value).strip())
+    except Exception:
+        return default
+
+
+def _float(value, default: float = 0.0) -> float:
+    try:
+        return float(str(value).strip())
+    except Exception:
+        return default
+
+
+def iter_sql_bundles(path: Path, prefix: str = "ps_", lang: int = 1, log: LogFn = print) -> Iterator[dict]:
+    t_product = f"{prefix}product"
+    t_lang = f"{prefix}product_lang"
+    t_cat = f"{prefix}category_product"
+    t_image = f"{prefix}image"
+    t_acc = f"{prefix}accessory"
+
+    # Passe 1: tables légères (scalaires et ids uniquement)
+    products: dict[int, tuple] = {}
+    categories: dict[int, list[tuple[int, int]]] = {}
+    images: dict[int, list[tuple[int, int, int]]] = {}
+    accessories: dict[int, list[int]] = {}
+    for table, row in iter_sql_rows(path, {t_product, t_cat, t_image, t_acc}):
+        if table == t_product:
+            pid = _int(row.get("id_product"))
+            products[pid] = (
+                row.get("reference") or None,
+                _float(row.get("price")),
+                _int(row.get("id_manufacturer")),
+                _int(row.get("active")) == 1,
+                _int(row.get("id_category_default")),
+            )
+        elif table == t_cat:
+            categories.setdefault(_int(row.get("id_product")), []).append(
+                (_int(row.get("position")), _int(row.get("id_category")))
+            )
+        elif table == t_image:
+            images.setdefault(_int(row.get("id_product")), []).append(
+                (0 if _int(row.get("cover")) == 1 else 1, _int(row.get("position")), _int(row.get("id_image")))
+            )
+        elif table == t_acc:
+            accessories.setdefault(_int(row.get("id_product_1")), []).append(_int(row.get("id_product_2")))
+    log(f"Passe 1: {len(products)} produits, {sum(len(v) for v in images.values())} images")
+
+    # Passe 2: descriptions (HTML) en streaming
+    seen: set[int] = set()
+    for _table, row in iter_sql_rows(path, {t_lang}):
+        if _int(row.get("id_lang"), lang) != lang:
+            continue
+        if "id_shop" in row and _int(row.get("id_shop"), 1) != 1:
+            continue
+        pid = _int(row.get("id_product"))
+        if pid in seen or pid not in products:
+            continue
+        seen.add(pid)
+
+        reference, price, manufacturer_id, active, default_cat = products[pid]
+        cat_ids = [cid for _pos, cid in sorted(categories.get(pid, []))]
+        if default_cat and default_cat in cat_ids:
+            cat_ids.remove(default_cat)
+            cat_ids.insert(0, default_cat)
+        yield {
+            "id": pid,
+            "active": active,
+            "name": row.get("name") or "",
+            "slug": row.get("link_rewrite") or "",
+            "reference": reference,
+            "price_ht": price,
+            "manufacturer_id": manufacturer_id,
+            "category_ids": cat_ids,
+            "short_html": row.get("description_short") or "",
+            "long_html": row.get("description") or "",
+            "image_ids": [id_image for _c, _p, id_image in sorted(images.get(pid, []))],
+            "accessories": accessories.get(pid, []),
+        }
+
+
+def _int_list(value) -> list[int]:
+    out = []
+    for part in str(value or "").replace(";", ",").split(","):
+        n = _int(part, -1)
+        if n >= 0:
+            out.append(n)
+    return out
+
+
+def iter_csv_bundles(path: Path, delimiter: str = ",") -> Iterator[dict]:
+    with _open_text(path) as f:
+        for row in csv.DictReader(f, delimiter=delimiter):
+            yield {
+                "id": _int(row.get("id")),
+                "active": str(row.get("active") or "").strip().lower() in {"1", "true", "yes", "on"},
+                "name": row.get("name") or "",
+                "slug": row.get("slug") or "",
+                "reference": (row.get("reference") or "").strip() or None,
+                "price_ht": _float(row.get("price_ht")),
+                "manufacturer_id": _int(row.get("manufacturer_id")),
+                "category_ids": _int_list(row.get("category_ids")),
+                "short_html": row.get("short_html") or "",
+                "long_html": row.get("long_html") or "",
+                "image_ids": _int_list(row.get("image_ids")),
+                "accessories": _int_list(row.get("accessories")),
+            }
+
+
+# ---------------------------------------------------------------------------
+# Transformation (process pool)
+
+
+_worker: dict = {}
+
+
+def _init_worker(cats_by_id: dict, mans_by_id: dict, img_dir: str | None, catalog_root: str) -> None:
+    # HTML déjà normalisé lors d'un import précédent: relu du cache disque, pas re-parsé
+    use_persistent_cache(Path(catalog_root))
+    _worker["cats_by_id"] = cats_by_id
+    _worker["mans_by_id"] = mans_by_id
+    _worker["img_dir"] = Path(img_dir) if img_dir else None
+
+
+def _image_files(img_dir: Path, id_image: int) -> tuple[Path, list[str]]:
+    # Arborescence PrestaShop: img/p/1/6/7/167.jpg, 167-large_default.jpg, ...
+    key = str(id_image)
+    src_dir = img_dir.joinpath(*key)
+    try:
+        names = os.listdir(src_dir)
+    except OSError:
+        return src_dir, []
+    files = [
+        n
+        for n in names
+        if n.startswith(key) and n[len(key) : len(key) + 1] in {".", "-"} and n.lower().endswith(_IMAGE_EXTS)
+    ]
+    return src_dir, sorted(files)
+
+
+def transform_bundle(bundle: dict) -> dict:
+    cats_by_id = _worker["cats_by_id"]
+    mans_by_id = _worker["mans_by_id"]
+    img_dir = _worker["img_dir"]
+
+    pid = int(bundle["id"])
+    name = str(bundle.get("name") or "").strip()
+    slug = slugify_ascii(bundle.get("slug") or "") or slugify_ascii(name) or f"produit-{pid}"
+
+    draft = DraftProduct(
+        name=name,
+        manufacturer_id=int(bundle.get("manufacturer_id") or 0),
+        category_ids=[int(c) for c in bundle.get("category_ids") or [] if int(c) in cats_by_id],
+        price_ht=float(bundle.get("price_ht") or 0),
+        short_html=str(bundle.get("short_html") or ""),
+        long_html=str(bundle.get("long_html") or ""),
+        reference=bundle.get("reference") or None,
+        active=bool(bundle.get("active")),
+        accessories=[int(x) for x in bundle.get("accessories") or []],
+    )
+    manufacturer_name, categories, category_paths = resolve_taxonomy(draft, cats_by_id, mans_by_id)
+
+    images = []
+    copies: list[tuple[str, str]] = []
+    base_rel = f"assets/products/{pid}__{slug}/images"
+    for id_image in bundle.get("image_ids") or []:
+        if img_dir is None:
+            break
+        src_dir, files = _image_files(img_dir, int(id_image))
+        if not files:
+            continue
+        rels = [f"{base_rel}/{n}" for n in files]
+        copies.extend((str(src_dir / n), rel) for n, rel in zip(files, rels))
+        images.append({"type": "prestashop", "source_id_image": int(id_image), "files": rels})
+
+    cover_rel = None
+    if images:
+        first = images[0]["files"]
+        cover_rel = next((f for f in first if "-large_default." in f), first[0])
+
+    product_json = build_product_json(
+        pid, slug, draft, manufacturer_name, categories, category_paths, cover_rel, [], images=images
+    )
+    fragment = build_description_fragment(pid, draft.short_html, draft.long_html)
+    index_item = build_index_item(pid, slug, draft, manufacturer_name, cover_rel)
+    search_item = build_search_item(pid, draft, manufacturer_name, categories)
+
+    return {
+        "id": pid,
+        "slug": slug,
+        "product": product_json,
+        "fragment": fragment,
+        "index": index_item,
+        "search": search_item,
+        "hashes": hash_entry(product_json, fragment, index_item, search_item),
+        "copies": copies,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Orchestration
+
+
+class _BoundedIO:
+    # Thread pool d'I/O avec nombre de tâches en vol borné (mémoire constante).
+    # Chaque tâche porte l'id du produit concerné: un échec le marque dans failed.
+    def __init__(self, threads: int):
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="import-io")
+        self._slots = threading.BoundedSemaphore(threads * 4)
+        self._lock = threading.Lock()
+        self.errors: list[str] = []
+        self.failed: set[int] = set()
+        self.copied = 0
+
+    def submit(self, pid: int, fn, *args) -> None:
+        self._slots.acquire()
+
+        def run():
+            try:
+                fn(*args)
+            except Exception as e:
+                with self._lock:
+                    target = f" {args[-1]}" if args and isinstance(args[-1], str) else ""
+                    self.errors.append(f"produit {pid}: {getattr(fn, '__name__', 'io')}{target}: {e}")
+                    self.failed.add(pid)
+            finally:
+                self._slots.release()
+
+        self._pool.submit(run)
+
+    def count_copied(self) -> None:
+        with self._lock:
+            self.copied += 1
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True)
+
+
+def import_catalog(
+    catalog_root: Path,
+    bundles: Iterable[dict],
+    img_dir: Path | None = None,
+    workers: int | None = None,
+    copy_threads: int = 8,
+    prune: bool = False,
+    log: LogFn = print,
+) -> dict:
+    started = time.monotonic()
+    data = load_catalog(catalog_root)
+    cats_by_id = category_maps(data["categories"])
+    mans_by_id = manufacturer_map(data["manufacturers"])
+    workers = max(1, int(workers or os.cpu_count() or 1))
+
+    imported_index: dict[int, dict] = {}
+    imported_search: dict[int, dict] = {}
+    imported_hashes: dict[str, dict] = {}
+    imported_accessories: dict[int, list[int]] = {}
+    imported_taxonomy: dict[int, tuple[int, list[int]]] = {}
+
+    lease = CatalogLease(catalog_root)
+    with lease.hold() as fence:
+        io_pool = _BoundedIO(max(1, int(copy_threads)))
+
+        def write_json(rel: str, obj) -> None:
+            atomic_write_json(catalog_root / rel, obj)
+
+        def copy_asset(src: str, rel: str) -> None:
+            dst = catalog_root / rel
+            ensure_dir(dst.parent)
+            shutil.copy2(src, dst)
+            io_pool.count_copied()
+
+        def write_product(pid: int, fragment: dict, product: dict) -> None:
+            # Dans la même tâche, fragment puis produit: un produit écrit ne référence
+            # jamais un fragment absent (si le fragment échoue, le produit n'est pas écrit).
+            write_json(description_fragment_rel(pid), fragment)
+            write_json(f"products/{pad6(pid)}.json", product)
+
+        def handle(res: dict) -> None:
+            pid = res["id"]
+            io_pool.submit(pid, write_product, pid, res["fragment"], res["product"])
+            for src, rel in res["copies"]:
+                io_pool.submit(pid, copy_asset, src, rel)
+            imported_index[pid] = res["index"]
+            imported_search[pid] = res["search"]
+            imported_hashes[str(pid)] = res["hashes"]
+            imported_accessories[pid] = res["product"]["relations"]["accessories"]
+            imported_taxonomy[pid] = (res["product"]["manufacturer"]["id"], product_category_ids(res["product"]))
+            if len(imported_index) % 500 == 0:
+                fence()
+                log(f"{len(imported_index)} produits transformés")
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(cats_by_id, mans_by_id, str(img_dir) if img_dir else None, str(catalog_root)),
+            ) as pool:
+                pending: deque = deque()
+                max_inflight = workers * 4
+                for bundle in bundles:
+                    pending.append(pool.submit(transform_bundle, bundle))
+                    if len(pending) >= max_inflight:
+                        handle(pending.popleft().result())
+                while pending:
+                    handle(pending.popleft().result())
+        finally:
+            io_pool.shutdown()
+
+        fence()
+
+        # Produits dont une écriture (document, fragment ou asset) a échoué: retirés de tous
+        # les index et des empreintes, le prochain import les réécrit en entier.
+        failed = sorted(io_pool.failed)
+        for pid in failed:
+            for imported in (imported_index, imported_search, imported_accessories, imported_taxonomy):
+                imported.pop(pid, None)
+            imported_hashes.pop(str(pid), None)
+        if failed:
+            log(f"WARN {len(failed)} produits en erreur d'écriture, retirés des index: {failed[:20]}")
+
+        # Index: entrées importées + entrées existantes absentes du dump (sauf --prune)
+        removed: list[dict] = []
+        products_index = dict(imported_index)
+        search_index = dict(imported_search)
+        for item in data["products_index"]:
+            pid = _int(item.get("id"), -1)
+            if pid in imported_index or pid in io_pool.failed:
+                continue
+            if prune:
+                removed.append(item)
+            else:
+                products_index[pid] = item
+        if not prune:
+            for item in data["search_index"]:
+                pid = _int(item.get("id"), -1)
+                if pid in products_index and pid not in search_index:
+                    search_index[pid] = item
+
+        log("Écriture atomique des index")
+        write_products_index(
+            catalog_root, data, RecordIndex(ProductIndexRecord, (products_index[k] for k in sorted(products_index))), log
+        )
+        RecordIndex(SearchRecord, (search_index[k] for k in sorted(search_index))).save(data["search_index_path"])
+
+        hashes = load_hashes(catalog_root)
+        hashes["products"].update(imported_hashes)
+        for pid in failed:
+            hashes["products"].pop(str(pid), None)
+
+        for item in removed:
+            pid = _int(item.get("id"), -1)
+            slug = str(item.get("slug") or "").strip()
+            hashes["products"].pop(str(pid), None)
+            for rel in (f"products/{pad6(pid)}.json", description_fragment_rel(pid)):
+                try:
+                    (catalog_root / rel).unlink()
+                except FileNotFoundError:
+                    pass
+            if slug:
+                shutil.rmtree(catalog_root / "assets" / "products" / f"{pid}__{slug}", ignore_errors=True)
+        save_hashes(catalog_root, hashes, log)
+
+        relations = load_relations(catalog_root)
+        for pid, accessories in imported_accessories.items():
+            set_accessories(relations, pid, accessories)
+        for item in removed:
+            # les fiches restantes qui référencent un produit supprimé viennent du dump: on les garde telles quelles
+            set_accessories(relations, _int(item.get("id"), -1), [])
+        for pid in failed:
+            set_accessories(relations, pid, [])
+        save_relations(catalog_root, relations, log)
+
+        tax_index = load_taxonomy_index(catalog_root)
+        for pid, (manufacturer_id, category_ids) in imported_taxonomy.items():
+            set_product(tax_index, pid, manufacturer_id, category_ids)
+        for item in removed:
+            remove_taxonomy_product(tax_index, _int(item.get("id"), -1))
+        for pid in failed:
+            remove_taxonomy_product(tax_index, pid)
+        save_taxonomy_index(catalog_root, tax_index)
+
+        catalog_path = catalog_root / "catalog.json"
+        if catalog_path.exists():
+            catalog = read_json(catalog_path)
+            catalog.setdefault("counts", {})["products"] = len(products_index)
+            catalog["generated_at"] = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+            atomic_write_json(catalog_path, catalog)
+
+        try:
+            prune_persistent_cache(catalog_root)
+        except Exception as e:
+            log(f"WARN nettoyage du cache HTML impossible: {e}")
+
+        try:
+            build_related(catalog_root)
+        except SimilarUnavailable as e:
+            log(f"INFO {e}")
+        except Exception as e:
+            log(f"WARN calcul des produits similaires impossible: {e}")
+
+        # Manifest: re-scan complet (empreintes réutilisées si taille/mtime inchangés)
+        mpath = manifest_path(catalog_root)
+        atomic_write_json(mpath, build_manifest(catalog_root, load_manifest(mpath) if mpath.exists() else None))
+
+    summary = {
+        "finished_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "duration_seconds": round(time.monotonic() - started, 3),
+        "counts": {
+            "products_imported": len(imported_index),
+            "products_total": len(products_index),
+            "products_pruned": len(removed),
+            "products_failed": len(failed),
+            "images_copied_files": io_pool.copied,
+            "io_errors": len(io_pool.errors),
+        },
+        "workers": workers,
+        "copy_threads": int(copy_threads),
+    }
+    reports_dir = catalog_root / "reports"
+    atomic_write_json(reports_dir / f"import_summary_{now_stamp()}.json", summary)
+    if io_pool.errors:
+        (reports_dir / f"import_errors_{now_stamp()}.log").write_text("\n".join(io_pool.errors) + "\n", encoding="utf-8")
+    return summary
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Import streaming d'un dump PrestaShop vers le catalogue")
+    parser.add_argument("dump")
+    parser.add_argument("--format", choices=["sql", "csv"], default=None)
+    parser.add_argument("--img-dir", default=None, help="dossier img/p de PrestaShop")
+    parser.add_argument("--prefix", default="ps_")
+    parser.add_argument("--lang", type=int, default=1)
+    parser.add_argument("--delimiter", default=",")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--copy-threads", type=int, default=8)
+    parser.add_argument("--prune", action="store_true", help="supprime les produits absents du dump")
+    parser.add_argument("--catalog-root", default=None)
+    args = parser.parse_args(argv)
+
+    root = resolve_catalog_root(args.catalog_root)
+
+    dump = Path(args.dump).expanduser().resolve()
+    fmt = args.format or ("csv" if ".csv" in dump.suffixes else "sql")
+    if fmt == "csv":
+        bundles = iter_csv_bundles(dump, delimiter=args.delimiter)
+    else:
+        bundles = iter_sql_bundles(dump, prefix=args.prefix, lang=args.lang)
+
+    summary = import_catalog(
+        root,
+        bundles,
+        img_dir=Path(args.img_dir).expanduser().resolve() if args.img_dir else None,
+        workers=args.workers,
+        copy_threads=args.copy_threads,
+        prune=args.prune,
+    )
+    c = summary["counts"]
+    print(
+        f"{c['products_imported']} produits importés ({c['products_total']} au total), "
+        f"{c['images_copied_files']} images copiées, {c['io_errors']} erreurs I/O "
+        f"en {summary['duration_seconds']}s"
+    )
+    return 1 if c["io_errors"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
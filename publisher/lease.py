@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+# Bail d'écriture inter-processus sur CATALOG_ROOT.
+#
+# Plusieurs processus publisher (uvicorn --workers N, volume partagé) peuvent servir les
+# requêtes, mais un seul à la fois détient le bail d'écriture:
+# - .publisher/lease.json: détenteur, jeton de fencing (croissant), expiration
+# - .publisher/lease.lock: verrou consultatif (flock) pris uniquement le temps de lire/modifier le bail
+# - un thread de heartbeat prolonge le bail tant qu'il est détenu
+# - check() vérifie, avant chaque point d'écriture, que le jeton est toujours le nôtre
+#
+# Hypothèse: horloges des machines synchronisées (expiration en temps mural).
+
+import contextlib
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from utils import atomic_write_json, ensure_dir
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: exclusion limitée au processus
+    fcntl = None
+
+DEFAULT_TTL_SECONDS = 30.0
+DEFAULT_WAIT_SECONDS = 120.0
+_POLL_SECONDS = 0.2
+
+
+class LeaseTimeout(RuntimeError):
+    pass
+
+
+class LeaseLost(RuntimeError):
+    pass
+
+
+def state_dir(catalog_root: Path) -> Path:
+    # Dossier caché: ignoré par Firebase Hosting ("**/.*") et par git
+    return catalog_root / ".publisher"
+
+
+class CatalogLease:
+    def __init__(self, catalog_root: Path, ttl: float = DEFAULT_TTL_SECONDS):
+        self.ttl = float(ttl)
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._dir = state_dir(catalog_root)
+        self._lease_path = self._dir / "lease.json"
+        self._lock_path = self._dir / "lease.lock"
+        # Sérialise les jobs du processus: le bail est détenu par le processus, pas par le thread.
+        self._local = threading.Lock()
+        self._token: int | None = None
+        self._lost = threading.Event()
+        self._stop = threading.Event()
+        self._heartbeat: threading.Thread | None = None
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        ensure_dir(self._dir)
+        with open(self._lock_path, "a+") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _read(self) -> dict:
+        try:
+            with self._lease_path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _try_acquire(self) -> int | None:
+        with self._file_lock():
+            cur = self._read()
+            now = time.time()
+            held_by_other = (
+                cur.get("holder")
+                and cur.get("holder") != self.holder
+                and float(cur.get("expires_at") or 0) > now
+            )
+            if held_by_other:
+                return None
+            token = int(cur.get("token") or 0) + 1
+            atomic_write_json(
+                self._lease_path,
+                {"holder": self.holder, "token": token, "acquired_at": now, "expires_at": now + self.ttl},
+            )
+            return token
+
+    def _renew(self) -> bool:
+        with self._file_lock():
+            cur = self._read()
+            if cur.get("holder") != self.holder or int(cur.get("token") or 0) != self._token:
+                return False
+            cur["expires_at"] = time.time() + self.ttl
+            atomic_write_json(self._lease_path, cur)
+            return True
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                ok = self._renew()
+            except Exception:
+                ok = False
+            if not ok:
+                self._lost.set()
+                return
+
+    def acquire(self, timeout: float = DEFAULT_WAIT_SECONDS) -> int:
+        deadline = time.monotonic() + timeout
+        if not self._local.acquire(timeout=timeout):
+            raise LeaseTimeout("bail catalogue indisponible (délai dépassé)")
+        try:
+            while True:
+                token = self._try_acquire()
+                if token is not None:
+                    break
+                if time.monotonic() >= deadline:
+                    raise LeaseTimeout("bail catalogue détenu par un autre processus (délai dépassé)")
+                time.sleep(_POLL_SECONDS)
+        except BaseException:
+            self._local.release()
+            raise
+
+        self._token = token
+        self._lost.clear()
+        self._stop.clear()
+        self._heartbeat = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        self._heartbeat.start()
+        return token
+
+    def check(self) -> None:
+        """Lève LeaseLost si le bail n'est plus le nôtre (à appeler avant chaque écriture)."""
+        if self._token is None or self._lost.is_set():
+            raise LeaseLost("bail catalogue perdu")
+        cur = self._read()
+        if (
+            cur.get("holder") != self.holder
+            or int(cur.get("token") or 0) != self._token
+            or float(cur.get("expires_at") or 0) <= time.time()
+        ):
+            self._lost.set()
+            raise LeaseLost(f"bail catalogue perdu (jeton {self._token})")
+
+    def release(self) -> None:
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join(timeout=self.ttl)
+            self._heartbeat = None
+        try:
+            with self._file_lock():
+                cur = self._read()
+                if cur.get("holder") == self.holder and int(cur.get("token") or 0) == self._token:
+                    # On garde le jeton: le prochain détenteur obtiendra token + 1.
+                    atomic_write_json(self._lease_path, {"holder": None, "token": self._token, "expires_at": 0})
+        finally:
+            self._token = None
+            self._local.release()
+
+    @contextlib.contextmanager
+    def hold(self, timeout: float = DEFAULT_WAIT_SECONDS):
+        self.acquire(timeout=timeout)
+        try:
+            yield self.check
+        finally:
+            self.release()
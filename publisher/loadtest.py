@@ -0,0 +1,418 @@
+from __future__ import annotations
+
+# Générateur de charge pour l'API publisher (plusieurs admins qui publient en même temps).
+#
+# - in-process (TestClient, par défaut sur une copie temporaire du catalogue) ou HTTP (uvicorn local)
+# - mix configurable de create/update/delete avec uploads synthétiques (image + PDF optionnel)
+# - chaque requête est suivie via /api/catalog/jobs/{id} jusqu'à son état final
+# - rapport: débit, latence de bout en bout p50/p95/p99 par type, erreurs par code
+# - contrôle de cohérence des index du catalogue en fin de run
+#
+# Seuls les produits créés par le run sont modifiés ou supprimés.
+#
+# Usage:
+#   python publisher/loadtest.py [--requests 60] [--concurrency 6] [--mix create=5,update=4,delete=1]
+#   python publisher/loadtest.py --url http://127.0.0.1:8787 --token $ADMIN_TOKEN [--catalog-root PATH]
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from columnar import COLUMNAR_FILENAME, ColumnarIndex
+from publish_core import hashes_path
+from relations import build_relations, load_relations
+from taxonomy import build_taxonomy_index, load_taxonomy_index
+from utils import pad6, read_json, resolve_catalog_root
+
+DEFAULT_MIX = "create=5,update=4,delete=1"
+_JOB_DONE = {"success", "error"}
+
+
+# ---------------------------------------------------------------------------
+# Clients
+
+
+class _HttpClient:
+    def __init__(self, base_url: str, token: str, timeout: float = 60.0):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+
+    def request(self, method: str, path: str, fields: dict | None = None, files: dict | None = None):
+        headers = {"X-Admin-Token": self.token}
+        body = None
+        if fields is not None or files is not None:
+            boundary = uuid.uuid4().hex
+            parts = []
+            for name, value in (fields or {}).items():
+                parts.append(
+                    f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode("utf-8")
+                )
+            for name, (filename, data, ctype) in (files or {}).items():
+                head = (
+                    f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                    f"Content-Type: {ctype}\r\n\r\n"
+                )
+                parts.append(head.encode("utf-8") + data + b"\r\n")
+            parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+            body = b"".join(parts)
+            headers["Content-Type"] = f"multipart/form-data; boundary={boundary}"
+
+        req = urllib.request.Request(self.base_url + path, data=body, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return resp.status, json.loads(resp.read() or b"null")
+        except urllib.error.HTTPError as e:
+            return e.code, {"detail": e.read().decode("utf-8", "replace")[:400]}
+
+
+class _InProcessClient:
+    def __init__(self, test_client, token: str):
+        self._client = test_client
+        self.token = token
+
+    def request(self, method: str, path: str, fields: dict | None = None, files: dict | None = None):
+        resp = self._client.request(method, path, data=fields, files=files, headers={"X-Admin-Token": self.token})
+        try:
+            payload = resp.json()
+        except Exception:
+            payload = {"detail": resp.text[:400]}
+        return resp.status_code, payload
+
+
+# ---------------------------------------------------------------------------
+# Charge synthétique
+
+
+def _parse_mix(value: str) -> list[tuple[str, float]]:
+    mix = []
+    for part in str(value).split(","):
+        if not part.strip():
+            continue
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in {"create", "update", "delete"}:
+            raise ValueError(f"type d'opération inconnu: {kind}")
+        mix.append((kind, float(weight or 1)))
+    if not mix:
+        raise ValueError("mix vide")
+    return mix
+
+
+def _synthetic_bytes(rng: random.Random, header: bytes, size: int) -> bytes:
+    return header + rng.randbytes(max(0, size - len(header)))
+
+
+class LoadRun:
+    def __init__(self, client, catalog_root: Path | None, args):
+        self.client = client
+        self.catalog_root = catalog_root
+        self.args = args
+        self.mix = _parse_mix(args.mix)
+        self._lock = threading.Lock()
+        self._rng = random.Random(args.seed)
+        # produits créés par le run: libres (pool) ou en cours de modification (hors pool)
+        self._pool: list[int] = []
+        self.created: set[int] = set()
+        self.deleted: set[int] = set()
+        self.samples: list[dict] = []
+        self._taxonomy = self._pick_taxonomy()
+
+    def _pick_taxonomy(self) -> tuple[list[int], list[int]]:
+        if self.catalog_root is not None:
+            mans = read_json(self.catalog_root / "taxonomies" / "manufacturers.json").get("manufacturers") or []
+            cats = read_json(self.catalog_root / "taxonomies" / "categories.json").get("categories") or []
+            return [int(m["id"]) for m in mans], [int(c["id"]) for c in cats if int(c.get("level_depth") or 0) >= 2]
+        return [int(self.args.manufacturer_id)], [int(self.args.category_id)]
+
+    def _draft(self, rng: random.Random, n: int) -> dict:
+        mans, cats = self._taxonomy
+        return {
+            "name": f"Loadtest {n} {uuid.uuid4().hex[:6]}",
+            "manufacturer_id": rng.choice(mans),
+            "category_ids": rng.sample(cats, k=min(len(cats), rng.randint(1, 2))),
+            "price_ht": round(rng.uniform(5, 5000), 2),
+            "short_html": f"<p>Produit de test {n}</p>",
+            "long_html": "<p>" + " ".join(["description"] * rng.randint(20, 400)) + "</p>",
+            "reference": f"LT-{n}",
+            "active": False,
+        }
+
+    def _files(self, rng: random.Random, with_image: bool) -> dict:
+        files = {}
+        if with_image:
+            size = int(self.args.image_kb * 1024)
+            files["image"] = ("cover.jpg", _synthetic_bytes(rng, b"\xff\xd8\xff\xe0", size), "image/jpeg")
+        if rng.random() < self.args.pdf_ratio:
+            size = int(self.args.pdf_kb * 1024)
+            files["pdf"] = ("fiche.pdf", _synthetic_bytes(rng, b"%PDF-1.4\n", size), "application/pdf")
+        return files
+
+    def _choose(self, rng: random.Random) -> tuple[str, int | None]:
+        kinds = [k for k, _ in self.mix]
+        weights = [w for _, w in self.mix]
+        kind = rng.choices(kinds, weights=weights)[0]
+        if kind == "create":
+            return kind, None
+        with self._lock:
+            if not self._pool:
+                return "create", None
+            pid = self._pool.pop(rng.randrange(len(self._pool)))
+        return kind, pid
+
+    def _wait_job(self, job_id: str) -> dict:
+        deadline = time.monotonic() + self.args.timeout
+        while time.monotonic() < deadline:
+            status, job = self.client.request("GET", f"/api/catalog/jobs/{job_id}")
+            if status == 200 and job.get("status") in _JOB_DONE:
+                return job
+            time.sleep(self.args.poll_interval)
+        return {"status": "error", "error": {"code": "loadtest_timeout", "message": f"job {job_id} non terminé"}}
+
+    def _one(self, n: int) -> None:
+        with self._lock:
+            rng = random.Random(self._rng.random())
+        kind, pid = self._choose(rng)
+
+        t0 = time.perf_counter()
+        if kind == "create":
+            status, out = self.client.request(
+                "POST", "/api/catalog/products", {"payload": json.dumps(self._draft(rng, n))}, self._files(rng, True)
+            )
+        elif kind == "update":
+            status, out = self.client.request(
+                "PUT",
+                f"/api/catalog/products/{pid}",
+                {"payload": json.dumps(self._draft(rng, n))},
+                self._files(rng, rng.random() < 0.5),
+            )
+        else:
+            status, out = self.client.request("DELETE", f"/api/catalog/products/{pid}?cascade=true")
+
+        if status != 200 or not isinstance(out, dict) or not out.get("jobId"):
+            job = {"status": "error", "error": {"code": f"http_{status}", "message": str(out)[:200]}}
+        else:
+            job = self._wait_job(str(out["jobId"]))
+        latency = time.perf_counter() - t0
+
+        ok = job.get("status") == "success"
+        with self._lock:
+            if kind == "create" and ok:
+                new_id = int((job.get("result") or {}).get("id"))
+                self.created.add(new_id)
+                # create_product réattribue max(id) + 1: un id supprimé peut revenir
+                self.deleted.discard(new_id)
+                self._pool.append(new_id)
+            elif kind == "update":
+                self._pool.append(pid)
+            elif kind == "delete":
+                if ok:
+                    self.deleted.add(pid)
+                else:
+                    self._pool.append(pid)
+            self.samples.append(
+                {
+                    "kind": kind,
+                    "ok": ok,
+                    "latency": latency,
+                    "error": None if ok else (job.get("error") or {}).get("code"),
+                }
+            )
+
+    def run(self) -> dict:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.args.concurrency, thread_name_prefix="loadtest") as pool:
+            for f in [pool.submit(self._one, n) for n in range(self.args.requests)]:
+                f.result()
+        return _report(self.samples, time.perf_counter() - started)
+
+
+# ---------------------------------------------------------------------------
+# Rapport et cohérence
+
+
+def _percentile(sorted_values: list[float], q: float) -> float | None:
+    # plus proche rang
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def _stats(samples: list[dict]) -> dict:
+    lat = sorted(s["latency"] for s in samples if s["ok"])
+    errors: dict[str, int] = {}
+    for s in samples:
+        if not s["ok"]:
+            errors[s["error"] or "unknown"] = errors.get(s["error"] or "unknown", 0) + 1
+    return {
+        "count": len(samples),
+        "ok": len(lat),
+        "errors": errors,
+        "p50_ms": None if not lat else round(_percentile(lat, 50) * 1000, 1),
+        "p95_ms": None if not lat else round(_percentile(lat, 95) * 1000, 1),
+        "p99_ms": None if not lat else round(_percentile(lat, 99) * 1000, 1),
+        "max_ms": None if not lat else round(lat[-1] * 1000, 1),
+    }
+
+
+def _report(samples: list[dict], wall: float) -> dict:
+    by_kind = {}
+    for kind in ("create", "update", "delete"):
+        subset = [s for s in samples if s["kind"] == kind]
+        if subset:
+            by_kind[kind] = _stats(subset)
+    total = _stats(samples)
+    return {
+        "wall_seconds": round(wall, 3),
+        "throughput_ops_per_s": round(total["ok"] / wall, 2) if wall > 0 else None,
+        "total": total,
+        "by_kind": by_kind,
+    }
+
+
+def check_consistency(catalog_root: Path, created: set[int] | None = None, deleted: set[int] | None = None) -> list[str]:
+    problems: list[str] = []
+    products_index = read_json(catalog_root / "index.products.json")
+    ids = [int(x["id"]) for x in products_index]
+    id_set = set(ids)
+    if len(ids) != len(id_set):
+        problems.append(f"index.products.json: {len(ids) - len(id_set)} ids dupliqués")
+
+    files = {int(p.stem) for p in (catalog_root / "products").glob("*.json") if p.stem.isdigit()}
+    if id_set - files:
+        problems.append(f"entrées d'index sans document: {sorted(id_set - files)[:20]}")
+    if files - id_set:
+        problems.append(f"documents sans entrée d'index: {sorted(files - id_set)[:20]}")
+
+    search_path = catalog_root / "index.search.json"
+    if search_path.exists():
+        search_ids = [int(x["id"]) for x in read_json(search_path)]
+        if len(search_ids) != len(set(search_ids)) or set(search_ids) != id_set:
+            problems.append("index.search.json ne correspond pas à index.products.json")
+
+    for pid in sorted(id_set & files):
+        product = read_json(catalog_root / "products" / f"{pad6(pid)}.json")
+        ref = (product.get("descriptions") or {}).get("long_html_ref")
+        if ref and not (catalog_root / ref).exists():
+            problems.append(f"produit {pid}: fragment manquant {ref}")
+
+    hashes_file = hashes_path(catalog_root)
+    if hashes_file.exists():
+        extra = {int(k) for k in (read_json(hashes_file).get("products") or {})} - id_set
+        if extra:
+            problems.append(f"{hashes_file.name}: empreintes de produits absents {sorted(extra)[:20]}")
+
+    columnar_path = catalog_root / COLUMNAR_FILENAME
+    if columnar_path.exists():
+        with ColumnarIndex(columnar_path) as col:
+            col_ids = col.column("id").tolist()
+        if col_ids != ids:
+            problems.append(f"{COLUMNAR_FILENAME} ne correspond pas à index.products.json")
+
+    rel = load_relations(catalog_root)
+    expected_rel = build_relations(catalog_root)
+    if rel["accessories"] != expected_rel["accessories"] or rel["accessory_of"] != expected_rel["accessory_of"]:
+        problems.append("index.relations.json diverge d'un scan complet")
+    dangling = sorted({a for accs in expected_rel["accessories"].values() for a in accs} - id_set)
+    if dangling:
+        problems.append(f"accessoires pendants: {dangling[:20]}")
+
+    tax = load_taxonomy_index(catalog_root)
+    expected_tax = build_taxonomy_index(catalog_root)
+    if any(tax[k] != expected_tax[k] for k in ("products", "manufacturers", "categories")):
+        problems.append("index taxonomie diverge d'un scan complet")
+
+    if created is not None:
+        missing = sorted((created - (deleted or set())) - id_set)
+        if missing:
+            problems.append(f"produits créés introuvables: {missing[:20]}")
+        survivors = sorted((deleted or set()) & id_set)
+        if survivors:
+            problems.append(f"produits supprimés encore présents: {survivors[:20]}")
+    return problems
+
+
+def _print_report(report: dict, problems: list[str]) -> None:
+    print(f"Durée: {report['wall_seconds']}s, débit: {report['throughput_ops_per_s']} publications/s")
+    print(f"{'type':<8} {'n':>5} {'ok':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}  erreurs")
+    for kind, s in [*report["by_kind"].items(), ("total", report["total"])]:
+        cells = [("-" if s[k] is None else str(s[k])) for k in ("p50_ms", "p95_ms", "p99_ms", "max_ms")]
+        errors = ", ".join(f"{code}={n}" for code, n in s["errors"].items()) or "-"
+        print(f"{kind:<8} {s['count']:>5} {s['ok']:>5} {cells[0]:>9} {cells[1]:>9} {cells[2]:>9} {cells[3]:>9}  {errors}")
+    if problems:
+        print("Cohérence: ÉCHEC")
+        for p in problems:
+            print(f"  - {p}")
+    else:
+        print("Cohérence: OK")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Test de charge du publisher catalogue")
+    parser.add_argument("--url", default=None, help="publisher HTTP (sinon in-process via TestClient)")
+    parser.add_argument("--token", default=os.environ.get("ADMIN_TOKEN") or "loadtest-token")
+    parser.add_argument("--catalog-root", default=None, help="catalogue à contrôler (HTTP) ou à copier (in-process)")
+    parser.add_argument("--in-place", action="store_true", help="in-process: travaille sur le catalogue lui-même")
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=6)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--image-kb", type=float, default=200)
+    parser.add_argument("--pdf-ratio", type=float, default=0.2)
+    parser.add_argument("--pdf-kb", type=float, default=500)
+    parser.add_argument("--manufacturer-id", type=int, default=22, help="HTTP sans --catalog-root")
+    parser.add_argument("--category-id", type=int, default=62, help="HTTP sans --catalog-root")
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="rapport JSON sur la sortie standard")
+    args = parser.parse_args(argv)
+
+    catalog_root = resolve_catalog_root(args.catalog_root)
+
+    tmp_dir = None
+    try:
+        if args.url:
+            client = _HttpClient(args.url, args.token, timeout=args.timeout)
+            checked_root = catalog_root if catalog_root.is_dir() else None
+            run = LoadRun(client, checked_root, args)
+            report = run.run()
+        else:
+            if not args.in_place:
+                tmp_dir = Path(tempfile.mkdtemp(prefix="publisher-loadtest-"))
+                copy = tmp_dir / "catalog"
+                shutil.copytree(catalog_root, copy, ignore=shutil.ignore_patterns(".publisher"))
+                catalog_root = copy
+            checked_root = catalog_root
+            from fastapi.testclient import TestClient
+
+            from app import create_app
+
+            with TestClient(create_app(catalog_root, admin_token=args.token)) as test_client:
+                run = LoadRun(_InProcessClient(test_client, args.token), catalog_root, args)
+                report = run.run()
+
+        problems = check_consistency(checked_root, run.created, run.deleted) if checked_root else []
+        report["consistency"] = problems
+        if args.json:
+            print(json.dumps(report, ensure_ascii=False, indent=2))
+        else:
+            _print_report(report, problems)
+        return 1 if problems or report["total"]["errors"] else 0
+    finally:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
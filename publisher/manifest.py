@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+# Manifest de déploiement du catalogue: chemin -> taille, mtime, sha256 de chaque fichier.
+#
+# - mis à jour incrémentalement par chaque opération de publish (seuls les chemins touchés)
+# - diff entre deux manifests: fichiers ajoutés / modifiés / supprimés
+# - push vers une cible (dossier local): ne copie que le diff
+#
+# Usage:
+#   python publisher/manifest.py build [CATALOG_ROOT]
+#   python publisher/manifest.py diff OLD.json NEW.json [--json]
+#   python publisher/manifest.py push DEST_DIR [CATALOG_ROOT] [--dry-run] [--rescan]
+#
+# build_manifest/update_manifest/push supposent le bail catalogue tenu par l'appelant (publish,
+# import); main() le prend pour build et push.
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Iterable
+
+from lease import CatalogLease, state_dir
+from utils import atomic_write_json, ensure_dir, read_json, resolve_catalog_root
+
+MANIFEST_VERSION = 1
+TARGET_MANIFEST_NAME = ".catalog-manifest.json"
+_CHUNK = 1024 * 1024
+
+
+def manifest_path(catalog_root: Path) -> Path:
+    return state_dir(catalog_root) / "manifest.json"
+
+
+def _is_excluded(rel: str) -> bool:
+    # Fichiers cachés (dont .publisher/) et temporaires d'écriture atomique
+    parts = rel.split("/")
+    return any(p.startswith(".") for p in parts) or rel.endswith(".tmp")
+
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        while True:
+            chunk = f.read(_CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _entry(path: Path, previous: dict | None) -> dict:
+    st = path.stat()
+    # Taille + mtime identiques: on réutilise l'empreinte sans relire le fichier.
+    if previous and previous.get("size") == st.st_size and previous.get("mtime_ns") == st.st_mtime_ns:
+        return previous
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": _file_sha256(path)}
+
+
+def _walk(root: Path, base: Path) -> Iterable[tuple[str, Path]]:
+    for dirpath, dirnames, filenames in os.walk(base):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for name in filenames:
+            abs_path = Path(dirpath) / name
+            rel = abs_path.relative_to(root).as_posix()
+            if not _is_excluded(rel):
+                yield rel, abs_path
+
+
+def load_manifest(path: Path) -> dict:
+    if not path.exists():
+        return {"version": MANIFEST_VERSION, "files": {}}
+    payload = read_json(path)
+    if not isinstance(payload, dict) or not isinstance(payload.get("files"), dict):
+        raise ValueError(f"Manifest invalide: {path}")
+    return payload
+
+
+def build_manifest(catalog_root: Path, previous: dict | None = None) -> dict:
+    prev_files = (previous or {}).get("files") or {}
+    files = {rel: _entry(abs_path, prev_files.get(rel)) for rel, abs_path in _walk(catalog_root, catalog_root)}
+    return {"version": MANIFEST_VERSION, "files": dict(sorted(files.items()))}
+
+
+def update_manifest(catalog_root: Path, rel_paths: Iterable[str]) -> dict:
+    """Rafraîchit uniquement les chemins donnés (fichiers ou dossiers) dans le manifest persistant.
+
+    Sans manifest existant, on part d'un scan complet (une seule fois).
+    """
+    path = manifest_path(catalog_root)
+    if path.exists():
+        manifest = load_manifest(path)
+    else:
+        manifest = build_manifest(catalog_root)
+
+    files: dict = manifest["files"]
+    for rel in {str(r).strip("/") for r in rel_paths if str(r).strip("/")}:
+        abs_path = catalog_root / rel
+        prefix = rel + "/"
+        if abs_path.is_file():
+            if not _is_excluded(rel):
+                files[rel] = _entry(abs_path, files.get(rel))
+            continue
+
+        # Dossier (ou chemin supprimé): on retire l'ancien contenu puis on re-scanne ce qui existe.
+        previous = {k: v for k, v in files.items() if k == rel or k.startswith(prefix)}
+        for k in previous:
+            del files[k]
+        if abs_path.is_dir():
+            for sub_rel, sub_abs in _walk(catalog_root, abs_path):
+                files[sub_rel] = _entry(sub_abs, previous.get(sub_rel))
+
+    manifest["files"] = dict(sorted(files.items()))
+    atomic_write_json(path, manifest)
+    return manifest
+
+
+def diff_manifests(old: dict, new: dict) -> dict:
+    old_files = (old or {}).get("files") or {}
+    new_files = (new or {}).get("files") or {}
+    added = sorted(k for k in new_files if k not in old_files)
+    removed = sorted(k for k in old_files if k not in new_files)
+    changed = sorted(
+        k
+        for k in new_files
+        if k in old_files
+        and (new_files[k].get("sha256") != old_files[k].get("sha256") or new_files[k].get("size") != old_files[k].get("size"))
+    )
+    return {"added": added, "changed": changed, "removed": removed}
+
+
+def push(catalog_root: Path, dest: Path, dry_run: bool = False, rescan: bool = False) -> dict:
+    """Déploie vers un dossier cible en ne copiant que les fichiers ajoutés/modifiés.
+
+    Par défaut on fait confiance au manifest incrémental; rescan=True le reconstruit
+    (stat de tous les fichiers, empreintes recalculées seulement si taille/mtime changent).
+    """
+    if rescan:
+        path = manifest_path(catalog_root)
+        source = build_manifest(catalog_root, load_manifest(path) if path.exists() else None)
+        atomic_write_json(path, source)
+    else:
+        source = update_manifest(catalog_root, [])
+    target_manifest_path = dest / TARGET_MANIFEST_NAME
+    target = load_manifest(target_manifest_path)
+    diff = diff_manifests(target, source)
+    if dry_run:
+        return diff
+
+    for rel in diff["added"] + diff["changed"]:
+        out = dest / rel
+        ensure_dir(out.parent)
+        shutil.copy2(catalog_root / rel, out)
+    for rel in diff["removed"]:
+        try:
+            (dest / rel).unlink()
+        except FileNotFoundError:
+            pass
+
+    ensure_dir(dest)
+    atomic_write_json(target_manifest_path, {"version": MANIFEST_VERSION, "files": source["files"]})
+    return diff
+
+
+def _print_diff(diff: dict, as_json: bool) -> None:
+    if as_json:
+        print(json.dumps(diff, ensure_ascii=False, indent=2))
+        return
+    for key, mark in (("added", "+"), ("changed", "~"), ("removed", "-")):
+        for rel in diff[key]:
+            print(f"{mark} {rel}")
+    print(f"{len(diff['added'])} ajoutés, {len(diff['changed'])} modifiés, {len(diff['removed'])} supprimés")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Manifest de déploiement du catalogue")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_build = sub.add_parser("build", help="(re)construit le manifest du catalogue")
+    p_build.add_argument("catalog_root", nargs="?", default=None)
+
+    p_diff = sub.add_parser("diff", help="compare deux manifests")
+    p_diff.add_argument("old")
+    p_diff.add_argument("new")
+    p_diff.add_argument("--json", action="store_true")
+
+    p_push = sub.add_parser("push", help="copie le diff vers un dossier cible")
+    p_push.add_argument("dest")
+    p_push.add_argument("catalog_root", nargs="?", default=None)
+    p_push.add_argument("--dry-run", action="store_true")
+    p_push.add_argument("--rescan", action="store_true")
+    p_push.add_argument("--json", action="store_true")
+
+    args = parser.parse_args(argv)
+
+    if args.cmd == "build":
+        root = resolve_catalog_root(args.catalog_root)
+        path = manifest_path(root)
+        with CatalogLease(root).hold():
+            previous = load_manifest(path) if path.exists() else None
+            manifest = build_manifest(root, previous)
+            atomic_write_json(path, manifest)
+        print(f"{path}: {len(manifest['files'])} fichiers")
+        return 0
+
+    if args.cmd == "diff":
+        _print_diff(diff_manifests(load_manifest(Path(args.old)), load_manifest(Path(args.new))), args.json)
+        return 0
+
+    root = resolve_catalog_root(args.catalog_root)
+    with CatalogLease(root).hold():
+        diff = push(root, Path(args.dest).expanduser().resolve(), dry_run=args.dry_run, rescan=args.rescan)
+    _print_diff(diff, args.json)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+# Migration: sort descriptions.long_html des products/*.json vers des fragments
+# descriptions/NNNNNN.json (référencés par descriptions.long_html_ref) et applique
+# la normalisation HTML du publish (short_html minifié/sanitisé, extrait texte). Le
+# short_html brut est recopié dans le fragment: pour un produit déjà normalisé avant que le
+# fragment ne le porte, le brut d'origine est perdu et c'est la version normalisée qui sert.
+#
+# Usage: python publisher/migrate_descriptions.py [CATALOG_ROOT] [--dry-run]
+# Idempotent: un produit déjà à jour est ignoré.
+
+import argparse
+import sys
+from pathlib import Path
+
+from html_stage import use_persistent_cache
+from lease import CatalogLease
+from publish_core import build_description_fragment, build_descriptions, description_fragment_rel
+from utils import atomic_write_json, read_json, resolve_catalog_root
+
+
+def migrate(catalog_root: Path, dry_run: bool = False) -> dict:
+    products_dir = catalog_root / "products"
+    if not products_dir.is_dir():
+        raise RuntimeError(f"Dossier produits introuvable: {products_dir}")
+
+    counts = {"migrated": 0, "skipped": 0, "errors": 0}
+    for product_path in sorted(products_dir.glob("*.json")):
+        try:
+            product = read_json(product_path)
+        except Exception as e:
+            print(f"ERREUR lecture {product_path.name}: {e}", file=sys.stderr)
+            counts["errors"] += 1
+            continue
+
+        descriptions = product.get("descriptions") if isinstance(product, dict) else None
+        if not isinstance(descriptions, dict):
+            counts["skipped"] += 1
+            continue
+
+        try:
+            pid = int(product.get("id"))
+        except Exception:
+            print(f"ERREUR id invalide: {product_path.name}", file=sys.stderr)
+            counts["errors"] += 1
+            continue
+
+        rel = description_fragment_rel(pid)
+        fragment_path = catalog_root / rel
+        existing_fragment = read_json(fragment_path) if fragment_path.exists() else None
+
+        if isinstance(descriptions.get("long_html"), str):
+            long_html = descriptions["long_html"]
+        elif isinstance(existing_fragment, dict) and isinstance(existing_fragment.get("long_html"), str):
+            long_html = existing_fragment["long_html"]
+        else:
+            counts["skipped"] += 1
+            continue
+
+        if isinstance(existing_fragment, dict) and isinstance(existing_fragment.get("short_html"), str):
+            short_html = existing_fragment["short_html"]
+        else:
+            short_html = str(descriptions.get("short_html") or "")
+
+        fragment = build_description_fragment(pid, short_html, long_html)
+        new_descriptions = build_descriptions(pid, short_html, long_html)
+
+        if fragment == existing_fragment and new_descriptions == descriptions:
+            counts["skipped"] += 1
+            continue
+
+        product["descriptions"] = new_descriptions
+
+        if not dry_run:
+            # fragment d'abord: un produit ne référence jamais un fragment absent
+            if fragment != existing_fragment:
+                atomic_write_json(fragment_path, fragment)
+            atomic_write_json(product_path, product)
+        counts["migrated"] += 1
+
+    return counts
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Extrait les descriptions longues en fragments séparés")
+    parser.add_argument("catalog_root", nargs="?", default=None)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    root = resolve_catalog_root(args.catalog_root)
+    use_persistent_cache(root)
+    with CatalogLease(root).hold():
+        counts = migrate(root, dry_run=args.dry_run)
+    print(f"{root}: {counts['migrated']} migrés, {counts['skipped']} ignorés, {counts['errors']} erreurs")
+    return 1 if counts["errors"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+# Migration: ajoute manufacturer_id aux entrées de index.products.json qui ne l'ont pas
+# (valeur lue dans products/NNNNNN.json, manufacturer.id), met à jour les empreintes
+# "index" de .publisher/hashes.json et régénère index.products.bin.
+#
+# Usage: python publisher/migrate_index.py [CATALOG_ROOT] [--dry-run]
+# Idempotent: une entrée qui a déjà manufacturer_id est ignorée.
+
+import argparse
+import sys
+from pathlib import Path
+
+from columnar import write_columnar_index
+from lease import CatalogLease
+from publish_core import load_hashes, save_hashes
+from records import ProductIndexRecord, load_index
+from utils import content_hash, pad6, read_json, resolve_catalog_root
+
+
+def _with_manufacturer_id(item: dict, manufacturer_id: int) -> dict:
+    # Même ordre de clés que publish_core.build_index_item
+    out = {}
+    for key, value in item.items():
+        if key == "manufacturer_name":
+            out["manufacturer_id"] = manufacturer_id
+        out[key] = value
+    out.setdefault("manufacturer_id", manufacturer_id)
+    return out
+
+
+def migrate(catalog_root: Path, dry_run: bool = False) -> dict:
+    index_path = catalog_root / "index.products.json"
+    products_index = load_index(index_path, ProductIndexRecord)
+    hashes = load_hashes(catalog_root)
+
+    counts = {"migrated": 0, "skipped": 0, "errors": 0}
+    hashes_changed = False
+    for item in list(products_index):
+        if "manufacturer_id" in item:
+            counts["skipped"] += 1
+            continue
+        try:
+            pid = int(item["id"])
+            product = read_json(catalog_root / "products" / f"{pad6(pid)}.json")
+            manufacturer_id = int((product.get("manufacturer") or {}).get("id"))
+        except Exception as e:
+            print(f"ERREUR produit {item.get('id')}: {e}", file=sys.stderr)
+            counts["errors"] += 1
+            continue
+
+        new_item = _with_manufacturer_id(item.to_json(), manufacturer_id)
+        products_index.replace(new_item)
+        entry_hashes = hashes["products"].get(str(pid))
+        if isinstance(entry_hashes, dict):
+            entry_hashes["index"] = content_hash(new_item)
+            hashes_changed = True
+        counts["migrated"] += 1
+
+    if counts["migrated"] and not dry_run:
+        products_index.save(index_path)
+    if hashes_changed and not dry_run:
+        save_hashes(catalog_root, hashes, lambda s: print(s, file=sys.stderr))
+    if not dry_run:
+        write_columnar_index(catalog_root, products_index)
+    return counts
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Ajoute manufacturer_id aux entrées de index.products.json")
+    parser.add_argument("catalog_root", nargs="?", default=None)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    root = resolve_catalog_root(args.catalog_root)
+    with CatalogLease(root).hold():
+        counts = migrate(root, dry_run=args.dry_run)
+    print(f"{root}: {counts['migrated']} migrés, {counts['skipped']} ignorés, {counts['errors']} erreurs")
+    return 1 if counts["errors"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -26,6 +26,20 @@ class DraftProduct(BaseModel):
     pdf_file: str | None = None
     active: bool = False
     accessories: list[int] | None = None
+    # uploads finalisés (sessions /api/catalog/uploads), à la place des fichiers multipart
+    image_upload_id: str | None = None
+    pdf_upload_id: str | None = None
+
+
+class TaxonomyRename(BaseModel):
+    name: str
+
+
+class UploadCreate(BaseModel):
+    filename: str
+    size: int
+    chunk_size: int | None = None
+    sha256: str | None = None
 
 
 class JobError(BaseModel):
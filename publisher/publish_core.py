@@ -1,15 +1,53 @@
 from __future__ import annotations
 
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Callable
 
+from columnar import write_columnar_index
+from html_stage import normalize_html
+from lease import state_dir
+from manifest import update_manifest
 from models import DraftProduct
-from utils import atomic_write_json, ensure_dir, file_ext_from_upload, pad6, slugify_ascii, strip_html
+from records import IndexFormatError, RecordIndex
+from relations import (
+    RELATIONS_FILENAME,
+    load_relations,
+    referencing,
+    relations_path,
+    remove_product,
+    set_accessories,
+)
+from relations import save_relations as save_relations_index
+from similar import RELATED_FILENAME, SimilarUnavailable, update_related
+from taxonomy import (
+    LEGACY_TAXONOMY_INDEX_FILENAME,
+    TAXONOMY_KINDS,
+    load_taxonomy_index,
+    product_category_ids,
+    products_for,
+    save_taxonomy_index,
+    set_product,
+    taxonomy_index_path,
+)
+from taxonomy import remove_product as remove_taxonomy_product
+from utils import (
+    atomic_write_json,
+    content_hash,
+    ensure_dir,
+    file_ext_from_upload,
+    pad6,
+    slugify_ascii,
+)
+from warm import load_catalog as load_warm_catalog
+from warm import remember_catalog
 
 
 LogFn = Callable[[str], None]
 ProgressFn = Callable[[int], None]
+# Vérifie que le bail d'écriture catalogue est toujours détenu (lève sinon).
+FenceFn = Callable[[], None]
 
 
 class PublishError(RuntimeError):
@@ -19,7 +57,7 @@ class PublishError(RuntimeError):
         self.message = message
 
 
-def _load_catalog(catalog_root: Path):
+def load_catalog(catalog_root: Path):
     products_index_path = catalog_root / "index.products.json"
     search_index_path = catalog_root / "index.search.json"
     manufacturers_path = catalog_root / "taxonomies" / "manufacturers.json"
@@ -32,24 +70,29 @@ def _load_catalog(catalog_root: Path):
     if not categories_path.exists():
         raise PublishError("catalog_missing", f"Fichier manquant: {categories_path}")
 
-    products_index = _read_json(products_index_path)
-    search_index = _read_json(search_index_path) if search_index_path.exists() else []
-
-    manufacturers = _read_json(manufacturers_path)
-    categories = _read_json(categories_path)
+    # Entrées compactes (records.py); dans l'app, copie du catalogue chaud (warm.py)
+    try:
+        catalog = load_warm_catalog(catalog_root)
+    except IndexFormatError as e:
+        raise PublishError("catalog_invalid", f"{e}")
 
     return {
         "products_index_path": products_index_path,
         "search_index_path": search_index_path,
         "manufacturers_path": manufacturers_path,
         "categories_path": categories_path,
-        "products_index": products_index,
-        "search_index": search_index,
-        "manufacturers": manufacturers,
-        "categories": categories,
+        **catalog,
     }
 
 
+def _remember_catalog(catalog_root: Path, data: dict, log: LogFn) -> None:
+    # Le job suivant repart de ce catalogue en mémoire plutôt que de relire les index (fail-soft)
+    try:
+        remember_catalog(catalog_root, data)
+    except Exception as e:
+        log(f"WARN cache catalogue non mis à jour: {e}")
+
+
 def _read_json(path: Path):
     import json
 
@@ -57,7 +100,7 @@ def _read_json(path: Path):
         return json.load(f)
 
 
-def _category_maps(categories_payload: dict):
+def category_maps(categories_payload: dict):
     cats = categories_payload.get("categories")
     if not isinstance(cats, list):
         cats = []
@@ -76,7 +119,7 @@ def _category_maps(categories_payload: dict):
     return by_id
 
 
-def _manufacturer_map(manufacturers_payload: dict):
+def manufacturer_map(manufacturers_payload: dict):
     mans = manufacturers_payload.get("manufacturers")
     if not isinstance(mans, list):
         mans = []
@@ -132,7 +175,274 @@ def _compute_category_paths(category_ids: list[int], categories_by_id: dict[int,
     return paths
 
 
-def _validate_draft(catalog_root: Path, draft: DraftProduct, log: LogFn) -> None:
+def description_fragment_rel(pid: int) -> str:
+    return f"descriptions/{pad6(pid)}.json"
+
+
+def build_description_fragment(pid: int, short_html: str, long_html: str) -> dict:
+    # Description longue servie à part: le JSON produit reste léger pour le premier rendu.
+    # HTML brut des deux descriptions conservé pour l'éditeur admin (le produit ne porte que
+    # short_html normalisé).
+    return {
+        "id": int(pid),
+        "short_html": short_html,
+        "long_html": long_html,
+        "long_html_min": normalize_html(long_html).html,
+    }
+
+
+def build_descriptions(pid: int, short_html: str, long_html: str) -> dict:
+    # short_html est stocké normalisé (minifié/sanitisé), le brut dans le fragment; l'extrait
+    # texte est précalculé.
+    short = normalize_html(short_html)
+    excerpt = short.excerpt or normalize_html(long_html).excerpt
+    return {"short_html": short.html, "excerpt": excerpt, "long_html_ref": description_fragment_rel(pid)}
+
+
+def build_product_json(
+    pid: int,
+    slug: str,
+    draft: DraftProduct,
+    manufacturer_name: str,
+    categories: list[dict],
+    category_paths: list[list[dict]],
+    cover_rel: str,
+    pdfs: list[str],
+    images: list[dict] | None = None,
+) -> dict:
+    # images: médias déjà construits (import PrestaShop); sinon une image "admin" de couverture.
+    if images is None:
+        images = [
+            {
+                "type": "admin",
+                "source_id_image": None,
+                "files": [cover_rel],
+            }
+        ]
+    return {
+        "id": pid,
+        "slug": slug,
+        "active": bool(draft.active),
+        "reference": (draft.reference or None),
+        "name": draft.name,
+        "specs": [
+            {"name": (s.name or "").strip(), "value": (s.value or "").strip()}
+            for s in (draft.specs or [])
+            if (s.name or "").strip() and (s.value or "").strip()
+        ],
+        "descriptions": build_descriptions(pid, draft.short_html, draft.long_html),
+        "pricing": {"currency": "CHF", "price_ht": float(draft.price_ht), "price_ttc": None, "promo": None},
+        "manufacturer": {"id": int(draft.manufacturer_id), "name": manufacturer_name},
+        "categories": categories,
+        "category_paths": category_paths,
+        "media": {
+            "images": images,
+            "pdfs": pdfs,
+            "attachments_meta": [],
+            "pdfs_missing": False if pdfs else True,
+        },
+        "relations": {"accessories": [int(x) for x in (draft.accessories or []) if isinstance(x, int) or str(x).isdigit()]},
+    }
+
+
+def resolve_taxonomy(
+    draft: DraftProduct,
+    cats_by_id: dict[int, dict],
+    mans_by_id: dict[int, dict],
+) -> tuple[str, list[dict], list[list[dict]]]:
+    manufacturer = mans_by_id.get(int(draft.manufacturer_id)) or {}
+    manufacturer_name = str(manufacturer.get("name") or "").strip()
+    categories = []
+    for cid in draft.category_ids:
+        c = cats_by_id[int(cid)]
+        categories.append({"id": int(cid), "name": str(c.get("name") or "").strip() or str(cid)})
+
+    category_paths = _compute_category_paths([int(x) for x in draft.category_ids], cats_by_id)
+    return manufacturer_name, categories, category_paths
+
+
+def build_index_item(
+    pid: int,
+    slug: str,
+    draft: DraftProduct,
+    manufacturer_name: str,
+    cover_rel: str,
+) -> dict:
+    return {
+        "id": pid,
+        "slug": slug,
+        "active": bool(draft.active),
+        "name": draft.name,
+        "price_ht": float(draft.price_ht),
+        "manufacturer_id": int(draft.manufacturer_id),
+        "manufacturer_name": manufacturer_name,
+        "category_ids": [int(x) for x in draft.category_ids],
+        "cover_image": cover_rel,
+    }
+
+
+def build_search_item(pid: int, draft: DraftProduct, manufacturer_name: str, categories: list[dict]) -> dict:
+    cat_names = " ".join([c["name"] for c in categories if c.get("name")])
+    parts = [draft.name, cat_names, manufacturer_name, normalize_html(draft.short_html).text]
+    hay = " ".join(p for p in parts if p).strip()
+    return {"id": pid, "haystack": hay}
+
+
+# Ancien emplacement des empreintes, servi publiquement: relu à défaut, supprimé à la prochaine écriture
+_LEGACY_HASHES_FILENAME = "index.hashes.json"
+
+
+def hashes_path(catalog_root: Path) -> Path:
+    return state_dir(catalog_root) / "hashes.json"
+
+
+def load_hashes(catalog_root: Path) -> dict:
+    # Empreintes sha256 par produit: document products/NNNNNN.json + entrées d'index.
+    # Fichier optionnel (absent sur un catalogue fraîchement exporté).
+    path = hashes_path(catalog_root)
+    if not path.exists():
+        path = catalog_root / _LEGACY_HASHES_FILENAME
+    if not path.exists():
+        return {"products": {}}
+    try:
+        payload = _read_json(path)
+    except Exception:
+        return {"products": {}}
+    if not isinstance(payload, dict) or not isinstance(payload.get("products"), dict):
+        return {"products": {}}
+    return payload
+
+
+def save_hashes(catalog_root: Path, hashes: dict, log: LogFn) -> None:
+    # fail-soft: les empreintes sont un cache, on ne fait pas échouer la publication
+    try:
+        atomic_write_json(hashes_path(catalog_root), hashes)
+        (catalog_root / _LEGACY_HASHES_FILENAME).unlink(missing_ok=True)
+    except Exception as e:
+        log(f"WARN écriture empreintes impossible: {e}")
+
+
+def hash_entry(product_json: dict, fragment: dict, index_item: dict, search_item: dict) -> dict:
+    return {
+        "product": content_hash(product_json),
+        "description": content_hash(fragment),
+        "index": content_hash(index_item),
+        "search": content_hash(search_item),
+    }
+
+
+def save_relations(catalog_root: Path, relations: dict, log: LogFn) -> None:
+    # fail-soft: en cas d'échec on supprime l'index, reconstruit par scan au prochain chargement
+    try:
+        save_relations_index(catalog_root, relations)
+    except Exception as e:
+        log(f"WARN écriture index relations impossible: {e}")
+        try:
+            relations_path(catalog_root).unlink()
+        except Exception:
+            pass
+
+
+def _update_relations(catalog_root: Path, pid: int, accessories: list[int], log: LogFn) -> None:
+    try:
+        existed = relations_path(catalog_root).exists()
+        relations = load_relations(catalog_root)
+        if set_accessories(relations, pid, accessories) or not existed:
+            save_relations(catalog_root, relations, log)
+    except Exception as e:
+        log(f"WARN mise à jour index relations impossible: {e}")
+
+
+def _update_taxonomy_index(catalog_root: Path, pid: int, product_json: dict | None, log: LogFn) -> None:
+    # product_json None: produit supprimé. fail-soft comme l'index des relations.
+    try:
+        existed = taxonomy_index_path(catalog_root).exists()
+        index = load_taxonomy_index(catalog_root)
+        if product_json is None:
+            changed = remove_taxonomy_product(index, pid)
+        else:
+            manufacturer_id = int((product_json.get("manufacturer") or {}).get("id"))
+            changed = set_product(index, pid, manufacturer_id, product_category_ids(product_json))
+        if changed or not existed:
+            save_taxonomy_index(catalog_root, index)
+    except Exception as e:
+        log(f"WARN mise à jour index taxonomie impossible: {e}")
+        try:
+            taxonomy_index_path(catalog_root).unlink()
+        except Exception:
+            pass
+
+
+def _related_row(pid: int, product_json: dict, search_item: dict) -> dict:
+    return {
+        "id": pid,
+        "text": search_item.get("haystack") or "",
+        "categories": product_category_ids(product_json),
+        "manufacturer": (product_json.get("manufacturer") or {}).get("id"),
+        "active": bool(product_json.get("active")),
+    }
+
+
+def _update_related(catalog_root: Path, upserts: list[dict], removed: list[int], log: LogFn) -> None:
+    # Produits similaires: dérivé, numpy optionnel, fail-soft
+    try:
+        update_related(catalog_root, upserts, removed)
+    except SimilarUnavailable as e:
+        log(f"INFO {e}")
+    except Exception as e:
+        log(f"WARN mise à jour produits similaires impossible: {e}")
+
+
+def write_products_index(catalog_root: Path, data: dict, products_index: RecordIndex, log: LogFn) -> None:
+    products_index.save(data["products_index_path"])
+    # Export colonnaire dérivé: index.products.json reste la source de vérité (fail-soft).
+    try:
+        write_columnar_index(catalog_root, products_index)
+    except Exception as e:
+        log(f"WARN écriture index colonnaire impossible: {e}")
+
+
+# Fichiers d'index régénérés à chaque publish (relatifs à CATALOG_ROOT). Les empreintes et
+# l'index taxonomie vivent sous .publisher/ (hors manifest); leurs anciens emplacements publics
+# restent listés pour que leur suppression sorte du manifest.
+_INDEX_FILES = (
+    "index.products.json",
+    "index.products.bin",
+    "index.search.json",
+    RELATIONS_FILENAME,
+    RELATED_FILENAME,
+    _LEGACY_HASHES_FILENAME,
+    LEGACY_TAXONOMY_INDEX_FILENAME,
+)
+
+
+def _record_manifest_paths(catalog_root: Path, rel_paths: list[str], log: LogFn) -> None:
+    # Manifest de déploiement: on ne rafraîchit que les chemins touchés par l'opération (fail-soft).
+    try:
+        update_manifest(catalog_root, rel_paths)
+    except Exception as e:
+        log(f"WARN mise à jour manifest impossible: {e}")
+
+
+def _record_manifest(
+    catalog_root: Path, pid: int, slug: str | None, log: LogFn, extra_paths: list[str] | None = None
+) -> None:
+    rel_paths = [*_INDEX_FILES, f"products/{pad6(pid)}.json", description_fragment_rel(pid), *(extra_paths or [])]
+    if slug:
+        rel_paths.append(f"assets/products/{pid}__{slug}")
+    _record_manifest_paths(catalog_root, rel_paths, log)
+
+
+def _check_fence(fence: FenceFn | None) -> None:
+    if fence is None:
+        return
+    try:
+        fence()
+    except Exception as e:
+        raise PublishError("lease_lost", f"Écriture refusée: {e}")
+
+
+def _validate_draft(data: dict, draft: DraftProduct, log: LogFn, product_id: int | None = None) -> None:
     if not isinstance(draft.name, str) or not draft.name.strip():
         raise PublishError("invalid_draft", "name requis")
     if not isinstance(draft.short_html, str) or not draft.short_html.strip():
@@ -146,10 +456,9 @@ def _validate_draft(catalog_root: Path, draft: DraftProduct, log: LogFn) -> None
     if not isinstance(draft.category_ids, list) or len(draft.category_ids) < 1:
         raise PublishError("invalid_draft", "category_ids doit contenir au moins 1 id")
 
-    # Vérifie que les IDs existent
-    data = _load_catalog(catalog_root)
-    cats_by_id = _category_maps(data["categories"])
-    mans_by_id = _manufacturer_map(data["manufacturers"])
+    # Vérifie que les IDs existent (catalogue déjà chargé par l'appelant)
+    cats_by_id = category_maps(data["categories"])
+    mans_by_id = manufacturer_map(data["manufacturers"])
 
     if int(draft.manufacturer_id) not in mans_by_id:
         raise PublishError("invalid_draft", "manufacturer_id inexistant")
@@ -158,6 +467,14 @@ def _validate_draft(catalog_root: Path, draft: DraftProduct, log: LogFn) -> None
     if missing:
         raise PublishError("invalid_draft", f"category_ids inexistants: {missing}")
 
+    if draft.accessories:
+        known = set(data["products_index"].ids())
+        if product_id is not None and int(product_id) in {int(a) for a in draft.accessories}:
+            raise PublishError("invalid_draft", "un produit ne peut pas être son propre accessoire")
+        missing = [a for a in draft.accessories if int(a) not in known]
+        if missing:
+            raise PublishError("invalid_draft", f"accessories inexistants: {missing}")
+
     log("Contrat draft OK")
 
 
@@ -168,44 +485,25 @@ def create_product(
     pdf_file,
     log: LogFn,
     progress: ProgressFn,
+    fence: FenceFn | None = None,
 ) -> dict:
     progress(1)
-    _validate_draft(catalog_root, draft, log)
+    data = load_catalog(catalog_root)
+    _validate_draft(data, draft, log)
 
-    data = _load_catalog(catalog_root)
     products_index = data["products_index"]
     search_index = data["search_index"]
 
-    if not isinstance(products_index, list):
-        raise PublishError("catalog_invalid", "index.products.json: tableau attendu")
-    if not isinstance(search_index, list):
-        raise PublishError("catalog_invalid", "index.search.json: tableau attendu")
+    cats_by_id = category_maps(data["categories"])
+    mans_by_id = manufacturer_map(data["manufacturers"])
 
-    cats_by_id = _category_maps(data["categories"])
-    mans_by_id = _manufacturer_map(data["manufacturers"])
-
-    next_id = 1
-    for p in products_index:
-        if not isinstance(p, dict):
-            continue
-        try:
-            pid = int(p.get("id"))
-        except Exception:
-            continue
-        if pid >= next_id:
-            next_id = pid + 1
+    next_id = max(products_index.ids(), default=0) + 1
 
     slug = slugify_ascii(draft.name)
     if not slug:
         slug = f"produit-{next_id}"
 
-    manufacturer_name = str(mans_by_id[int(draft.manufacturer_id)].get("name") or "").strip()
-    categories = []
-    for cid in draft.category_ids:
-        c = cats_by_id[int(cid)]
-        categories.append({"id": int(cid), "name": str(c.get("name") or "").strip() or str(cid)})
-
-    category_paths = _compute_category_paths([int(x) for x in draft.category_ids], cats_by_id)
+    manufacturer_name, categories, category_paths = resolve_taxonomy(draft, cats_by_id, mans_by_id)
 
     # Paths
     assets_dir = catalog_root / "assets" / "products" / f"{next_id}__{slug}"
@@ -215,6 +513,7 @@ def create_product(
     products_dir = catalog_root / "products"
     product_path = products_dir / f"{pad6(next_id)}.json"
 
+    _check_fence(fence)
     ensure_dir(images_dir)
     ensure_dir(products_dir)
 
@@ -244,36 +543,14 @@ def create_product(
 
     progress(65)
 
-    product_json = {
-        "id": next_id,
-        "slug": slug,
-        "active": bool(draft.active),
-        "reference": (draft.reference or None),
-        "name": draft.name,
-        "specs": [
-            {"name": (s.name or "").strip(), "value": (s.value or "").strip()}
-            for s in (draft.specs or [])
-            if (s.name or "").strip() and (s.value or "").strip()
-        ],
-        "descriptions": {"short_html": draft.short_html, "long_html": draft.long_html},
-        "pricing": {"currency": "CHF", "price_ht": float(draft.price_ht), "price_ttc": None, "promo": None},
-        "manufacturer": {"id": int(draft.manufacturer_id), "name": manufacturer_name},
-        "categories": categories,
-        "category_paths": category_paths,
-        "media": {
-            "images": [
-                {
-                    "type": "admin",
-                    "source_id_image": None,
-                    "files": [cover_rel],
-                }
-            ],
-            "pdfs": pdfs,
-            "attachments_meta": [],
-            "pdfs_missing": False if pdfs else True,
-        },
-        "relations": {"accessories": [int(x) for x in (draft.accessories or []) if isinstance(x, int) or str(x).isdigit()]},
-    }
+    product_json = build_product_json(
+        next_id, slug, draft, manufacturer_name, categories, category_paths, cover_rel, pdfs
+    )
+    fragment = build_description_fragment(next_id, draft.short_html, draft.long_html)
+    fragment_path = catalog_root / description_fragment_rel(next_id)
+
+    log(f"Écriture description: {description_fragment_rel(next_id)}")
+    atomic_write_json(fragment_path, fragment)
 
     log(f"Écriture produit: products/{pad6(next_id)}.json")
     atomic_write_json(product_path, product_json)
@@ -281,46 +558,30 @@ def create_product(
     progress(78)
 
     # Index update
-    idx_item = {
-        "id": next_id,
-        "slug": slug,
-        "active": bool(draft.active),
-        "name": draft.name,
-        "price_ht": float(draft.price_ht),
-        "manufacturer_name": manufacturer_name,
-        "category_ids": [int(x) for x in draft.category_ids],
-        "cover_image": cover_rel,
-    }
-
+    idx_item = build_index_item(next_id, slug, draft, manufacturer_name, cover_rel)
     products_index.append(idx_item)
 
     # search haystack
-    cat_names = " ".join([c["name"] for c in categories if c.get("name")])
-    hay = " ".join(
-        [
-            draft.name,
-            cat_names,
-            manufacturer_name,
-            strip_html(draft.short_html),
-        ]
-    ).strip()
+    search_item = build_search_item(next_id, draft, manufacturer_name, categories)
 
     # remplace si déjà présent par sécurité
-    search_index = [x for x in search_index if not (isinstance(x, dict) and int(x.get("id", -1)) == next_id)]
-    search_index.append({"id": next_id, "haystack": hay})
+    search_index.remove(next_id)
+    search_index.append(search_item)
 
+    _check_fence(fence)
     log("Écriture atomique des index")
     try:
-        atomic_write_json(data["products_index_path"], products_index)
-        atomic_write_json(data["search_index_path"], search_index)
+        write_products_index(catalog_root, data, products_index, log)
+        search_index.save(data["search_index_path"])
     except Exception as e:
         # Rollback: on ne laisse pas un produit référencé/partiellement créé.
         log(f"Échec écriture index, rollback: {e}")
-        try:
-            if product_path.exists():
-                product_path.unlink()
-        except Exception:
-            pass
+        for path in (product_path, fragment_path):
+            try:
+                if path.exists():
+                    path.unlink()
+            except Exception:
+                pass
         try:
             if assets_dir.exists():
                 shutil.rmtree(assets_dir)
@@ -328,10 +589,39 @@ def create_product(
             pass
         raise
 
+    hashes = load_hashes(catalog_root)
+    hashes["products"][str(next_id)] = hash_entry(product_json, fragment, idx_item, search_item)
+    save_hashes(catalog_root, hashes, log)
+    _update_relations(catalog_root, next_id, product_json["relations"]["accessories"], log)
+    _update_taxonomy_index(catalog_root, next_id, product_json, log)
+    _update_related(catalog_root, [_related_row(next_id, product_json, search_item)], [], log)
+    _record_manifest(catalog_root, next_id, slug, log)
+
+    _remember_catalog(catalog_root, data, log)
     progress(100)
     return {"id": next_id, "slug": slug}
 
 
+def _keep_published_fields(product_json: dict, existing: dict, image_kept: bool, assets_changed: bool) -> None:
+    """Reprend du document publié ce que le draft ne porte pas (médias importés, breadcrumbs,
+    référence vide), pour qu'un produit ré-enregistré sans modification garde son empreinte."""
+    existing_media = existing.get("media") if isinstance(existing.get("media"), dict) else {}
+    media = product_json["media"]
+    if image_kept and isinstance(existing_media.get("images"), list) and existing_media["images"]:
+        media["images"] = existing_media["images"]
+    if not assets_changed:
+        for key in ("attachments_meta", "pdfs_missing"):
+            if key in existing_media:
+                media[key] = existing_media[key]
+
+    # Breadcrumbs de l'export conservés tant que les catégories (ids et noms) sont les mêmes
+    if existing.get("categories") == product_json["categories"] and isinstance(existing.get("category_paths"), list):
+        product_json["category_paths"] = existing["category_paths"]
+
+    if product_json["reference"] is None and existing.get("reference") == "":
+        product_json["reference"] = ""
+
+
 def update_product(
     catalog_root: Path,
     product_id: int,
@@ -341,19 +631,15 @@ def update_product(
     remove_pdf: bool,
     log: LogFn,
     progress: ProgressFn,
+    fence: FenceFn | None = None,
 ) -> dict:
     progress(1)
-    _validate_draft(catalog_root, draft, log)
+    data = load_catalog(catalog_root)
+    _validate_draft(data, draft, log, product_id=int(product_id))
 
-    data = _load_catalog(catalog_root)
     products_index = data["products_index"]
     search_index = data["search_index"]
 
-    if not isinstance(products_index, list):
-        raise PublishError("catalog_invalid", "index.products.json: tableau attendu")
-    if not isinstance(search_index, list):
-        raise PublishError("catalog_invalid", "index.search.json: tableau attendu")
-
     pid = int(product_id)
     product_path = catalog_root / "products" / f"{pad6(pid)}.json"
     if not product_path.exists():
@@ -364,26 +650,33 @@ def update_product(
     if not slug:
         raise PublishError("catalog_invalid", "Produit existant sans slug")
 
-    cats_by_id = _category_maps(data["categories"])
-    mans_by_id = _manufacturer_map(data["manufacturers"])
+    if draft.accessories is None:
+        # Champ absent du payload (éditeur admin): on conserve les accessoires publiés.
+        relations_existing = existing.get("relations") if isinstance(existing.get("relations"), dict) else {}
+        kept = [int(x) for x in (relations_existing.get("accessories") or []) if str(x).isdigit()]
+        draft = draft.model_copy(update={"accessories": kept})
 
-    manufacturer_name = str(mans_by_id[int(draft.manufacturer_id)].get("name") or "").strip()
-    categories = []
-    for cid in draft.category_ids:
-        c = cats_by_id[int(cid)]
-        categories.append({"id": int(cid), "name": str(c.get("name") or "").strip() or str(cid)})
+    cats_by_id = category_maps(data["categories"])
+    mans_by_id = manufacturer_map(data["manufacturers"])
 
-    category_paths = _compute_category_paths([int(x) for x in draft.category_ids], cats_by_id)
+    manufacturer_name, categories, category_paths = resolve_taxonomy(draft, cats_by_id, mans_by_id)
 
     assets_dir = catalog_root / "assets" / "products" / f"{pid}__{slug}"
     images_dir = assets_dir / "images"
     pdf_dir = assets_dir / "pdf"
 
-    ensure_dir(images_dir)
+    existing_media = existing.get("media") if isinstance(existing.get("media"), dict) else {}
+
+    # Sans upload ni suppression, aucun accès disque aux assets: on reprend les médias existants.
+    assets_changed = image_file_opt is not None or pdf_file_opt is not None or bool(remove_pdf)
+
+    if assets_changed:
+        _check_fence(fence)
 
     # Image (optionnelle)
     cover_rel = None
     if image_file_opt is not None:
+        ensure_dir(images_dir)
         ext = file_ext_from_upload(getattr(image_file_opt, "filename", None))
         cover_rel = f"assets/products/{pid}__{slug}/images/cover-large_default.{ext}"
         cover_abs = catalog_root / cover_rel
@@ -418,7 +711,9 @@ def update_product(
         with pdf_abs.open("wb") as out:
             shutil.copyfileobj(pdf_file_opt.file, out)
         pdfs = [pdf_rel]
-    else:
+    elif not assets_changed:
+        pdfs = [str(x) for x in (existing_media.get("pdfs") or []) if isinstance(x, str) and x]
+    elif not remove_pdf:
         pdf_path = pdf_dir / "fiche.pdf"
         if pdf_path.exists():
             pdfs = [f"assets/products/{pid}__{slug}/pdf/fiche.pdf"]
@@ -427,14 +722,19 @@ def update_product(
 
     # cover_image: garde l'existant si pas de nouvelle image
     if not cover_rel:
-        cover_rel = None
         # essaie de retrouver via index existant
-        for item in products_index:
-            if isinstance(item, dict) and int(item.get("id", -1)) == pid:
-                cover_rel = str(item.get("cover_image") or "").strip() or None
-                break
-        # fallback: cherche un cover-large_default.*
+        item = products_index.get(pid)
+        if item:
+            cover_rel = str(item.get("cover_image") or "").strip() or None
+        # puis via le document produit existant
         if not cover_rel:
+            for img in existing_media.get("images") or []:
+                files = img.get("files") if isinstance(img, dict) else None
+                if isinstance(files, list) and files:
+                    cover_rel = str(files[0] or "").strip() or None
+                    break
+        # fallback: cherche un cover-large_default.*
+        if not cover_rel and images_dir.exists():
             found = next(iter(images_dir.glob("cover-large_default.*")), None)
             if found:
                 cover_rel = f"assets/products/{pid}__{slug}/images/{found.name}"
@@ -442,91 +742,102 @@ def update_product(
     if not cover_rel:
         raise PublishError("catalog_invalid", "Image de couverture introuvable (fournissez une image)")
 
-    product_json = {
-        "id": pid,
-        "slug": slug,
-        "active": bool(draft.active),
-        "reference": (draft.reference or None),
-        "name": draft.name,
-        "specs": [
-            {"name": (s.name or "").strip(), "value": (s.value or "").strip()}
-            for s in (draft.specs or [])
-            if (s.name or "").strip() and (s.value or "").strip()
-        ],
-        "descriptions": {"short_html": draft.short_html, "long_html": draft.long_html},
-        "pricing": {"currency": "CHF", "price_ht": float(draft.price_ht), "price_ttc": None, "promo": None},
-        "manufacturer": {"id": int(draft.manufacturer_id), "name": manufacturer_name},
-        "categories": categories,
-        "category_paths": category_paths,
-        "media": {
-            "images": [
-                {
-                    "type": "admin",
-                    "source_id_image": None,
-                    "files": [cover_rel],
-                }
-            ],
-            "pdfs": pdfs,
-            "attachments_meta": [],
-            "pdfs_missing": False if pdfs else True,
-        },
-        "relations": {"accessories": [int(x) for x in (draft.accessories or []) if isinstance(x, int) or str(x).isdigit()]},
-    }
-
-    log(f"Réécriture produit: products/{pad6(pid)}.json")
-    atomic_write_json(product_path, product_json)
+    product_json = build_product_json(
+        pid, slug, draft, manufacturer_name, categories, category_paths, cover_rel, pdfs
+    )
+    _keep_published_fields(product_json, existing, image_file_opt is None, assets_changed)
+    fragment = build_description_fragment(pid, draft.short_html, draft.long_html)
+    fragment_path = catalog_root / description_fragment_rel(pid)
+    existing_fragment = None
+    if fragment_path.exists():
+        try:
+            existing_fragment = _read_json(fragment_path)
+        except Exception:
+            existing_fragment = None
+    new_item = build_index_item(pid, slug, draft, manufacturer_name, cover_rel)
+    search_item = build_search_item(pid, draft, manufacturer_name, categories)
+
+    # Comparaison par empreinte avec l'état réellement publié (et non l'empreinte stockée,
+    # qui peut être périmée si le catalogue a été ré-exporté).
+    new_hashes = hash_entry(product_json, fragment, new_item, search_item)
+    old_item = products_index.get(pid)
+    old_search = search_index.get(pid)
+    product_changed = content_hash(existing) != new_hashes["product"]
+    description_changed = existing_fragment is None or content_hash(existing_fragment) != new_hashes["description"]
+    index_changed = old_item is None or content_hash(old_item) != new_hashes["index"]
+    search_changed = old_search is None or content_hash(old_search) != new_hashes["search"]
+
+    if not (product_changed or description_changed or index_changed or search_changed):
+        # empreintes comprises: la comparaison ci-dessus ne dépend pas des empreintes stockées
+        log("Aucun changement détecté, aucune écriture")
+        progress(100)
+        return {"id": pid, "slug": slug, "status": "unchanged"}
+
+    hashes = load_hashes(catalog_root)
+
+    _check_fence(fence)
+    if description_changed:
+        log(f"Réécriture description: {description_fragment_rel(pid)}")
+        atomic_write_json(fragment_path, fragment)
+
+    if product_changed:
+        log(f"Réécriture produit: products/{pad6(pid)}.json")
+        atomic_write_json(product_path, product_json)
+    else:
+        log(f"Produit inchangé: products/{pad6(pid)}.json")
 
     progress(78)
 
-    # Update index.products (remplacement)
-    new_item = {
-        "id": pid,
-        "slug": slug,
-        "active": bool(draft.active),
-        "name": draft.name,
-        "price_ht": float(draft.price_ht),
-        "manufacturer_name": manufacturer_name,
-        "category_ids": [int(x) for x in draft.category_ids],
-        "cover_image": cover_rel,
-    }
-
-    replaced = False
-    for i, item in enumerate(products_index):
-        if isinstance(item, dict) and int(item.get("id", -1)) == pid:
-            products_index[i] = new_item
-            replaced = True
-            break
-    if not replaced:
-        products_index.append(new_item)
-
-    cat_names = " ".join([c["name"] for c in categories if c.get("name")])
-    hay = " ".join(
-        [
-            draft.name,
-            cat_names,
-            manufacturer_name,
-            strip_html(draft.short_html),
-        ]
-    ).strip()
+    if not (index_changed or search_changed):
+        log("Index inchangés, pas de réécriture")
+    else:
+        if index_changed:
+            # Update index.products (remplacement)
+            products_index.replace(new_item)
 
-    search_index = [x for x in search_index if not (isinstance(x, dict) and int(x.get("id", -1)) == pid)]
-    search_index.append({"id": pid, "haystack": hay})
+        if search_changed:
+            search_index.remove(pid)
+            search_index.append(search_item)
 
-    log("Écriture atomique des index")
-    try:
-        atomic_write_json(data["products_index_path"], products_index)
-        atomic_write_json(data["search_index_path"], search_index)
-    except Exception as e:
-        # Rollback: on restaure le produit précédent si les index n'ont pas pu être mis à jour.
-        log(f"Échec écriture index, rollback produit: {e}")
+        _check_fence(fence)
+        log("Écriture atomique des index")
         try:
-            atomic_write_json(product_path, existing)
-        except Exception:
-            pass
-        raise
-
+            if index_changed:
+                write_products_index(catalog_root, data, products_index, log)
+            if search_changed:
+                search_index.save(data["search_index_path"])
+        except Exception as e:
+            # Rollback: on restaure le produit précédent si les index n'ont pas pu être mis à jour.
+            log(f"Échec écriture index, rollback produit: {e}")
+            if product_changed:
+                try:
+                    atomic_write_json(product_path, existing)
+                except Exception:
+                    pass
+            if description_changed:
+                try:
+                    if existing_fragment is not None:
+                        atomic_write_json(fragment_path, existing_fragment)
+                    elif fragment_path.exists():
+                        fragment_path.unlink()
+                except Exception:
+                    pass
+            raise
+
+    hashes["products"][str(pid)] = new_hashes
+    save_hashes(catalog_root, hashes, log)
+    if product_changed:
+        _update_relations(catalog_root, pid, product_json["relations"]["accessories"], log)
+        _update_taxonomy_index(catalog_root, pid, product_json, log)
+    # Produits similaires: seulement si la ligne de calcul (texte, catégories, fabricant, actif) change
+    related_row = _related_row(pid, product_json, search_item)
+    if old_search is None or related_row != _related_row(pid, existing, old_search):
+        _update_related(catalog_root, [related_row], [], log)
+    _record_manifest(catalog_root, pid, slug, log)
+
+    _remember_catalog(catalog_root, data, log)
     progress(100)
-    return {"id": pid, "slug": slug}
+    return {"id": pid, "slug": slug, "status": "updated"}
 
 
 def delete_product(
@@ -534,33 +845,58 @@ def delete_product(
     product_id: int,
     log: LogFn,
     progress: ProgressFn,
+    fence: FenceFn | None = None,
+    cascade: bool = False,
 ) -> dict:
     progress(1)
-    data = _load_catalog(catalog_root)
+    data = load_catalog(catalog_root)
     products_index = data["products_index"]
     search_index = data["search_index"]
 
-    if not isinstance(products_index, list):
-        raise PublishError("catalog_invalid", "index.products.json: tableau attendu")
-    if not isinstance(search_index, list):
-        raise PublishError("catalog_invalid", "index.search.json: tableau attendu")
-
     pid = int(product_id)
     product_path = catalog_root / "products" / f"{pad6(pid)}.json"
 
-    slug = None
-    for item in products_index:
-        if isinstance(item, dict) and int(item.get("id", -1)) == pid:
-            slug = str(item.get("slug") or "").strip() or None
-            break
+    item = products_index.get(pid)
+    slug = (str(item.get("slug") or "").strip() or None) if item else None
+
+    # Produits qui listent celui-ci comme accessoire (index inverse, sans scan du catalogue)
+    relations = load_relations(catalog_root)
+    refs = [r for r in referencing(relations, pid) if r != pid]
+    if refs and not cascade:
+        raise PublishError(
+            "referenced",
+            f"Produit listé comme accessoire par {refs} (relancez avec cascade pour retirer ces références)",
+        )
 
     # On écrit d'abord les index (atomique) pour éviter un état « index supprimé partiellement ».
-    products_index2 = [x for x in products_index if not (isinstance(x, dict) and int(x.get("id", -1)) == pid)]
-    search_index2 = [x for x in search_index if not (isinstance(x, dict) and int(x.get("id", -1)) == pid)]
+    products_index.remove(pid)
+    search_index.remove(pid)
 
+    _check_fence(fence)
     log("Écriture atomique des index")
-    atomic_write_json(data["products_index_path"], products_index2)
-    atomic_write_json(data["search_index_path"], search_index2)
+    write_products_index(catalog_root, data, products_index, log)
+    search_index.save(data["search_index_path"])
+
+    progress(40)
+
+    hashes = load_hashes(catalog_root)
+    cascaded = []
+    for ref in refs:
+        ref_rel = f"products/{pad6(ref)}.json"
+        ref_path = catalog_root / ref_rel
+        if not ref_path.exists():
+            continue
+        ref_json = _read_json(ref_path)
+        ref_relations = ref_json.get("relations") if isinstance(ref_json.get("relations"), dict) else {}
+        ref_relations["accessories"] = [a for a in ref_relations.get("accessories") or [] if str(a) != str(pid)]
+        ref_json["relations"] = ref_relations
+        _check_fence(fence)
+        log(f"Retrait de l'accessoire #{pid}: {ref_rel}")
+        atomic_write_json(ref_path, ref_json)
+        entry = hashes["products"].get(str(ref))
+        if isinstance(entry, dict):
+            entry["product"] = content_hash(ref_json)
+        cascaded.append(ref_rel)
 
     progress(55)
 
@@ -571,6 +907,22 @@ def delete_product(
         except Exception as e:
             raise PublishError("delete_failed", f"Impossible de supprimer le produit: {e}")
 
+    fragment_path = catalog_root / description_fragment_rel(pid)
+    if fragment_path.exists():
+        log(f"Suppression description: {description_fragment_rel(pid)}")
+        try:
+            fragment_path.unlink()
+        except Exception as e:
+            raise PublishError("delete_failed", f"Impossible de supprimer la description: {e}")
+
+    if hashes["products"].pop(str(pid), None) is not None or cascaded:
+        save_hashes(catalog_root, hashes, log)
+
+    remove_product(relations, pid)
+    save_relations(catalog_root, relations, log)
+    _update_taxonomy_index(catalog_root, pid, None, log)
+    _update_related(catalog_root, [], [pid], log)
+
     progress(75)
 
     if slug:
@@ -582,5 +934,187 @@ def delete_product(
             except Exception as e:
                 raise PublishError("delete_failed", f"Impossible de supprimer les assets: {e}")
 
+    _record_manifest(catalog_root, pid, slug, log, extra_paths=cascaded)
+
+    _remember_catalog(catalog_root, data, log)
+    progress(100)
+    return {"id": pid, "slug": slug or "", "cascaded": refs}
+
+
+# Renommage de taxonomie: propagation aux produits via l'index taxonomie
+RENAME_BATCH_SIZE = 64
+RENAME_WORKERS = 8
+
+
+def _renamed(entry, taxonomy_id: int, name: str):
+    # Copie de entry avec "name" remplacé si son id est taxonomy_id; sinon entry tel quel
+    if not isinstance(entry, dict):
+        return entry
+    try:
+        same = int(entry.get("id")) == taxonomy_id
+    except Exception:
+        same = False
+    return {**entry, "name": name} if same else entry
+
+
+def _retaxonomize_product(catalog_root: Path, pid: int, kind: str, taxonomy_id: int, name: str) -> dict | None:
+    """Remplace le nom dénormalisé de la taxonomie renommée dans un produit; retourne None
+    si le document est absent. Seuls les champs "name" dont l'id correspond changent:
+    structure (categories, category_paths) et ids inconnus des taxonomies sont conservés."""
+    product_path = catalog_root / "products" / f"{pad6(pid)}.json"
+    if not product_path.exists():
+        return None
+    product = _read_json(product_path)
+
+    updated = dict(product)
+    if kind == "manufacturers":
+        if isinstance(product.get("manufacturer"), dict):
+            updated["manufacturer"] = _renamed(product["manufacturer"], taxonomy_id, name)
+    else:
+        if isinstance(product.get("categories"), list):
+            updated["categories"] = [_renamed(c, taxonomy_id, name) for c in product["categories"]]
+        if isinstance(product.get("category_paths"), list):
+            updated["category_paths"] = [
+                [_renamed(c, taxonomy_id, name) for c in path] if isinstance(path, list) else path
+                for path in product["category_paths"]
+            ]
+    changed = updated != product
+    if changed:
+        atomic_write_json(product_path, updated)
+
+    manufacturer = updated.get("manufacturer") if isinstance(updated.get("manufacturer"), dict) else {}
+    manufacturer_name = str(manufacturer.get("name") or "")
+    categories = [
+        {"name": str(c.get("name") or "").strip()} for c in updated.get("categories") or [] if isinstance(c, dict)
+    ]
+    # Seuls les champs utiles à build_search_item: pas de validation.
+    draft = DraftProduct.model_construct(
+        name=str(product.get("name") or ""),
+        short_html=str((product.get("descriptions") or {}).get("short_html") or ""),
+    )
+    return {
+        "id": pid,
+        "changed": changed,
+        "product_hash": content_hash(updated),
+        "manufacturer_name": manufacturer_name,
+        "search_item": build_search_item(pid, draft, manufacturer_name, categories),
+        "product": updated,
+    }
+
+
+def rename_taxonomy(
+    catalog_root: Path,
+    kind: str,
+    taxonomy_id: int,
+    name: str,
+    log: LogFn,
+    progress: ProgressFn,
+    fence: FenceFn | None = None,
+    workers: int = RENAME_WORKERS,
+) -> dict:
+    """Renomme un fabricant ou une catégorie et propage le nom aux seuls produits concernés.
+
+    Ordre d'écriture: produits, index, puis taxonomies/*.json en dernier. En cas d'échec
+    le renommage peut être relancé tel quel (les réécritures sont idempotentes).
+    """
+    progress(1)
+    if kind not in TAXONOMY_KINDS:
+        raise PublishError("invalid_taxonomy", f"Taxonomie inconnue: {kind}")
+    new_name = str(name or "").strip()
+    if not new_name:
+        raise PublishError("invalid_taxonomy", "name requis")
+
+    data = load_catalog(catalog_root)
+    products_index = data["products_index"]
+    search_index = data["search_index"]
+    tid = int(taxonomy_id)
+    payload = data[kind]
+    by_id = manufacturer_map(payload) if kind == "manufacturers" else category_maps(payload)
+    entry = by_id.get(tid)
+    if entry is None:
+        raise PublishError("not_found", f"{kind} introuvable: {tid}")
+    old_name = str(entry.get("name") or "").strip()
+    if old_name == new_name:
+        log("Nom inchangé, aucune écriture")
+        progress(100)
+        return {"kind": kind, "id": tid, "name": new_name, "status": "unchanged", "products": 0}
+
+    # Les dicts de by_id sont ceux du payload: la mise à jour vaut pour les deux.
+    entry["name"] = new_name
+
+    tax_index = load_taxonomy_index(catalog_root)
+    affected = products_for(tax_index, kind, tid)
+    log(f"Renommage {kind} #{tid}: « {old_name} » -> « {new_name} » ({len(affected)} produits)")
+    progress(5)
+
+    results: dict[int, dict] = {}
+    batches = [affected[i : i + RENAME_BATCH_SIZE] for i in range(0, len(affected), RENAME_BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="rename") as pool:
+        for n, batch in enumerate(batches, start=1):
+            _check_fence(fence)
+            for res in pool.map(lambda p: _retaxonomize_product(catalog_root, p, kind, tid, new_name), batch):
+                if res is not None:
+                    results[res["id"]] = res
+            progress(5 + int(75 * n / len(batches)))
+            log(f"Lot {n}/{len(batches)}: {sum(len(b) for b in batches[:n])}/{len(affected)} produits")
+
+    # Index: une seule passe, une seule écriture
+    index_changed = False
+    search_changed = False
+    # Seul le texte de recherche d'une ligne de produits similaires dépend des noms
+    related_pids = []
+    for pid, res in results.items():
+        item = products_index.get(pid)
+        if item and item.get("manufacturer_name") != res["manufacturer_name"]:
+            products_index.replace({**item, "manufacturer_name": res["manufacturer_name"]})
+            index_changed = True
+        item = search_index.get(pid)
+        if item and item != res["search_item"]:
+            search_index.replace(res["search_item"])
+            search_changed = True
+            related_pids.append(pid)
+
+    _check_fence(fence)
+    log("Écriture atomique des index")
+    if index_changed:
+        write_products_index(catalog_root, data, products_index, log)
+    if search_changed:
+        search_index.save(data["search_index_path"])
+
+    progress(90)
+
+    hashes = load_hashes(catalog_root)
+    for pid, res in results.items():
+        entry_hashes = hashes["products"].get(str(pid))
+        if not isinstance(entry_hashes, dict):
+            continue
+        entry_hashes["product"] = res["product_hash"]
+        item = products_index.get(pid)
+        if item is not None:
+            entry_hashes["index"] = content_hash(item)
+        item = search_index.get(pid)
+        if item is not None:
+            entry_hashes["search"] = content_hash(item)
+    save_hashes(catalog_root, hashes, log)
+
+    _check_fence(fence)
+    taxonomy_path = data["manufacturers_path"] if kind == "manufacturers" else data["categories_path"]
+    log(f"Écriture taxonomie: taxonomies/{taxonomy_path.name}")
+    atomic_write_json(taxonomy_path, payload)
+
+    rewritten = sorted(pid for pid, res in results.items() if res["changed"])
+    _update_related(
+        catalog_root,
+        [_related_row(pid, results[pid]["product"], results[pid]["search_item"]) for pid in sorted(related_pids)],
+        [],
+        log,
+    )
+    _record_manifest_paths(
+        catalog_root,
+        [*_INDEX_FILES, f"taxonomies/{taxonomy_path.name}", *(f"products/{pad6(pid)}.json" for pid in rewritten)],
+        log,
+    )
+
+    _remember_catalog(catalog_root, data, log)
     progress(100)
-    return {"id": pid, "slug": slug or ""}
+    return {"kind": kind, "id": tid, "name": new_name, "status": "updated", "products": len(rewritten)}
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+# Publication d'un draft local (dossier avec draft.json + image + PDF optionnel), hors app.
+#
+# Même chemin que POST /api/catalog/products: create_product sous le bail catalogue, donc
+# fragment de description, index (produits, recherche, empreintes, relations, taxonomie,
+# similaires, colonnaire) et manifest à jour. Appelé par `npm run catalog:publish`.
+#
+# draft.json: champs de DraftProduct + image_filename (requis) et pdf_filename (optionnel),
+# relatifs au dossier du draft.
+#
+# Usage: python publisher/publish_draft.py --draft-dir drafts/draft_<slug> [--catalog-root PATH]
+# Rapports: reports/publish_<stamp>.log et reports/publish_summary_latest.json
+
+import argparse
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from pathlib import Path
+
+from html_stage import use_persistent_cache
+from lease import CatalogLease, LeaseTimeout
+from models import DraftProduct
+from publish_core import PublishError, create_product
+from utils import atomic_write_json, ensure_dir, now_stamp, pad6, read_json, resolve_catalog_root
+
+
+class DraftFile:
+    """Fichier du draft, même interface que les fichiers reçus en multipart (filename, file)."""
+
+    def __init__(self, path: Path):
+        self.filename = path.name
+        self.path = path
+        self.file = None
+
+    def __enter__(self) -> DraftFile:
+        self.file = self.path.open("rb")
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _draft_file(draft_dir: Path, raw: dict, key: str, required: bool) -> DraftFile | None:
+    name = str(raw.get(key) or "").strip()
+    if not name:
+        if required:
+            raise PublishError("invalid_draft", f"Champ requis manquant: {key}")
+        return None
+    path = draft_dir / name
+    if not path.is_file():
+        raise PublishError("invalid_draft", f"Fichier introuvable: {name}")
+    return DraftFile(path)
+
+
+def publish_draft(catalog_root: Path, draft_dir: Path, log=print) -> dict:
+    draft_json = draft_dir / "draft.json"
+    if not draft_json.is_file():
+        raise PublishError("invalid_draft", f"draft.json introuvable: {draft_json}")
+    try:
+        raw = read_json(draft_json)
+        draft = DraftProduct.model_validate(raw)
+    except Exception as e:
+        raise PublishError("invalid_draft", f"draft.json invalide: {e}")
+
+    image = _draft_file(draft_dir, raw, "image_filename", required=True)
+    pdf = _draft_file(draft_dir, raw, "pdf_filename", required=False)
+
+    with ExitStack() as stack:
+        fence = stack.enter_context(CatalogLease(catalog_root).hold())
+        image = stack.enter_context(image)
+        pdf = stack.enter_context(pdf) if pdf is not None else None
+        return create_product(catalog_root, draft, image, pdf, log=log, progress=lambda p: None, fence=fence)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Publie un draft local dans le catalogue")
+    parser.add_argument("--draft-dir", required=True)
+    parser.add_argument("--catalog-root", default=None)
+    args = parser.parse_args(argv)
+
+    root = resolve_catalog_root(args.catalog_root)
+    reports_dir = root / "reports"
+    ensure_dir(reports_dir)
+    log_path = reports_dir / f"publish_{now_stamp()}.log"
+    summary = {
+        "started_at": _now_iso(),
+        "draft_dir": args.draft_dir,
+        "ok": False,
+        "new_id": None,
+        "new_slug": None,
+        "product_file": None,
+        "cover_image": None,
+        "pdf": None,
+        "errors": [],
+    }
+
+    with log_path.open("a", encoding="utf-8") as log_file:
+
+        def log(line: str) -> None:
+            line = f"{_now_iso()} {line}"
+            print(line)
+            log_file.write(line + "\n")
+
+        use_persistent_cache(root)
+        try:
+            result = publish_draft(root, Path(args.draft_dir).expanduser().resolve(), log=log)
+            product_path = root / "products" / f"{pad6(result['id'])}.json"
+            media = read_json(product_path).get("media") or {}
+            images = media.get("images") or [{}]
+            summary.update(
+                ok=True,
+                new_id=result["id"],
+                new_slug=result["slug"],
+                product_file=str(product_path),
+                cover_image=(images[0].get("files") or [None])[0],
+                pdf=(media.get("pdfs") or [None])[0],
+            )
+            log(f"SUCCESS produit {result['id']} ({result['slug']})")
+        except (PublishError, LeaseTimeout) as e:
+            message = f"{e.code}: {e.message}" if isinstance(e, PublishError) else f"lease_timeout: {e}"
+            summary["errors"].append(message)
+            log(f"ERROR {message}")
+        finally:
+            summary["finished_at"] = _now_iso()
+            atomic_write_json(reports_dir / "publish_summary_latest.json", summary)
+
+    return 0 if summary["ok"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+# Représentation mémoire compacte des index produits (index.products.json, index.search.json).
+#
+# json.load donne un dict par entrée (table de hachage + une chaîne par valeur, répétée
+# autant de fois qu'il y a de produits). Ici chaque entrée est une instance à __slots__:
+#   - noms de fabricants internés (sys.intern): une seule chaîne par fabricant
+#   - category_ids en tuple partagé: quelques centaines de combinaisons distinctes
+#   - ordre des clés (forme de l'entrée) en tuple partagé
+#   - haystack stocké en UTF-8 (bytes): 1 octet par caractère même si le texte contient
+#     un « ’ » qui ferait passer la str entière à 2 octets par caractère
+# Le fichier est lu par blocs et décodé élément par élément: ni texte complet en mémoire,
+# ni liste de dicts intermédiaire.
+#
+# to_json() restitue exactement le contrat JSON (mêmes clés, même ordre, mêmes valeurs);
+# les clés inconnues sont conservées telles quelles. Les entrées sont des Mapping en lecture
+# seule (get, [], == avec un dict) et utils.atomic_write_json / content_hash les sérialisent
+# comme les dicts d'origine.
+
+import json
+import re
+import sys
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Iterable, Iterator, TextIO
+
+from utils import atomic_write_json
+
+_shapes: dict[tuple, tuple] = {}
+_id_tuples: dict[tuple, tuple] = {}
+_WS_RE = re.compile(r"[ \t\n\r]*")
+_CHUNK_CHARS = 1 << 20
+_NUMBER_CHARS = frozenset("0123456789+-.eE")
+
+
+class IndexFormatError(ValueError):
+    pass
+
+
+def _intern_str(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _intern_ids(value):
+    # Liste JSON d'entiers -> tuple partagé (restitué en liste)
+    if isinstance(value, list) and all(type(v) is int for v in value):
+        t = tuple(value)
+        return _id_tuples.setdefault(t, t)
+    return value
+
+
+def _utf8(value):
+    # str -> bytes UTF-8 (restitué en str); aucune valeur JSON n'est de type bytes
+    return value.encode("utf-8") if isinstance(value, str) else value
+
+
+def _expand(value):
+    if type(value) is tuple:
+        return list(value)
+    if type(value) is bytes:
+        return value.decode("utf-8")
+    return value
+
+
+class IndexRecord(Mapping):
+    """Entrée d'index en lecture seule; FIELDS sont stockés en slots, le reste dans _extra."""
+
+    __slots__ = ("_keys", "_extra")
+    FIELDS: tuple[str, ...] = ()
+    COMPACT: dict = {}
+    _field_set: frozenset = frozenset()
+    _plan: dict = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._field_set = frozenset(cls.FIELDS)
+        # clé -> (setter du slot, compaction): évite setattr générique au chargement
+        cls._plan = {key: (getattr(cls, key).__set__, cls.COMPACT.get(key)) for key in cls.FIELDS}
+
+    def __init__(self, obj: Mapping):
+        keys = tuple(obj)
+        self._keys = _shapes.setdefault(keys, keys)
+        extra = None
+        plan = self._plan
+        for key, value in obj.items():
+            step = plan.get(key)
+            if step is None:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+            else:
+                setter, compact = step
+                setter(self, compact(value) if compact else value)
+        self._extra = extra
+
+    def __getitem__(self, key):
+        if key in self._field_set:
+            if key in self._keys:
+                return _expand(getattr(self, key))
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def to_json(self) -> dict:
+        return {key: self[key] for key in self._keys}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_json()!r})"
+
+
+class ProductIndexRecord(IndexRecord):
+    # Entrée de index.products.json (voir publish_core.build_index_item)
+    __slots__ = (
+        "id",
+        "slug",
+        "active",
+        "name",
+        "price_ht",
+        "manufacturer_id",
+        "manufacturer_name",
+        "category_ids",
+        "cover_image",
+    )
+    FIELDS = __slots__
+    COMPACT = {"manufacturer_name": _intern_str, "category_ids": _intern_ids}
+
+
+class SearchRecord(IndexRecord):
+    # Entrée de index.search.json (voir publish_core.build_search_item)
+    __slots__ = ("id", "haystack")
+    FIELDS = __slots__
+    COMPACT = {"haystack": _utf8}
+
+
+# Classes relues par RecordIndex.from_columns (nom -> classe, liste fermée)
+RECORD_CLASSES = {c.__name__: c for c in (ProductIndexRecord, SearchRecord)}
+
+
+def _record_id(item) -> int | None:
+    try:
+        return int(item.get("id"))
+    except Exception:
+        return None
+
+
+class RecordIndex:
+    """Tableau d'entrées d'un index: ordre du fichier conservé, accès par id.
+
+    Comme les listes qu'il remplace: get() renvoie la première entrée d'un id, remove()
+    les retire toutes; les éléments qui ne sont pas des objets JSON sont conservés tels quels.
+    """
+
+    def __init__(self, record_cls: type[IndexRecord], items: Iterable = ()):
+        self.record_cls = record_cls
+        self._items: list = []
+        self._by_id: dict[int, IndexRecord] = {}
+        for item in items:
+            self.append(item)
+
+    def _coerce(self, item):
+        if isinstance(item, self.record_cls) or not isinstance(item, Mapping):
+            return item
+        return self.record_cls(item)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[IndexRecord]:
+        return (item for item in self._items if isinstance(item, IndexRecord))
+
+    def ids(self) -> list[int]:
+        return list(self._by_id)
+
+    def get(self, pid: int) -> IndexRecord | None:
+        return self._by_id.get(int(pid))
+
+    def append(self, item) -> None:
+        item = self._coerce(item)
+        self._items.append(item)
+        if isinstance(item, IndexRecord):
+            pid = _record_id(item)
+            if pid is not None:
+                self._by_id.setdefault(pid, item)
+
+    def replace(self, item) -> None:
+        """Remplace sur place la première entrée du même id, sinon ajoute en fin."""
+        item = self._coerce(item)
+        old = self._by_id.get(_record_id(item))
+        if old is None:
+            self.append(item)
+            return
+        for i, x in enumerate(self._items):
+            if x is old:
+                self._items[i] = item
+                break
+        self._by_id[_record_id(item)] = item
+
+    def remove(self, pid: int) -> bool:
+        pid = int(pid)
+        if self._by_id.pop(pid, None) is None:
+            return False
+        self._items = [x for x in self._items if not (isinstance(x, IndexRecord) and _record_id(x) == pid)]
+        return True
+
+    def copy(self) -> RecordIndex:
+        """Copie modifiable indépendamment; les entrées (immuables) sont partagées."""
+        out = RecordIndex.__new__(RecordIndex)
+        out.record_cls = self.record_cls
+        out._items = list(self._items)
+        out._by_id = dict(self._by_id)
+        return out
+
+    # Forme colonnaire (instantané de warm.py): une liste par champ, uniquement des types JSON.
+    # Relue par from_columns() sans exécuter de code, plus vite que le JSON d'origine entrée par entrée.
+    def to_columns(self) -> dict:
+        cls = self.record_cls
+        records, raw = [], []
+        for pos, item in enumerate(self._items):
+            if isinstance(item, cls):
+                records.append(item)
+            else:
+                raw.append([pos, item])
+        shape_ids: dict[tuple, int] = {}
+        return {
+            "record": cls.__name__,
+            "shape": [shape_ids.setdefault(r._keys, len(shape_ids)) for r in records],
+            "shapes": [list(keys) for keys in shape_ids],
+            "extra": [r._extra for r in records],
+            # slot absent de l'entrée (clé manquante) -> None, masqué par la forme
+            "columns": {f: [_expand(getattr(r, f, None)) for r in records] for f in cls.FIELDS},
+            "raw": raw,
+        }
+
+    @classmethod
+    def from_columns(cls, state: dict) -> RecordIndex:
+        record_cls = RECORD_CLASSES[state["record"]]
+        plan = [(getattr(record_cls, f).__set__, record_cls.COMPACT.get(f)) for f in record_cls.FIELDS]
+        columns = [state["columns"][f] for f in record_cls.FIELDS]
+        shapes = [_shapes.setdefault(tuple(keys), tuple(keys)) for keys in state["shapes"]]
+        items: list = []
+        by_id: dict[int, IndexRecord] = {}
+        for shape, extra, *values in zip(state["shape"], state["extra"], *columns):
+            record = record_cls.__new__(record_cls)
+            record._keys = shapes[shape]
+            record._extra = extra
+            for (setter, compact), value in zip(plan, values):
+                setter(record, compact(value) if compact else value)
+            items.append(record)
+            pid = _record_id(record)
+            if pid is not None:
+                by_id.setdefault(pid, record)
+        for pos, item in state["raw"]:
+            items.insert(pos, item)
+        out = cls.__new__(cls)
+        out.record_cls = record_cls
+        out._items = items
+        out._by_id = by_id
+        return out
+
+    def to_json(self) -> list:
+        return [x.to_json() if isinstance(x, IndexRecord) else x for x in self._items]
+
+    def save(self, path: Path) -> None:
+        # Les entrées sont converties une à une par l'encodeur (pas de liste de dicts complète)
+        atomic_write_json(path, self._items)
+
+
+def iter_json_array(f: TextIO) -> Iterator:
+    """Éléments d'un tableau JSON lu par blocs, décodés un par un (mémoire: un bloc)."""
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def more() -> None:
+        nonlocal buf, pos, eof
+        chunk = f.read(_CHUNK_CHARS)
+        if chunk:
+            buf, pos = buf[pos:] + chunk, 0
+        else:
+            eof = True
+
+    def skip_ws() -> None:
+        nonlocal pos
+        while True:
+            pos = _WS_RE.match(buf, pos).end()
+            if pos < len(buf) or eof:
+                return
+            more()
+
+    skip_ws()
+    if buf[pos : pos + 1] != "[":
+        raise IndexFormatError("tableau JSON attendu")
+    pos += 1
+    skip_ws()
+    if buf[pos : pos + 1] == "]":
+        pos += 1
+    else:
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+                # un nombre coupé en fin de bloc (« -1. ») se décode aussi: il faut voir la suite
+                complete = eof or (end < len(buf) and buf[end] not in _NUMBER_CHARS)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+            if not complete:
+                more()
+                continue
+            yield value
+            pos = end
+            skip_ws()
+            sep = buf[pos : pos + 1]
+            if sep == "]":
+                pos += 1
+                break
+            if sep != ",":
+                raise json.JSONDecodeError("',' ou ']' attendu", buf, pos)
+            pos += 1
+            skip_ws()
+    skip_ws()
+    if pos < len(buf):
+        raise json.JSONDecodeError("données après le tableau", buf, pos)
+
+
+def load_index(path: Path, record_cls: type[IndexRecord]) -> RecordIndex:
+    with path.open("r", encoding="utf-8") as f:
+        return RecordIndex(record_cls, iter_json_array(f))
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+# Index des relations accessoires (index.relations.json).
+#
+# products/NNNNNN.json ne stocke que les liens directs (relations.accessories). Cet index
+# garde les deux sens pour éviter de parcourir tout le catalogue:
+#   {"version": 1,
+#    "accessories":  {"12": [40, 41]},   # produit -> ses accessoires
+#    "accessory_of": {"40": [12]}}       # accessoire -> produits qui le référencent
+#
+# Mis à jour incrémentalement par create/update/delete; reconstruit par un scan complet
+# uniquement s'il est absent ou illisible.
+
+from pathlib import Path
+
+from derived_index import iter_products, link, load_or_rebuild, rebuild_main, save_index, unlink
+
+RELATIONS_VERSION = 1
+RELATIONS_FILENAME = "index.relations.json"
+
+
+def relations_path(catalog_root: Path) -> Path:
+    return catalog_root / RELATIONS_FILENAME
+
+
+def _int_ids(values) -> list[int]:
+    out = []
+    for x in values or []:
+        try:
+            out.append(int(x))
+        except Exception:
+            continue
+    return out
+
+
+def empty_relations() -> dict:
+    return {"version": RELATIONS_VERSION, "accessories": {}, "accessory_of": {}}
+
+
+def build_relations(catalog_root: Path) -> dict:
+    """Scan complet de products/*.json (reconstruction)."""
+    relations = empty_relations()
+    for pid, product in iter_products(catalog_root):
+        accessories = (product.get("relations") or {}).get("accessories")
+        set_accessories(relations, pid, _int_ids(accessories))
+    return relations
+
+
+def load_relations(catalog_root: Path) -> dict:
+    return load_or_rebuild(
+        relations_path(catalog_root), ("accessories", "accessory_of"), lambda: build_relations(catalog_root)
+    )
+
+
+def save_relations(catalog_root: Path, relations: dict) -> None:
+    save_index(relations_path(catalog_root), relations)
+
+
+def accessories_of(relations: dict, pid: int) -> list[int]:
+    return list(relations["accessories"].get(str(int(pid))) or [])
+
+
+def referencing(relations: dict, pid: int) -> list[int]:
+    """Produits qui listent pid comme accessoire."""
+    return list(relations["accessory_of"].get(str(int(pid))) or [])
+
+
+def set_accessories(relations: dict, pid: int, accessories: list[int]) -> bool:
+    """Remplace les liens directs de pid; retourne True si l'index a changé."""
+    key = str(int(pid))
+    old = set(relations["accessories"].get(key) or [])
+    new = set(_int_ids(accessories))
+    if old == new:
+        return False
+
+    reverse = relations["accessory_of"]
+    for acc in old - new:
+        unlink(reverse, acc, int(pid))
+    for acc in new - old:
+        link(reverse, acc, int(pid))
+
+    if new:
+        relations["accessories"][key] = sorted(new)
+    else:
+        relations["accessories"].pop(key, None)
+    return True
+
+
+def remove_product(relations: dict, pid: int) -> list[int]:
+    """Retire pid de l'index (ses liens directs et inverses); retourne les produits qui le référençaient."""
+    set_accessories(relations, pid, [])
+    refs = relations["accessory_of"].pop(str(int(pid)), None) or []
+    for ref in refs:
+        unlink(relations["accessories"], ref, int(pid))
+    return list(refs)
+
+
+def main(argv: list[str] | None = None) -> int:
+    # Reconstruit index.relations.json par un scan complet
+    return rebuild_main(
+        argv,
+        build_relations,
+        relations_path,
+        lambda r: f"{len(r['accessories'])} produits avec accessoires, "
+        f"{len(r['accessory_of'])} accessoires référencés",
+    )
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
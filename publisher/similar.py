@@ -0,0 +1,367 @@
+from __future__ import annotations
+
+# Produits similaires précalculés (index.related.json).
+#
+# Chaque produit est un vecteur dense float32, concaténation pondérée de:
+#   - TF-IDF du haystack de index.search.json (hashing trick signé, TEXT_DIM dimensions)
+#   - catégories des breadcrumbs (ancêtres compris, via .publisher/taxonomy.json), multi-hot normalisé
+#   - fabricant (one-hot)
+# Catégories et fabricants ont une colonne chacun (tables id -> colonne category_ids /
+# manufacturer_ids de l'état, étendues quand un id apparaît): pas de collision entre ids.
+# Chaque bloc étant normé, le produit scalaire vaut
+#   W_TEXT * cos(texte) + W_CATEGORIES * cos(catégories) + W_MANUFACTURER * [même fabricant].
+#
+# Top-k par multiplication matricielle par blocs de lignes (mémoire O(BLOCK_ROWS * N)).
+# Seuls les produits actifs sont proposés comme voisins.
+#
+# État de calcul (vecteurs, voisins + scores, fréquences documentaires) dans
+# .publisher/related.npz: un publish ne recalcule que les lignes touchées. Les IDF sont figés
+# entre deux reconstructions complètes (automatique après REBUILD_RATIO de changements).
+#
+# NumPy est optionnel: sans lui le publish continue et index.related.json n'est pas mis à jour.
+#
+# Usage: python publisher/similar.py [CATALOG_ROOT] [--k 8]
+
+import argparse
+import math
+import os
+import re
+import sys
+import unicodedata
+import zlib
+from pathlib import Path
+
+from lease import state_dir
+from records import ProductIndexRecord, SearchRecord, load_index
+from taxonomy import load_taxonomy_index
+from utils import atomic_write_json, read_json, resolve_catalog_root
+
+# numpy (~80 ms) est importé au premier calcul: l'importer de publish_core ne le paie pas
+np = None
+
+RELATED_VERSION = 1
+RELATED_FILENAME = "index.related.json"
+DEFAULT_K = 8
+
+TEXT_DIM = 512
+DF_BUCKETS = 1 << 18
+
+W_TEXT = 0.6
+W_CATEGORIES = 0.3
+W_MANUFACTURER = 0.1
+MIN_SCORE = 0.05
+
+BLOCK_ROWS = 256
+REBUILD_RATIO = 0.1
+
+_TOKEN_RE = re.compile(r"[a-z0-9]{2,}")
+_TIE_BREAK = 1e-15
+
+
+class SimilarUnavailable(RuntimeError):
+    pass
+
+
+def _require_numpy() -> None:
+    global np
+    if np is not None:
+        return
+    try:
+        import numpy
+    except ImportError:  # pragma: no cover - dépendance optionnelle
+        raise SimilarUnavailable("numpy non installé: produits similaires désactivés")
+    np = numpy
+
+
+def related_path(catalog_root: Path) -> Path:
+    return catalog_root / RELATED_FILENAME
+
+
+def _state_path(catalog_root: Path) -> Path:
+    return state_dir(catalog_root) / "related.npz"
+
+
+def _tokens(text: str) -> list[int]:
+    # sans accents, minuscules; hash stable entre processus (crc32, pas hash())
+    folded = unicodedata.normalize("NFKD", str(text or "").lower())
+    folded = "".join(ch for ch in folded if not unicodedata.combining(ch))
+    return [zlib.crc32(tok.encode("ascii", "ignore")) for tok in _TOKEN_RE.findall(folded)]
+
+
+def _document_frequencies(token_lists: list[list[int]]):
+    df = np.zeros(DF_BUCKETS, dtype=np.int32)
+    for hashes in token_lists:
+        if hashes:
+            df[np.unique(np.asarray(hashes, dtype=np.uint32) % DF_BUCKETS)] += 1
+    return df
+
+
+def _taxonomy_ids(rows: list[dict]) -> tuple[list[int], list[int]]:
+    categories = sorted({int(c) for r in rows for c in r.get("categories") or []})
+    manufacturers = sorted({int(r["manufacturer"]) for r in rows if _manufacturer_id(r) is not None})
+    return categories, manufacturers
+
+
+def _manufacturer_id(row: dict) -> int | None:
+    value = row.get("manufacturer")
+    return int(value) if value is not None and int(value) > 0 else None
+
+
+def _vectorize(rows: list[dict], token_lists: list[list[int]], df, n_docs: int, category_ids, manufacturer_ids):
+    cat_col = {int(c): j for j, c in enumerate(category_ids)}
+    man_col = {int(m): j for j, m in enumerate(manufacturer_ids)}
+    n_cats = len(cat_col)
+    vecs = np.zeros((len(rows), TEXT_DIM + n_cats + len(man_col)), dtype=np.float32)
+    text = vecs[:, :TEXT_DIM]
+    cats = vecs[:, TEXT_DIM : TEXT_DIM + n_cats]
+    mans = vecs[:, TEXT_DIM + n_cats :]
+
+    for i, (row, hashes) in enumerate(zip(rows, token_lists)):
+        if hashes:
+            h, tf = np.unique(np.asarray(hashes, dtype=np.uint32), return_counts=True)
+            idf = np.log((1.0 + n_docs) / (1.0 + df[h % DF_BUCKETS])) + 1.0
+            weights = (1.0 + np.log(tf)) * idf
+            signs = np.where((h >> 20) & 1, 1.0, -1.0)
+            np.add.at(text[i], h % TEXT_DIM, (weights * signs).astype(np.float32))
+        for cid in row.get("categories") or []:
+            cats[i, cat_col[int(cid)]] = 1.0
+        mid = _manufacturer_id(row)
+        if mid is not None:
+            mans[i, man_col[mid]] = 1.0
+
+    for block, weight in ((text, W_TEXT), (cats, W_CATEGORIES), (mans, W_MANUFACTURER)):
+        norms = np.linalg.norm(block, axis=1, keepdims=True)
+        np.divide(block, norms, out=block, where=norms > 0)
+        block *= math.sqrt(weight)
+    return vecs
+
+
+def _extend_columns(state: dict, rows: list[dict]) -> None:
+    """Ajoute une colonne (nulle pour les lignes existantes) par catégorie/fabricant inconnu."""
+    categories, manufacturers = _taxonomy_ids(rows)
+    known_cats = set(state["category_ids"].tolist())
+    known_mans = set(state["manufacturer_ids"].tolist())
+    new_cats = [c for c in categories if c not in known_cats]
+    new_mans = [m for m in manufacturers if m not in known_mans]
+    if not new_cats and not new_mans:
+        return
+    vecs = state["vecs"]
+    n, cut = len(vecs), TEXT_DIM + len(known_cats)
+    state["vecs"] = np.concatenate(
+        [
+            vecs[:, :cut],
+            np.zeros((n, len(new_cats)), dtype=np.float32),
+            vecs[:, cut:],
+            np.zeros((n, len(new_mans)), dtype=np.float32),
+        ],
+        axis=1,
+    )
+    state["category_ids"] = np.concatenate([state["category_ids"], np.asarray(new_cats, dtype=np.int64)])
+    state["manufacturer_ids"] = np.concatenate([state["manufacturer_ids"], np.asarray(new_mans, dtype=np.int64)])
+
+
+def _top_k(vecs, active, ids, rows, k: int):
+    """Voisins (indices, scores) des lignes demandées, par blocs de BLOCK_ROWS."""
+    nbr = np.full((len(rows), k), -1, dtype=np.int64)
+    scores = np.zeros((len(rows), k), dtype=np.float32)
+    n = len(ids)
+    if n == 0 or len(rows) == 0:
+        return nbr, scores
+    inactive = ~active
+    kk = min(k, n)
+    for start in range(0, len(rows), BLOCK_ROWS):
+        block_rows = rows[start : start + BLOCK_ROWS]
+        sims = (vecs[block_rows] @ vecs.T).astype(np.float64)
+        sims[:, inactive] = -np.inf
+        sims[np.arange(len(block_rows)), block_rows] = -np.inf
+        # départage déterministe des ex aequo (id croissant), sous la précision float32 des scores
+        sims -= ids * _TIE_BREAK
+        part = np.argpartition(-sims, kk - 1, axis=1)[:, :kk]
+        part_scores = np.take_along_axis(sims, part, axis=1)
+        order = np.argsort(-part_scores, axis=1)
+        part = np.take_along_axis(part, order, axis=1)
+        part_scores = (np.take_along_axis(part_scores, order, axis=1) + ids[part] * _TIE_BREAK).astype(np.float32)
+        keep = part_scores >= MIN_SCORE
+        nbr[start : start + len(block_rows), :kk] = np.where(keep, ids[part], -1)
+        scores[start : start + len(block_rows), :kk] = np.where(keep, part_scores, 0.0)
+    return nbr, scores
+
+
+def _catalog_rows(catalog_root: Path) -> list[dict]:
+    products_index = load_index(catalog_root / "index.products.json", ProductIndexRecord)
+    search_path = catalog_root / "index.search.json"
+    search_index = load_index(search_path, SearchRecord) if search_path.exists() else None
+    taxonomy = load_taxonomy_index(catalog_root)["products"]
+
+    rows = []
+    for pid in products_index.ids():
+        item = products_index.get(pid)
+        search = search_index.get(pid) if search_index is not None else None
+        tax = taxonomy.get(str(pid)) or {}
+        rows.append(
+            {
+                "id": pid,
+                "text": str((search or {}).get("haystack") or "") or str(item.get("name") or ""),
+                "categories": tax.get("categories") or item.get("category_ids") or [],
+                "manufacturer": tax.get("manufacturer"),
+                "active": bool(item.get("active")),
+            }
+        )
+    return rows
+
+
+def _save(catalog_root: Path, state: dict, neighbours_changed: bool = True) -> None:
+    # savez non compressé: ~10x plus rapide que savez_compressed pour cet état (vecteurs denses)
+    path = _state_path(catalog_root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp.npz")
+    np.savez(tmp, **state)
+    os.replace(tmp, path)
+    if not neighbours_changed and related_path(catalog_root).exists():
+        return
+
+    ids, nbr, k = state["ids"], state["nbr"], int(state["k"])
+    related = {}
+    for i in range(len(ids)):
+        neighbours = [int(x) for x in nbr[i] if x >= 0]
+        if neighbours:
+            related[str(int(ids[i]))] = neighbours
+    atomic_write_json(related_path(catalog_root), {"version": RELATED_VERSION, "k": k, "related": related})
+
+
+def _load(catalog_root: Path) -> dict | None:
+    path = _state_path(catalog_root)
+    if not path.exists():
+        return None
+    try:
+        with np.load(path) as data:
+            state = {name: data[name] for name in data.files}
+    except Exception:
+        return None
+    # État d'une version précédente (colonnes hachées) -> reconstruction complète
+    if "category_ids" not in state or "manufacturer_ids" not in state:
+        return None
+    if state["vecs"].shape[1] != TEXT_DIM + len(state["category_ids"]) + len(state["manufacturer_ids"]):
+        return None
+    return state
+
+
+def build_related(catalog_root: Path, k: int = DEFAULT_K) -> dict:
+    """Reconstruction complète depuis les index du catalogue."""
+    _require_numpy()
+    rows = _catalog_rows(catalog_root)
+    token_lists = [_tokens(r["text"]) for r in rows]
+    df = _document_frequencies(token_lists)
+    category_ids, manufacturer_ids = _taxonomy_ids(rows)
+    vecs = _vectorize(rows, token_lists, df, len(rows), category_ids, manufacturer_ids)
+    ids = np.asarray([r["id"] for r in rows], dtype=np.int64)
+    active = np.asarray([r["active"] for r in rows], dtype=bool)
+    nbr, scores = _top_k(vecs, active, ids, np.arange(len(rows)), k)
+    state = {
+        "ids": ids,
+        "vecs": vecs,
+        "active": active,
+        "nbr": nbr,
+        "scores": scores,
+        "df": df,
+        "category_ids": np.asarray(category_ids, dtype=np.int64),
+        "manufacturer_ids": np.asarray(manufacturer_ids, dtype=np.int64),
+        "n_docs": np.int64(len(rows)),
+        "k": np.int64(k),
+        "changes": np.int64(0),
+    }
+    _save(catalog_root, state)
+    return state
+
+
+def update_related(catalog_root: Path, upserts: list[dict], removed: list[int] | None = None) -> dict:
+    """Met à jour les lignes publiées/supprimées et uniquement les listes de voisins impactées.
+
+    upserts: [{"id", "text", "categories", "manufacturer", "active"}]
+    """
+    _require_numpy()
+    state = _load(catalog_root)
+    if state is None:
+        return build_related(catalog_root)
+    k = int(state["k"])
+    changes = int(state["changes"]) + len(upserts) + len(removed or [])
+    if changes > max(50, REBUILD_RATIO * len(state["ids"])):
+        return build_related(catalog_root, k=k)
+
+    _extend_columns(state, upserts)
+    ids, vecs, active = state["ids"], state["vecs"], state["active"]
+    nbr, scores = state["nbr"], state["scores"]
+    old_ids, old_nbr = ids, nbr
+
+    touched = np.asarray(sorted({int(x) for x in removed or []} | {int(r["id"]) for r in upserts}), dtype=np.int64)
+    # listes qui citent un produit modifié/supprimé: score possiblement en baisse -> recalcul
+    stale_rows = np.isin(nbr, touched).any(axis=1)
+    keep = ~np.isin(ids, touched)
+    token_lists = [_tokens(r["text"]) for r in upserts]
+    new_vecs = _vectorize(
+        upserts, token_lists, state["df"], int(state["n_docs"]), state["category_ids"], state["manufacturer_ids"]
+    )
+
+    ids = np.concatenate([ids[keep], np.asarray([int(r["id"]) for r in upserts], dtype=np.int64)])
+    vecs = np.concatenate([vecs[keep], new_vecs])
+    active = np.concatenate([active[keep], np.asarray([bool(r["active"]) for r in upserts], dtype=bool)])
+    nbr = np.concatenate([nbr[keep], np.full((len(upserts), k), -1, dtype=np.int64)])
+    scores = np.concatenate([scores[keep], np.zeros((len(upserts), k), dtype=np.float32)])
+    stale_rows = np.concatenate([stale_rows[keep], np.ones(len(upserts), dtype=bool)])
+
+    # Lignes où un produit (ré)publié actif entre dans le top-k
+    n_new = len(upserts)
+    if n_new:
+        new_idx = np.arange(len(ids) - n_new, len(ids))
+        sims = vecs @ vecs[new_idx].T
+        sims[new_idx, np.arange(n_new)] = -np.inf
+        sims[:, ~active[new_idx]] = -np.inf
+        kth = np.where(nbr[:, -1] >= 0, scores[:, -1], MIN_SCORE)
+        stale_rows |= (sims >= kth[:, None]).any(axis=1)
+
+    rows = np.flatnonzero(stale_rows)
+    fresh_nbr, fresh_scores = _top_k(vecs, active, ids, rows, k)
+    nbr[rows] = fresh_nbr
+    scores[rows] = fresh_scores
+
+    order = np.argsort(ids, kind="stable")
+    state.update(
+        ids=ids[order],
+        vecs=vecs[order],
+        active=active[order],
+        nbr=nbr[order],
+        scores=scores[order],
+        changes=np.int64(changes),
+    )
+    # index.related.json n'est réécrit que si une liste de voisins a changé
+    neighbours_changed = not (np.array_equal(old_ids, state["ids"]) and np.array_equal(old_nbr, state["nbr"]))
+    _save(catalog_root, state, neighbours_changed)
+    return state
+
+
+def load_related(catalog_root: Path) -> dict:
+    path = related_path(catalog_root)
+    if not path.exists():
+        return {"version": RELATED_VERSION, "k": DEFAULT_K, "related": {}}
+    return read_json(path)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Reconstruit index.related.json (produits similaires)")
+    parser.add_argument("catalog_root", nargs="?", default=None)
+    parser.add_argument("--k", type=int, default=DEFAULT_K)
+    args = parser.parse_args(argv)
+
+    root = resolve_catalog_root(args.catalog_root)
+
+    try:
+        state = build_related(root, k=args.k)
+    except SimilarUnavailable as e:
+        print(f"ERREUR {e}", file=sys.stderr)
+        return 1
+    print(f"{related_path(root)}: {len(state['ids'])} produits, k={args.k}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+# Index taxonomie -> produits (.publisher/taxonomy.json, état interne non déployé).
+#
+# Les noms de fabricants et catégories sont dénormalisés dans chaque produit. Cet index
+# permet de retrouver exactement les produits touchés par un renommage:
+#   {"version": 1,
+#    "products":      {"12": {"manufacturer": 22, "categories": [1, 2, 62]}},
+#    "manufacturers": {"22": [12, ...]},
+#    "categories":    {"62": [12, ...]}}
+#
+# "categories" couvre toutes les catégories des breadcrumbs (ancêtres compris), puisque
+# renommer un parent change category_paths. Mis à jour incrémentalement par
+# create/update/delete; reconstruit par un scan complet s'il est absent ou illisible.
+
+from pathlib import Path
+
+from derived_index import iter_products, link, load_or_rebuild, rebuild_main, save_index, unlink
+from lease import state_dir
+
+TAXONOMY_INDEX_VERSION = 1
+TAXONOMY_INDEX_FILENAME = "taxonomy.json"
+# Ancien emplacement, servi publiquement: supprimé à la prochaine écriture
+LEGACY_TAXONOMY_INDEX_FILENAME = "index.taxonomy.json"
+TAXONOMY_KINDS = ("manufacturers", "categories")
+
+
+def taxonomy_index_path(catalog_root: Path) -> Path:
+    return state_dir(catalog_root) / TAXONOMY_INDEX_FILENAME
+
+
+def empty_taxonomy_index() -> dict:
+    return {"version": TAXONOMY_INDEX_VERSION, "products": {}, "manufacturers": {}, "categories": {}}
+
+
+def product_category_ids(product: dict) -> list[int]:
+    """Catégories d'un document produit, ancêtres des breadcrumbs compris."""
+    ids: set[int] = set()
+    for c in product.get("categories") or []:
+        try:
+            ids.add(int(c.get("id")))
+        except Exception:
+            continue
+    for path in product.get("category_paths") or []:
+        for c in path if isinstance(path, list) else []:
+            try:
+                ids.add(int(c.get("id")))
+            except Exception:
+                continue
+    return sorted(ids)
+
+
+def _product_manufacturer_id(product: dict) -> int | None:
+    try:
+        return int((product.get("manufacturer") or {}).get("id"))
+    except Exception:
+        return None
+
+
+def build_taxonomy_index(catalog_root: Path) -> dict:
+    """Scan complet de products/*.json (reconstruction)."""
+    index = empty_taxonomy_index()
+    for pid, product in iter_products(catalog_root):
+        set_product(index, pid, _product_manufacturer_id(product), product_category_ids(product))
+    return index
+
+
+def load_taxonomy_index(catalog_root: Path) -> dict:
+    return load_or_rebuild(
+        taxonomy_index_path(catalog_root), ("products", *TAXONOMY_KINDS), lambda: build_taxonomy_index(catalog_root)
+    )
+
+
+def save_taxonomy_index(catalog_root: Path, index: dict) -> None:
+    save_index(taxonomy_index_path(catalog_root), index)
+    (catalog_root / LEGACY_TAXONOMY_INDEX_FILENAME).unlink(missing_ok=True)
+
+
+def products_for(index: dict, kind: str, taxonomy_id: int) -> list[int]:
+    return list(index[kind].get(str(int(taxonomy_id))) or [])
+
+
+def set_product(index: dict, pid: int, manufacturer_id: int | None, category_ids: list[int]) -> bool:
+    """Remplace les liens taxonomie de pid; retourne True si l'index a changé."""
+    pid = int(pid)
+    key = str(pid)
+    new = {"manufacturer": manufacturer_id, "categories": sorted({int(c) for c in category_ids})}
+    old = index["products"].get(key)
+    if old == new:
+        return False
+
+    if old:
+        if old.get("manufacturer") is not None:
+            unlink(index["manufacturers"], old["manufacturer"], pid)
+        for cid in old.get("categories") or []:
+            unlink(index["categories"], cid, pid)
+
+    if manufacturer_id is not None:
+        link(index["manufacturers"], manufacturer_id, pid)
+    for cid in new["categories"]:
+        link(index["categories"], cid, pid)
+    index["products"][key] = new
+    return True
+
+
+def remove_product(index: dict, pid: int) -> bool:
+    old = index["products"].pop(str(int(pid)), None)
+    if not old:
+        return False
+    if old.get("manufacturer") is not None:
+        unlink(index["manufacturers"], old["manufacturer"], int(pid))
+    for cid in old.get("categories") or []:
+        unlink(index["categories"], cid, int(pid))
+    return True
+
+
+def main(argv: list[str] | None = None) -> int:
+    # Reconstruit .publisher/taxonomy.json par un scan complet
+    return rebuild_main(
+        argv,
+        build_taxonomy_index,
+        taxonomy_index_path,
+        lambda i: f"{len(i['products'])} produits, {len(i['manufacturers'])} fabricants, "
+        f"{len(i['categories'])} catégories",
+    )
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
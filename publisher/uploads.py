@@ -0,0 +1,356 @@
+from __future__ import annotations
+
+# Sessions d'upload reprenables (gros PDFs et images).
+#
+# .publisher/uploads/<upload_id>/
+#   session.json           {"id", "filename", "size", "chunk_size", "total_chunks", "sha256", "status", ...}
+#                          status: "open" -> "finalizing" -> "complete" (retour à "open" si l'assemblage échoue)
+#   session.lock           verrou consultatif (flock): partagé pour rendre un bloc visible, exclusif
+#                          pour changer status
+#   activity.json          {"last_activity"}: mis à jour à chaque bloc reçu, à la finalisation et
+#                          à l'utilisation par un publish (fichier à part: les blocs parallèles ne
+#                          réécrivent pas session.json)
+#   chunks/000000.part     blocs reçus, écrits directement sur disque (tmp + os.replace)
+#   data                   fichier assemblé par finalize_upload (status "complete")
+#
+# Un bloc n'est rendu visible qu'après vérification de sa taille et de son sha256: un bloc
+# présent est un bloc valide, renvoyer un bloc est idempotent. L'état est entièrement sur
+# disque, les workers uvicorn se partagent donc les sessions.
+#
+# finalize_upload passe status à "finalizing" sous verrou exclusif avant d'assembler: une
+# seconde finalisation concurrente est refusée, et aucun bloc ne peut plus être rendu visible
+# (ni écrit) pendant l'assemblage et la suppression de chunks/.
+#
+# Un upload finalisé est référencé par son id dans le payload (image_upload_id /
+# pdf_upload_id) puis supprimé après une publication réussie. Les sessions sans activité
+# depuis UPLOAD_RETENTION_SECONDS expirent.
+
+import contextlib
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from lease import state_dir
+from utils import atomic_write_json, ensure_dir, read_json
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: exclusion limitée au processus
+    fcntl = None
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 32 * 1024 * 1024
+UPLOAD_MAX_BYTES = 1024 * 1024 * 1024
+UPLOAD_RETENTION_SECONDS = 24 * 3600
+# Finalisation interrompue (processus tué): au-delà, une nouvelle finalisation peut reprendre
+FINALIZE_STALE_SECONDS = 15 * 60
+_COPY_BUFFER = 1024 * 1024
+
+
+class UploadError(RuntimeError):
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def uploads_dir(catalog_root: Path) -> Path:
+    return state_dir(catalog_root) / "uploads"
+
+
+def _session_dir(catalog_root: Path, upload_id: str) -> Path:
+    if not upload_id or not str(upload_id).isalnum():
+        raise UploadError("not_found", f"upload introuvable: {upload_id}")
+    return uploads_dir(catalog_root) / str(upload_id)
+
+
+def _chunk_name(index: int) -> str:
+    return f"{int(index):06d}.part"
+
+
+def _load_session(catalog_root: Path, upload_id: str) -> tuple[Path, dict]:
+    sdir = _session_dir(catalog_root, upload_id)
+    try:
+        session = read_json(sdir / "session.json")
+    except (FileNotFoundError, ValueError):
+        raise UploadError("not_found", f"upload introuvable: {upload_id}")
+    return sdir, session
+
+
+@contextlib.contextmanager
+def _session_lock(sdir: Path, exclusive: bool):
+    with open(sdir / "session.lock", "a+") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _check_open(session: dict) -> None:
+    if session["status"] == "complete":
+        raise UploadError("already_complete", f"upload déjà finalisé: {session['id']}")
+    if session["status"] != "open":
+        raise UploadError("finalizing", f"finalisation en cours: {session['id']}")
+
+
+def _normalize_sha256(value: str | None) -> str | None:
+    if value is None:
+        return None
+    digest = str(value).strip().lower()
+    if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+        raise UploadError("invalid_upload", "sha256 attendu en hexadécimal (64 caractères)")
+    return digest
+
+
+def _touch(sdir: Path) -> float:
+    now = time.time()
+    atomic_write_json(sdir / "activity.json", {"last_activity": now})
+    return now
+
+
+def _last_activity(sdir: Path) -> float:
+    for name, key in (("activity.json", "last_activity"), ("session.json", "created_at")):
+        try:
+            return float(read_json(sdir / name)[key])
+        except Exception:
+            continue
+    return sdir.stat().st_mtime
+
+
+def prune_uploads(catalog_root: Path, max_age: float = UPLOAD_RETENTION_SECONDS) -> None:
+    root = uploads_dir(catalog_root)
+    if not root.exists():
+        return
+    cutoff = time.time() - max_age
+    for sdir in root.iterdir():
+        try:
+            if sdir.is_dir() and _last_activity(sdir) < cutoff:
+                shutil.rmtree(sdir, ignore_errors=True)
+        except Exception:
+            pass
+
+
+def create_upload(
+    catalog_root: Path,
+    filename: str,
+    size: int,
+    chunk_size: int | None = None,
+    sha256: str | None = None,
+) -> dict:
+    size = int(size)
+    if size <= 0:
+        raise UploadError("invalid_upload", "size doit être > 0")
+    if size > UPLOAD_MAX_BYTES:
+        raise UploadError("too_large", f"fichier trop volumineux (max {UPLOAD_MAX_BYTES} octets)")
+    chunk_size = int(chunk_size or DEFAULT_CHUNK_SIZE)
+    if not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE:
+        raise UploadError("invalid_upload", f"chunk_size doit être entre {MIN_CHUNK_SIZE} et {MAX_CHUNK_SIZE}")
+
+    prune_uploads(catalog_root)
+    upload_id = uuid.uuid4().hex
+    sdir = uploads_dir(catalog_root) / upload_id
+    ensure_dir(sdir / "chunks")
+    session = {
+        "id": upload_id,
+        "filename": str(filename or "").strip(),
+        "size": size,
+        "chunk_size": chunk_size,
+        "total_chunks": -(-size // chunk_size),
+        "sha256": _normalize_sha256(sha256),
+        "status": "open",
+        "created_at": time.time(),
+    }
+    atomic_write_json(sdir / "session.json", session)
+    _touch(sdir)
+    return session
+
+
+def _expected_length(session: dict, index: int) -> int:
+    if not 0 <= index < session["total_chunks"]:
+        raise UploadError("invalid_chunk", f"bloc hors limites: {index} (0..{session['total_chunks'] - 1})")
+    return min(session["chunk_size"], session["size"] - index * session["chunk_size"])
+
+
+def received_chunks(catalog_root: Path, upload_id: str) -> list[int]:
+    sdir = _session_dir(catalog_root, upload_id)
+    out = []
+    for path in (sdir / "chunks").glob("*.part"):
+        try:
+            out.append(int(path.stem))
+        except ValueError:
+            continue
+    return sorted(out)
+
+
+def upload_status(catalog_root: Path, upload_id: str) -> dict:
+    sdir, session = _load_session(catalog_root, upload_id)
+    if session["status"] == "complete":
+        received = list(range(session["total_chunks"]))
+    else:
+        received = received_chunks(catalog_root, upload_id)
+    return {
+        **session,
+        "received": received,
+        "missing": session["total_chunks"] - len(received),
+        "last_activity": _last_activity(sdir),
+    }
+
+
+class ChunkWriter:
+    """Écrit un bloc sur disque au fil du flux; visible seulement après commit() vérifié."""
+
+    def __init__(self, catalog_root: Path, upload_id: str, index: int):
+        sdir, session = _load_session(catalog_root, upload_id)
+        _check_open(session)
+        self.sdir = sdir
+        self.index = int(index)
+        self.expected = _expected_length(session, self.index)
+        self.path = sdir / "chunks" / _chunk_name(self.index)
+        self._hash = hashlib.sha256()
+        self._written = 0
+        self._tmp = tempfile.NamedTemporaryFile(
+            mode="wb", dir=str(self.path.parent), prefix=self.path.name + ".", suffix=".tmp", delete=False
+        )
+
+    def write(self, data: bytes) -> None:
+        self._written += len(data)
+        if self._written > self.expected:
+            raise UploadError("invalid_chunk", f"bloc {self.index}: plus de {self.expected} octets")
+        self._hash.update(data)
+        self._tmp.write(data)
+
+    def commit(self, sha256: str | None) -> dict:
+        expected_sha = _normalize_sha256(sha256)
+        self._tmp.close()
+        if self._written != self.expected:
+            raise UploadError("invalid_chunk", f"bloc {self.index}: {self._written} octets reçus, {self.expected} attendus")
+        if expected_sha is None:
+            raise UploadError("invalid_chunk", f"bloc {self.index}: sha256 requis")
+        digest = self._hash.hexdigest()
+        if digest != expected_sha:
+            raise UploadError("checksum_mismatch", f"bloc {self.index}: sha256 {digest} != {expected_sha}")
+        # Verrou partagé: finalize_upload ne peut pas passer en "finalizing" entre la
+        # vérification du status et l'apparition du bloc
+        with _session_lock(self.sdir, exclusive=False):
+            _check_open(read_json(self.sdir / "session.json"))
+            os.replace(self._tmp.name, self.path)
+        _touch(self.sdir)
+        return {"index": self.index, "size": self._written, "sha256": digest}
+
+    def abort(self) -> None:
+        try:
+            self._tmp.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(self._tmp.name)
+        except FileNotFoundError:
+            pass
+
+
+def _begin_finalize(sdir: Path, upload_id: str) -> tuple[dict, bool]:
+    """Check-and-set "open" -> "finalizing" sous verrou exclusif: (session, True si à assembler)."""
+    with _session_lock(sdir, exclusive=True):
+        session = read_json(sdir / "session.json")
+        if session["status"] == "complete":
+            return session, False
+        stale = time.time() - float(session.get("finalizing_at") or 0) > FINALIZE_STALE_SECONDS
+        if session["status"] == "finalizing" and not stale:
+            raise UploadError("finalizing", f"finalisation déjà en cours: {upload_id}")
+        session = {**session, "status": "finalizing", "finalizing_at": time.time()}
+        atomic_write_json(sdir / "session.json", session)
+    return session, True
+
+
+def _set_session(sdir: Path, session: dict) -> None:
+    with _session_lock(sdir, exclusive=True):
+        atomic_write_json(sdir / "session.json", session)
+
+
+def finalize_upload(catalog_root: Path, upload_id: str) -> dict:
+    """Assemble les blocs dans data et vérifie le sha256 global s'il a été annoncé (idempotent)."""
+    sdir, _ = _load_session(catalog_root, upload_id)
+    session, assemble = _begin_finalize(sdir, upload_id)
+    if not assemble:
+        _touch(sdir)
+        return session
+
+    reopened = {k: v for k, v in session.items() if k != "finalizing_at"}
+    reopened["status"] = "open"
+    try:
+        received = set(received_chunks(catalog_root, upload_id))
+        missing = [i for i in range(session["total_chunks"]) if i not in received]
+        if missing:
+            raise UploadError("incomplete", f"{len(missing)} blocs manquants: {missing[:20]}")
+
+        digest = hashlib.sha256()
+        data_path = sdir / "data"
+        with tempfile.NamedTemporaryFile(mode="wb", dir=str(sdir), prefix="data.", suffix=".tmp", delete=False) as out:
+            tmp_name = out.name
+            for index in range(session["total_chunks"]):
+                with (sdir / "chunks" / _chunk_name(index)).open("rb") as part:
+                    while True:
+                        buf = part.read(_COPY_BUFFER)
+                        if not buf:
+                            break
+                        digest.update(buf)
+                        out.write(buf)
+        sha = digest.hexdigest()
+        if session.get("sha256") and sha != session["sha256"]:
+            os.unlink(tmp_name)
+            raise UploadError("checksum_mismatch", f"fichier: sha256 {sha} != {session['sha256']}")
+        os.replace(tmp_name, data_path)
+    except BaseException:
+        # Assemblage abandonné: les blocs restent en place, le client peut corriger et relancer
+        _set_session(sdir, reopened)
+        raise
+
+    session = {**reopened, "status": "complete", "sha256": sha, "completed_at": time.time()}
+    _set_session(sdir, session)
+    _touch(sdir)
+    shutil.rmtree(sdir / "chunks", ignore_errors=True)
+    return session
+
+
+class StoredUpload:
+    """Upload finalisé, même interface que les fichiers reçus en multipart (filename, file)."""
+
+    def __init__(self, upload_id: str, filename: str, path: Path):
+        self.upload_id = upload_id
+        self.filename = filename
+        self.path = path
+        self.file = None
+
+    def __enter__(self) -> StoredUpload:
+        self.file = self.path.open("rb")
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def get_upload(catalog_root: Path, upload_id: str) -> StoredUpload:
+    sdir, session = _load_session(catalog_root, upload_id)
+    if session["status"] != "complete" or not (sdir / "data").exists():
+        raise UploadError("incomplete", f"upload non finalisé: {upload_id}")
+    # Référencé par un publish: repousse l'expiration jusqu'à la fin du job
+    _touch(sdir)
+    return StoredUpload(session["id"], session.get("filename") or "", sdir / "data")
+
+
+def discard_upload(catalog_root: Path, upload_id: str) -> bool:
+    sdir = _session_dir(catalog_root, upload_id)
+    if not sdir.exists():
+        return False
+    shutil.rmtree(sdir, ignore_errors=True)
+    return True
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import os
 import re
@@ -35,19 +36,18 @@ def slugify_ascii(value: str) -> str:
     return out
 
 
-_strip_re = re.compile(r"<[^>]*>")
-
-
-def strip_html(value: str) -> str:
-    text = _strip_re.sub(" ", value or "")
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
-
-
 def ensure_dir(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
 
 
+def _json_default(obj):
+    # Entrées compactes des index (records.py): sérialisées sous leur forme JSON
+    to_json = getattr(obj, "to_json", None)
+    if to_json is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return to_json()
+
+
 def read_json(path: Path):
     with path.open("r", encoding="utf-8") as f:
         return json.load(f)
@@ -66,12 +66,34 @@ def atomic_write_json(path: Path, obj) -> None:
         delete=False,
     ) as tf:
         tmp_name = tf.name
-        json.dump(obj, tf, ensure_ascii=False, indent=2)
+        json.dump(obj, tf, ensure_ascii=False, indent=2, default=_json_default)
         tf.write("\n")
 
     os.replace(tmp_name, path)
 
 
+def content_hash(obj) -> str:
+    # Hash stable d'un document JSON (clés triées, séparateurs compacts)
+    raw = json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=_json_default)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    ensure_dir(path.parent)
+
+    with tempfile.NamedTemporaryFile(
+        mode="wb",
+        dir=str(path.parent),
+        prefix=path.name + ".",
+        suffix=".tmp",
+        delete=False,
+    ) as tf:
+        tmp_name = tf.name
+        tf.write(data)
+
+    os.replace(tmp_name, path)
+
+
 def file_ext_from_upload(filename: str | None) -> str:
     name = (filename or "").strip()
     if not name or "." not in name:
@@ -79,3 +101,11 @@ def file_ext_from_upload(filename: str | None) -> str:
     ext = name.rsplit(".", 1)[-1].lower()
     ext = re.sub(r"[^a-z0-9]", "", ext)
     return ext or "bin"
+
+
+def resolve_catalog_root(arg: str | Path | None = None) -> Path:
+    # Argument explicite, sinon $CATALOG_ROOT, sinon public/catalog du dépôt
+    raw = arg or os.environ.get("CATALOG_ROOT")
+    if raw:
+        return Path(raw).expanduser().resolve()
+    return Path(__file__).resolve().parent.parent / "public" / "catalog"
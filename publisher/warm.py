@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+# État « chaud » du catalogue pour le processus publisher: index et taxonomies déjà décodés.
+#
+# - chargé en arrière-plan au démarrage de l'app (WarmCatalog.start): /api/catalog/ping et
+#   les routes qui n'en ont pas besoin répondent sans attendre le décodage des index
+# - valide tant que les fichiers sources ont la même signature (inode, mtime_ns, taille):
+#   une écriture par un autre worker, l'importer ou à la main le rend périmé, il est alors
+#   relu au prochain accès
+# - après un job réussi, publish_core y dépose le catalogue qu'il vient d'écrire
+#   (remember_catalog): le job suivant ne redécode rien
+# - instantané optionnel .publisher/warm.json (index en colonnes, RecordIndex.to_columns): un
+#   redémarrage ou un nouveau worker le relit au lieu des JSON s'il correspond aux
+#   signatures. Désactivé par PUBLISHER_WARM_SNAPSHOT=0. Données JSON uniquement (pas de
+#   pickle): .publisher/ peut être partagé entre hôtes, le relire n'exécute aucun code.
+#
+# Les appelants reçoivent des copies (index: nouvelles listes, entrées immuables partagées;
+# taxonomies: copie profonde) qu'ils peuvent modifier librement.
+#
+# Hors app (importer, scripts), aucun WarmCatalog n'est enregistré et load_catalog() relit
+# simplement les fichiers.
+
+import copy
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from lease import state_dir
+from records import IndexFormatError, ProductIndexRecord, RecordIndex, SearchRecord, load_index
+from utils import atomic_write_bytes
+
+SNAPSHOT_VERSION = 3
+SNAPSHOT_FILENAME = "warm.json"
+
+# clé de données -> fichier source (relatif à CATALOG_ROOT)
+CATALOG_SOURCES = {
+    "products_index": "index.products.json",
+    "search_index": "index.search.json",
+    "manufacturers": "taxonomies/manufacturers.json",
+    "categories": "taxonomies/categories.json",
+}
+
+_registry: dict[Path, WarmCatalog] = {}
+_registry_lock = threading.Lock()
+
+
+def snapshot_path(catalog_root: Path) -> Path:
+    return state_dir(catalog_root) / SNAPSHOT_FILENAME
+
+
+def snapshot_enabled_from_env() -> bool:
+    return os.environ.get("PUBLISHER_WARM_SNAPSHOT", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def _signature(catalog_root: Path) -> tuple:
+    out = []
+    for rel in CATALOG_SOURCES.values():
+        try:
+            st = (catalog_root / rel).stat()
+        except FileNotFoundError:
+            out.append((rel, None))
+            continue
+        out.append((rel, st.st_ino, st.st_mtime_ns, st.st_size))
+    return tuple(out)
+
+
+def _json_signature(signature: tuple) -> list:
+    # Forme JSON de _signature (tuples -> listes), pour comparer avec l'instantané relu
+    return [list(entry) for entry in signature]
+
+
+def read_catalog(catalog_root: Path) -> dict:
+    """Décode les fichiers sources (sans cache). index.search.json est optionnel."""
+    indexes = {}
+    for key, record_cls in (("products_index", ProductIndexRecord), ("search_index", SearchRecord)):
+        path = catalog_root / CATALOG_SOURCES[key]
+        if key == "search_index" and not path.exists():
+            indexes[key] = RecordIndex(SearchRecord)
+            continue
+        try:
+            indexes[key] = load_index(path, record_cls)
+        except IndexFormatError:
+            raise IndexFormatError(f"{CATALOG_SOURCES[key]}: tableau attendu")
+    taxonomies = {}
+    for key in ("manufacturers", "categories"):
+        with (catalog_root / CATALOG_SOURCES[key]).open("r", encoding="utf-8") as f:
+            taxonomies[key] = json.load(f)
+    return {**indexes, **taxonomies}
+
+
+def _copy(data: dict) -> dict:
+    return {
+        "products_index": data["products_index"].copy(),
+        "search_index": data["search_index"].copy(),
+        "manufacturers": copy.deepcopy(data["manufacturers"]),
+        "categories": copy.deepcopy(data["categories"]),
+    }
+
+
+class WarmCatalog:
+    def __init__(self, catalog_root: Path, snapshot: bool = True):
+        self.catalog_root = catalog_root
+        self.snapshot = snapshot
+        self.status: dict = {"state": "cold"}
+        self._state: tuple | None = None  # (signature, données)
+        self._load_lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._save_pending = False
+        self._saving = False
+
+    def start(self) -> None:
+        if self.status["state"] == "cold":
+            self.status = {"state": "warming"}
+            threading.Thread(target=self._warm_up, name="catalog-warmup", daemon=True).start()
+
+    def _warm_up(self) -> None:
+        t0 = time.monotonic()
+        try:
+            source = self._ensure()
+        except Exception as e:
+            # Catalogue absent ou invalide: les jobs remonteront l'erreur détaillée
+            self.status = {"state": "error", "message": str(e)}
+            return
+        self.status = {"state": "ready", "source": source, "seconds": round(time.monotonic() - t0, 3)}
+        # Modules des jobs importés hors requête (numpy: optionnel, pour similar.py)
+        try:
+            import publish_core  # noqa: F401
+            import numpy  # noqa: F401
+        except Exception:
+            pass
+
+    def _ensure(self) -> str:
+        """Rend l'état courant valide; renvoie sa provenance (memory, snapshot, json)."""
+        with self._load_lock:
+            signature = _signature(self.catalog_root)
+            if self._state is not None and self._state[0] == signature:
+                return "memory"
+            data = self._read_snapshot(signature) if self.snapshot else None
+            source = "snapshot"
+            if data is None:
+                data, source = read_catalog(self.catalog_root), "json"
+            self._state = (signature, data)
+            if self.status["state"] == "error":
+                self.status = {"state": "ready", "source": source}
+        if source == "json":
+            self._save_snapshot()
+        return source
+
+    def get(self) -> dict:
+        self._ensure()
+        return _copy(self._state[1])
+
+    def peek(self, key: str):
+        """Donnée partagée, en lecture seule, si l'état est chaud et à jour; sinon None sans attendre."""
+        state = self._state
+        if state is None or state[0] != _signature(self.catalog_root):
+            return None
+        return state[1][key]
+
+    def remember(self, data: dict) -> None:
+        """Catalogue tel qu'un job vient de l'écrire (appelé sous le bail d'écriture)."""
+        state = {key: data[key] for key in CATALOG_SOURCES}
+        with self._load_lock:
+            self._state = (_signature(self.catalog_root), _copy(state))
+        self.status = {**self.status, "state": "ready"}
+        self._save_snapshot()
+
+    def _read_snapshot(self, signature: tuple) -> dict | None:
+        path = snapshot_path(self.catalog_root)
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                payload = json.load(f)
+            if payload.get("version") != SNAPSHOT_VERSION or payload.get("signature") != _json_signature(signature):
+                return None
+            data = payload["data"]
+            return {
+                "products_index": RecordIndex.from_columns(data["products_index"]),
+                "search_index": RecordIndex.from_columns(data["search_index"]),
+                "manufacturers": data["manufacturers"],
+                "categories": data["categories"],
+            }
+        except Exception:
+            return None
+
+    def _save_snapshot(self) -> None:
+        # En arrière-plan; les demandes arrivées pendant une écriture n'en déclenchent qu'une
+        if not self.snapshot:
+            return
+        with self._save_lock:
+            self._save_pending = True
+            if self._saving:
+                return
+            self._saving = True
+        threading.Thread(target=self._save_loop, name="catalog-snapshot", daemon=True).start()
+
+    def _save_loop(self) -> None:
+        while True:
+            with self._save_lock:
+                if not self._save_pending:
+                    self._saving = False
+                    return
+                self._save_pending = False
+                signature, data = self._state
+            try:
+                payload = {
+                    "version": SNAPSHOT_VERSION,
+                    "signature": _json_signature(signature),
+                    "data": {
+                        "products_index": data["products_index"].to_columns(),
+                        "search_index": data["search_index"].to_columns(),
+                        "manufacturers": data["manufacturers"],
+                        "categories": data["categories"],
+                    },
+                }
+                raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+                atomic_write_bytes(snapshot_path(self.catalog_root), raw.encode("utf-8"))
+                self.status.pop("snapshot_error", None)
+            except Exception as e:
+                # Fail-soft: sans instantané, le prochain démarrage relit les JSON
+                self.status["snapshot_error"] = str(e)
+
+
+def enable_warm_catalog(catalog_root: Path, snapshot: bool | None = None) -> WarmCatalog:
+    """Enregistre (une fois par racine) l'état chaud utilisé par load_catalog()."""
+    root = Path(catalog_root).resolve()
+    with _registry_lock:
+        warm = _registry.get(root)
+        if warm is None:
+            warm = WarmCatalog(root, snapshot_enabled_from_env() if snapshot is None else snapshot)
+            _registry[root] = warm
+        return warm
+
+
+def warm_catalog(catalog_root: Path) -> WarmCatalog | None:
+    with _registry_lock:
+        return _registry.get(Path(catalog_root).resolve())
+
+
+def load_catalog(catalog_root: Path) -> dict:
+    warm = warm_catalog(catalog_root)
+    return warm.get() if warm is not None else read_catalog(catalog_root)
+
+
+def remember_catalog(catalog_root: Path, data: dict) -> None:
+    warm = warm_catalog(catalog_root)
+    if warm is not None:
+        warm.remember(data)
@@ -0,0 +1,39 @@
+import { useEffect, useState } from 'react'
+
+import { getProductLongHtml } from '../lib/catalog.js'
+
+/**
+ * Charge la description longue d’un produit à la demande.
+ * - `enabled=false`: aucun fetch (ex: onglet description fermé).
+ * - Retourne { status, html, error }.
+ */
+export function useProductLongHtml(product, { enabled = true, cacheBust = null } = {}) {
+  const d = product?.descriptions
+  const inline = typeof d?.long_html === 'string' ? d.long_html : null
+  const ref = typeof d?.long_html_ref === 'string' ? d.long_html_ref : ''
+
+  const [cache, setCache] = useState(() => ({}))
+  const entry = ref ? cache[ref] : null
+
+  useEffect(() => {
+    if (!enabled || inline != null || !ref || entry) return
+
+    const ac = new AbortController()
+    getProductLongHtml({ descriptions: { long_html_ref: ref } }, { signal: ac.signal, cacheBust })
+      .then((html) => {
+        setCache((prev) => ({ ...prev, [ref]: { html, error: null } }))
+      })
+      .catch((err) => {
+        if (err?.name === 'AbortError') return
+        setCache((prev) => ({ ...prev, [ref]: { html: '', error: err } }))
+      })
+
+    return () => ac.abort()
+  }, [enabled, inline, ref, entry, cacheBust])
+
+  if (inline != null) return { status: 'success', html: inline, error: null }
+  if (!ref) return { status: 'success', html: '', error: null }
+  if (!entry) return { status: enabled ? 'loading' : 'idle', html: '', error: null }
+  if (entry.error) return { status: 'error', html: '', error: entry.error }
+  return { status: 'success', html: entry.html, error: null }
+}
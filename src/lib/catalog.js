@@ -78,6 +78,7 @@ let _searchIndexPromise = null
 let _catalogPromise = null
 let _categoriesPromise = null
 let _manufacturersPromise = null
+let _relatedPromise = null
 
 /**
  * Invalide les caches mémoire (utile après un publish en localhost).
@@ -88,6 +89,7 @@ export function clearCatalogCache() {
   _catalogPromise = null
   _categoriesPromise = null
   _manufacturersPromise = null
+  _relatedPromise = null
 }
 
 export async function getCatalog(options) {
@@ -180,6 +182,26 @@ export async function listManufacturers(options) {
   }
 }
 
+/**
+ * Produits similaires précalculés par le publisher (index.related.json).
+ * Fichier optionnel: liste vide s'il est absent ou illisible.
+ */
+export async function listRelatedProductIds(id, options) {
+  if (!_relatedPromise) {
+    _relatedPromise = fetchJSON(`${BASE}/index.related.json`, options)
+  }
+  let data
+  try {
+    data = await _relatedPromise
+  } catch (err) {
+    _relatedPromise = null
+    if (err?.name === 'AbortError') throw err
+    return []
+  }
+  const ids = data?.related?.[String(id)]
+  return Array.isArray(ids) ? ids : []
+}
+
 export async function getProductById(id, options) {
   const cacheBust = options && typeof options === 'object' ? options.cacheBust : null
   const url = cacheBust
@@ -196,3 +218,43 @@ export async function findProductIdBySlug(slug, options) {
   const found = idx.find((p) => String(p?.slug || '') === s)
   return found?.id ?? null
 }
+
+/**
+ * Description longue d’un produit.
+ * - Produits publiés: fragment séparé référencé par `descriptions.long_html_ref`
+ *   (variante minifiée `long_html_min` privilégiée).
+ * - Compat: un `descriptions.long_html` inline est retourné tel quel.
+ */
+export async function getProductLongHtml(product, options) {
+  const d = product?.descriptions
+  if (typeof d?.long_html === 'string') return d.long_html
+
+  const ref = typeof d?.long_html_ref === 'string' ? d.long_html_ref.trim() : ''
+  if (!ref) return ''
+
+  const cacheBust = options && typeof options === 'object' ? options.cacheBust : null
+  const url = cacheBust ? `${BASE}/${ref}?v=${encodeURIComponent(String(cacheBust))}` : `${BASE}/${ref}`
+  const fragment = await fetchJSON(url, options)
+  if (typeof fragment?.long_html_min === 'string') return fragment.long_html_min
+  return typeof fragment?.long_html === 'string' ? fragment.long_html : ''
+}
+
+/**
+ * Descriptions brutes (édition admin): jamais les variantes normalisées/minifiées.
+ * Le fragment porte le HTML brut des deux descriptions; un fragment plus ancien sans
+ * `short_html` retombe sur `descriptions.short_html` (normalisé).
+ */
+export async function getProductDescriptionsRaw(product, options) {
+  const d = product?.descriptions
+  const shortHtml = typeof d?.short_html === 'string' ? d.short_html : ''
+  if (typeof d?.long_html === 'string') return { shortHtml, longHtml: d.long_html }
+
+  const ref = typeof d?.long_html_ref === 'string' ? d.long_html_ref.trim() : ''
+  if (!ref) return { shortHtml, longHtml: '' }
+
+  const fragment = await fetchJSON(`${BASE}/${ref}?v=${Date.now()}`, options)
+  return {
+    shortHtml: typeof fragment?.short_html === 'string' ? fragment.short_html : shortHtml,
+    longHtml: typeof fragment?.long_html === 'string' ? fragment.long_html : '',
+  }
+}
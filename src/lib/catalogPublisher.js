@@ -56,14 +56,107 @@ export async function pingPublisher() {
   return await apiFetch('/api/catalog/ping')
 }
 
-export async function createCatalogProduct({ draft, imageFile, pdfFile }) {
+// Uploads reprenables: au-delà du seuil, les fichiers passent par /api/catalog/uploads
+// (blocs vérifiés par sha256, seuls les blocs manquants sont renvoyés) au lieu du multipart.
+const CHUNKED_UPLOAD_THRESHOLD = 8 * 1024 * 1024
+const UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+const UPLOAD_CONCURRENCY = 3
+const UPLOAD_RETRIES = 3
+
+async function sha256Hex(buffer) {
+  const digest = await crypto.subtle.digest('SHA-256', buffer)
+  return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, '0')).join('')
+}
+
+/**
+ * Envoie un fichier par blocs et retourne l'id d'upload finalisé (à référencer dans le payload).
+ * Reprise: repasser `uploadId` (présent sur l'erreur levée) pour n'envoyer que les blocs manquants.
+ */
+export async function uploadCatalogFile(file, { uploadId, onProgress } = {}) {
   if (!isLocalhost()) {
     throw new Error('Publish disponible uniquement en localhost')
   }
+
+  let state
+  if (uploadId) {
+    state = await apiFetch(`/api/catalog/uploads/${encodeURIComponent(String(uploadId))}`)
+  } else {
+    const created = await apiFetch('/api/catalog/uploads', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ filename: file.name, size: file.size, chunk_size: UPLOAD_CHUNK_SIZE }),
+    })
+    state = { ...created, status: 'open', received: [] }
+  }
+
+  const id = encodeURIComponent(String(state.uploadId))
+  if (state.status === 'complete') return state.uploadId
+
+  const received = new Set(state.received || [])
+  const pending = []
+  for (let i = 0; i < state.totalChunks; i++) {
+    if (!received.has(i)) pending.push(i)
+  }
+  let sent = received.size
+  const report = () => onProgress?.(Math.round((100 * sent) / state.totalChunks))
+  report()
+
+  async function putChunk(index) {
+    const start = index * state.chunkSize
+    const buffer = await file.slice(start, Math.min(file.size, start + state.chunkSize)).arrayBuffer()
+    const sha = await sha256Hex(buffer)
+    for (let attempt = 1; ; attempt++) {
+      try {
+        await apiFetch(`/api/catalog/uploads/${id}/chunks/${index}`, {
+          method: 'PUT',
+          headers: { 'Content-Type': 'application/octet-stream', 'X-Chunk-Sha256': sha },
+          body: buffer,
+        })
+        break
+      } catch (err) {
+        if (attempt >= UPLOAD_RETRIES) throw err
+        await new Promise((resolve) => setTimeout(resolve, 500 * attempt))
+      }
+    }
+    sent += 1
+    report()
+  }
+
+  try {
+    const workers = Array.from({ length: Math.min(UPLOAD_CONCURRENCY, pending.length) }, async () => {
+      while (pending.length) await putChunk(pending.shift())
+    })
+    await Promise.all(workers)
+    await apiFetch(`/api/catalog/uploads/${id}/complete`, { method: 'POST' })
+  } catch (err) {
+    err.uploadId = state.uploadId
+    throw err
+  }
+  return state.uploadId
+}
+
+// Gros fichiers envoyés en parallèle par blocs; les petits restent dans le multipart.
+async function stageFiles(draft, { imageFile, pdfFile }) {
+  const isLarge = (f) => Boolean(f) && f.size > CHUNKED_UPLOAD_THRESHOLD
+  const [imageUploadId, pdfUploadId] = await Promise.all([
+    isLarge(imageFile) ? uploadCatalogFile(imageFile) : null,
+    isLarge(pdfFile) ? uploadCatalogFile(pdfFile) : null,
+  ])
   const fd = new FormData()
-  fd.set('payload', JSON.stringify(draft))
-  fd.set('image', imageFile)
-  if (pdfFile) fd.set('pdf', pdfFile)
+  const payload = { ...draft }
+  if (imageUploadId) payload.image_upload_id = imageUploadId
+  if (pdfUploadId) payload.pdf_upload_id = pdfUploadId
+  fd.set('payload', JSON.stringify(payload))
+  if (imageFile && !imageUploadId) fd.set('image', imageFile)
+  if (pdfFile && !pdfUploadId) fd.set('pdf', pdfFile)
+  return fd
+}
+
+export async function createCatalogProduct({ draft, imageFile, pdfFile }) {
+  if (!isLocalhost()) {
+    throw new Error('Publish disponible uniquement en localhost')
+  }
+  const fd = await stageFiles(draft, { imageFile, pdfFile })
 
   const out = await apiFetch('/api/catalog/products', { method: 'POST', body: fd })
   return out?.jobId
@@ -73,21 +166,31 @@ export async function updateCatalogProduct({ id, draft, imageFile, pdfFile, remo
   if (!isLocalhost()) {
     throw new Error('Publish disponible uniquement en localhost')
   }
-  const fd = new FormData()
-  fd.set('payload', JSON.stringify(draft))
-  if (imageFile) fd.set('image', imageFile)
-  if (pdfFile) fd.set('pdf', pdfFile)
+  const fd = await stageFiles(draft, { imageFile, pdfFile })
   if (removePdf) fd.set('remove_pdf', 'true')
 
   const out = await apiFetch(`/api/catalog/products/${encodeURIComponent(String(id))}`, { method: 'PUT', body: fd })
   return out?.jobId
 }
 
-export async function deleteCatalogProduct({ id }) {
+export async function deleteCatalogProduct({ id, cascade = false }) {
   if (!isLocalhost()) {
     throw new Error('Publish disponible uniquement en localhost')
   }
-  const out = await apiFetch(`/api/catalog/products/${encodeURIComponent(String(id))}`, { method: 'DELETE' })
+  const qs = cascade ? '?cascade=true' : ''
+  const out = await apiFetch(`/api/catalog/products/${encodeURIComponent(String(id))}${qs}`, { method: 'DELETE' })
+  return out?.jobId
+}
+
+export async function renameCatalogTaxonomy({ kind, id, name }) {
+  if (!isLocalhost()) {
+    throw new Error('Publish disponible uniquement en localhost')
+  }
+  const out = await apiFetch(`/api/catalog/taxonomies/${encodeURIComponent(String(kind))}/${encodeURIComponent(String(id))}`, {
+    method: 'PATCH',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ name }),
+  })
   return out?.jobId
 }
 
@@ -2,8 +2,13 @@ import { useEffect, useState } from 'react'
 import { Link, useLocation, useNavigate, useParams } from 'react-router-dom'
 
 import { useCart } from '../hooks/useCart.js'
+import { useProductLongHtml } from '../hooks/useProductLongHtml.js'
 import { assetUrl, findProductIdBySlug, getProductById, listProductsIndex } from '../lib/catalog.js'
 
+function normalizeHtml(html) {
+  return String(html || '').replace(/\s+/g, ' ').trim()
+}
+
 export function ProductDetailsPage() {
   const { id: idParam, slug: slugParam } = useParams()
   // Astuce: on force un remount quand les paramètres changent, ce qui évite de faire
@@ -23,6 +28,7 @@ function ProductDetailsInner({ idParam, slugParam }) {
   const [resolvedId, setResolvedId] = useState(null)
   const [indexEntry, setIndexEntry] = useState(null)
   const [product, setProduct] = useState(null)
+  const [descriptionOpen, setDescriptionOpen] = useState(false)
 
   const [justAdded, setJustAdded] = useState(false)
 
@@ -101,7 +107,12 @@ function ProductDetailsInner({ idParam, slugParam }) {
   }
 
   const shortHtml = typeof product?.descriptions?.short_html === 'string' ? product.descriptions.short_html : ''
-  const longHtml = typeof product?.descriptions?.long_html === 'string' ? product.descriptions.long_html : ''
+  // Description longue: fragment séparé, chargé seulement à l'ouverture de l'onglet.
+  const long = useProductLongHtml(product, { enabled: descriptionOpen })
+  const longHtml = long.html
+  const hasLongDescription =
+    typeof product?.descriptions?.long_html_ref === 'string' ||
+    (typeof product?.descriptions?.long_html === 'string' && normalizeHtml(product.descriptions.long_html) !== normalizeHtml(shortHtml))
 
   const pdfMissing = Boolean(product?.media?.pdfs_missing)
   const pdfFile = Array.isArray(product?.media?.pdfs) ? product.media.pdfs.find((p) => typeof p === 'string' && p) : null
@@ -227,8 +238,23 @@ function ProductDetailsInner({ idParam, slugParam }) {
             <div className="prose prose-sm mt-6 max-w-none" dangerouslySetInnerHTML={{ __html: shortHtml }} />
           ) : null}
 
-          {longHtml && longHtml !== shortHtml ? (
-            <div className="prose prose-sm mt-6 max-w-none" dangerouslySetInnerHTML={{ __html: longHtml }} />
+          {hasLongDescription ? (
+            <details
+              className="mt-6 rounded-xl border border-neutral-200"
+              onToggle={(e) => setDescriptionOpen(e.currentTarget.open)}
+              open={descriptionOpen}
+            >
+              <summary className="cursor-pointer px-4 py-3 text-base font-semibold">Description détaillée</summary>
+              <div className="border-t border-neutral-200 px-4 py-3">
+                {long.status === 'loading' ? <p className="text-sm text-neutral-600">Chargement…</p> : null}
+                {long.status === 'error' ? (
+                  <p className="text-sm text-neutral-700">Impossible de charger la description.</p>
+                ) : null}
+                {long.status === 'success' && longHtml && normalizeHtml(longHtml) !== normalizeHtml(shortHtml) ? (
+                  <div className="prose prose-sm max-w-none" dangerouslySetInnerHTML={{ __html: longHtml }} />
+                ) : null}
+              </div>
+            </details>
           ) : null}
         </div>
       ) : null}
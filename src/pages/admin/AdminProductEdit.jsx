@@ -4,7 +4,15 @@ import { Link, useParams } from 'react-router-dom'
 import { CategoryPicker } from '../../components/admin/CategoryPicker.jsx'
 import { PublishJobPanel } from '../../components/admin/PublishJobPanel.jsx'
 import { updateCatalogProduct } from '../../lib/catalogPublisher.js'
-import { assetUrl, clearCatalogCache, getProductById, listCategories, listManufacturers, pad6 } from '../../lib/catalog.js'
+import {
+  assetUrl,
+  clearCatalogCache,
+  getProductById,
+  getProductDescriptionsRaw,
+  listCategories,
+  listManufacturers,
+  pad6,
+} from '../../lib/catalog.js'
 import { slugify } from '../../lib/slug.js'
 
 function normalizeSpaces(value) {
@@ -126,6 +134,10 @@ export function AdminProductEditPage() {
 
         const product = await getProductById(productId, { signal: ctrl.signal })
         if (cancelled) return
+
+        // Descriptions brutes: fragment séparé (ou inline pour les anciens produits).
+        const raw = await getProductDescriptionsRaw(product, { signal: ctrl.signal })
+        if (cancelled) return
         setLoadProgress(100)
 
         const catsArr = Array.isArray(cats?.categories) ? cats.categories : []
@@ -145,8 +157,8 @@ export function AdminProductEditPage() {
         const pPrice = p?.pricing?.price_ht
         const pActive = Boolean(p?.active)
 
-        const pShort = String(p?.descriptions?.short_html || '').trim()
-        const pLong = String(p?.descriptions?.long_html || '').trim()
+        const pShort = String(raw.shortHtml || '').trim()
+        const pLong = String(raw.longHtml || '').trim()
 
         const pSpecs = Array.isArray(p?.specs) ? p.specs : []
 
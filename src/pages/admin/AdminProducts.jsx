@@ -146,11 +146,13 @@ export function AdminProductsPage() {
                           type="button"
                           className="px-3 py-1 rounded-md text-xs font-medium text-red-600 hover:bg-red-50 transition-colors"
                           onClick={async () => {
-                            const ok = window.confirm(`Supprimer le produit #${p?.id} ?`)
+                            const ok = window.confirm(
+                              `Supprimer le produit #${p?.id} ?\n\nIl sera aussi retiré des accessoires des autres produits.`,
+                            )
                             if (!ok) return
                             try {
                               setActionError('')
-                              const jid = await deleteCatalogProduct({ id: p?.id })
+                              const jid = await deleteCatalogProduct({ id: p?.id, cascade: true })
                               if (!jid) throw new Error('jobId manquant')
                               setJobId(String(jid))
                             } catch (e) {
@@ -0,0 +1,110 @@
+"""Renommage d'une taxonomie: seuls les noms dénormalisés de l'entité renommée changent.
+
+Usage: python -m unittest discover -s tests/publisher
+"""
+
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "publisher"))
+
+from publish_core import rename_taxonomy  # noqa: E402
+from utils import atomic_write_json  # noqa: E402
+
+MANUFACTURERS = {"manufacturers": [{"id": 22, "name": "Schiller"}, {"id": 5, "name": "Autre"}]}
+CATEGORIES = {
+    "categories": [
+        {"id": 1, "name": "Root", "id_parent": 0},
+        {"id": 2, "name": "Accueil", "id_parent": 1},
+        {"id": 62, "name": "Cardiologie", "id_parent": 2},
+        {"id": 64, "name": "ECG", "id_parent": 62},
+    ]
+}
+
+# Document publié dont la structure ne correspond pas à ce que recalculerait un publish:
+# breadcrumbs partiels, catégorie 999 absente des taxonomies, clés dans un ordre libre.
+PRODUCT = {
+    "id": 28,
+    "slug": "ecg-28",
+    "active": True,
+    "name": "ECG 28",
+    "descriptions": {"short_html": "<p>Court</p>", "excerpt": "Court", "long_html_ref": "descriptions/000028.json"},
+    "pricing": {"currency": "CHF", "price_ht": 10.0, "price_ttc": None, "promo": None},
+    "manufacturer": {"id": 22, "name": "Schiller"},
+    "categories": [{"id": 64, "name": "ECG"}, {"id": 999, "name": "Ancienne"}],
+    "category_paths": [[{"id": 62, "name": "Cardiologie"}, {"id": 64, "name": "ECG"}]],
+    "specs": [],
+    "media": {"images": [], "pdfs": [], "attachments_meta": [], "pdfs_missing": False},
+    "relations": {"accessories": []},
+}
+
+
+def _noop(*_args):
+    pass
+
+
+class RenameTaxonomyTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        atomic_write_json(self.root / "taxonomies" / "manufacturers.json", MANUFACTURERS)
+        atomic_write_json(self.root / "taxonomies" / "categories.json", CATEGORIES)
+        atomic_write_json(self.root / "products" / "000028.json", PRODUCT)
+        atomic_write_json(
+            self.root / "index.products.json",
+            [
+                {
+                    "id": 28,
+                    "slug": "ecg-28",
+                    "active": True,
+                    "name": "ECG 28",
+                    "price_ht": 10.0,
+                    "manufacturer_id": 22,
+                    "manufacturer_name": "Schiller",
+                    "category_ids": [64, 999],
+                    "cover_image": "",
+                }
+            ],
+        )
+        self.product_path = self.root / "products" / "000028.json"
+        self.original = self.product_path.read_bytes()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _expected(self, patch) -> bytes:
+        # Document d'origine avec les seuls noms attendus remplacés, sérialisé comme le publisher
+        product = json.loads(self.original)
+        patch(product)
+        path = self.root / "expected.json"
+        atomic_write_json(path, product)
+        return path.read_bytes()
+
+    def test_manufacturer_rename_only_touches_its_name(self):
+        result = rename_taxonomy(self.root, "manufacturers", 22, "Schiller AG", log=_noop, progress=_noop)
+        self.assertEqual(result["products"], 1)
+
+        def patch(p):
+            p["manufacturer"]["name"] = "Schiller AG"
+
+        self.assertEqual(self.product_path.read_bytes(), self._expected(patch))
+
+    def test_category_rename_keeps_structure_and_unknown_ids(self):
+        rename_taxonomy(self.root, "categories", 64, "Électrocardiographes", log=_noop, progress=_noop)
+
+        def patch(p):
+            p["categories"][0]["name"] = "Électrocardiographes"
+            p["category_paths"][0][1]["name"] = "Électrocardiographes"
+
+        self.assertEqual(self.product_path.read_bytes(), self._expected(patch))
+
+    def test_rename_of_other_entity_leaves_document_unchanged(self):
+        rename_taxonomy(self.root, "manufacturers", 5, "Autre SA", log=_noop, progress=_noop)
+        self.assertEqual(self.product_path.read_bytes(), self.original)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,35 @@
+import fs from 'node:fs'
+import path from 'node:path'
 import { defineConfig } from 'vite'
 import react from '@vitejs/plugin-react'
 import tailwindcss from '@tailwindcss/vite'
 
+// État interne du publisher (public/catalog/.publisher: uploads en cours, caches, manifest):
+// jamais copié dans dist/. Vite copie publicDir en entier, on le recopie donc nous-mêmes
+// en sautant les dossiers .publisher.
+function copyPublicWithoutPublisherState() {
+  let config
+  return {
+    name: 'copy-public-without-publisher-state',
+    apply: 'build',
+    configResolved(resolved) {
+      config = resolved
+    },
+    writeBundle() {
+      if (!config.publicDir || !fs.existsSync(config.publicDir)) return
+      fs.cpSync(config.publicDir, path.resolve(config.root, config.build.outDir), {
+        recursive: true,
+        filter: (src) => path.basename(src) !== '.publisher',
+      })
+    },
+  }
+}
+
 export default defineConfig({
   plugins: [
     react(),
     tailwindcss(),
+    copyPublicWithoutPublisherState(),
   ],
 
   server: {
@@ -15,6 +39,7 @@ export default defineConfig({
   },
 
   build: {
+    copyPublicDir: false,
     rollupOptions: {
       output: {
         manualChunks(id) {